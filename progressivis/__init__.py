@@ -5,13 +5,14 @@ import logging
 
 from progressivis.core import (ProgressiveError,
                                version, __version__, short_version,
-                               BaseScheduler, Scheduler, Slot, SlotDescriptor,
+                               BaseScheduler, Scheduler, ParallelScheduler,
+                               Slot, SlotDescriptor,
                                Module, StorageManager, Every, Print)
 
 from progressivis.table import Table, Column, Row
 
 __all__ = ["log_level",
-           "ProgressiveError", "BaseScheduler", "Scheduler",
+           "ProgressiveError", "BaseScheduler", "Scheduler", "ParallelScheduler",
            "version", "__version__", "short_version",
            "Slot", "SlotDescriptor", "Module", "StorageManager",
            "Every", "Print",
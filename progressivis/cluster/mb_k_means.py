@@ -13,10 +13,22 @@ logger = logging.getLogger(__name__)
 
 import numpy as np
 
+def _partial_fits(mbk, batch_size, dtype, with_labels, *columns):
+    """Fit the model on the batches of rows of the columns, return the model
+    and the labels of the rows when requested."""
+    X = np.column_stack(columns).astype(dtype, copy=False)
+    labels = []
+    for batch in gen_batches(len(X), batch_size):
+        mbk.partial_fit(X[batch])
+        if with_labels:
+            labels.append(mbk.labels_)
+    return (mbk, np.concatenate(labels) if labels else None)
+
 class MBKMeans(TableModule):
     """
     Mini-batch k-means using the sklearn implementation.
     """
+    BUFFER_ROWS = 64*1024
     def __init__(self, n_clusters, columns=None, batch_size=100, tol=0.0, is_input=True, random_state=None,**kwds):
         self._add_slots(kwds, 'input_descriptors',
                         [SlotDescriptor('table', type=Table, required=True)])
@@ -30,6 +42,7 @@ class MBKMeans(TableModule):
         self.n_clusters = n_clusters
         self.default_step_size = 100
         self._labels = None
+        self._buffer = None
         self._remaining_inits = 10
         self._initialization_steps = 0
         self._is_input = is_input
@@ -45,6 +58,7 @@ class MBKMeans(TableModule):
         dfslot.reset()
         self._table = None
         self._labels = None
+        self._buffer = None
         self.set_state(self.state_ready)
 
     def validate_outputs(self):
@@ -101,15 +115,34 @@ class MBKMeans(TableModule):
         if self._labels is not None and isinstance(indices, slice):
             indices = np.arange(indices.start, indices.stop)
             
-        X = input_df.to_array(columns=cols, locs=locs)
-        
         batch_size = self.mbk.batch_size or 100
-        for batch in gen_batches(steps, batch_size):
-            self.mbk.partial_fit(X[batch])
+        if self.executor is not None:
+            # the batches are fitted in the executor, on a copy of the model
+            dtype = input_df._array_layout(cols)[2]
+            shared = [self.share(input_df[c], locs) for c in cols]
+            (self.mbk, labels) = self.offload(_partial_fits, self.mbk,
+                                              batch_size, dtype,
+                                              self._labels is not None,
+                                              *shared)
             if self._labels is not None:
-                self._labels.append({'labels': self.mbk.labels_},indices=indices[batch])
+                self._labels.append({'labels': labels}, indices=indices)
+        else:
+            if self._buffer is None or self._buffer.shape[1] != len(cols):
+                # whole batches, reused by each step
+                rows = max(1, self.BUFFER_ROWS // batch_size) * batch_size
+                self._buffer = input_df.array_buffer(rows, cols)
+            dtype = self._buffer.dtype
+            pos = 0
+            for X in input_df.iter_array(columns=cols, locs=locs, out=self._buffer):
+                for batch in gen_batches(len(X), batch_size):
+                    self.mbk.partial_fit(X[batch])
+                    if self._labels is not None:
+                        self._labels.append({'labels': self.mbk.labels_},
+                                            indices=indices[pos+batch.start:pos+batch.stop])
+                pos += len(X)
         if self._table is None:
-            dshape = self.dshape_from_columns(input_df, cols, dshape_from_dtype(X.dtype))
+            dshape = self.dshape_from_columns(input_df, cols,
+                                              dshape_from_dtype(dtype))
             self._table = Table(self.generate_table_name('centers'),
                                 dshape=dshape,
                                 create=True)
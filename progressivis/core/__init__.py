@@ -1,9 +1,16 @@
 from __future__ import absolute_import, division, print_function
 
+import six
+
 from ._version import get_versions
 from .utils import (type_fullname, ProgressiveError, fix_loc, indices_len, integer_types)
 from .scheduler import Scheduler
 from .scheduler_base import BaseScheduler
+from .scheduler_parallel import ParallelScheduler
+from .scheduling_policy import SchedulingPolicy, EarliestDeadlineFirst
+from .step_allocator import StepAllocator, ThroughputAllocator
+from .timeline import Timeline
+from .profiler import SamplingProfiler
 from .slot import Slot, SlotDescriptor
 from .storagemanager import StorageManager
 from .module import Module, Every, Print
@@ -21,8 +28,15 @@ del get_versions
 
 __all__ = ["ProgressiveError", "type_fullname", "fix_loc", "indices_len",
            "integer_types",
-           "BaseScheduler", "Scheduler", "bitmap",
+           "BaseScheduler", "Scheduler", "ParallelScheduler", "bitmap",
+           "SchedulingPolicy", "EarliestDeadlineFirst",
+           "StepAllocator", "ThroughputAllocator", "Timeline",
+           "SamplingProfiler",
            "version", "__version__", "short_version",
            "Slot", "SlotDescriptor", "Module", "StorageManager",
            "Every", "Print", "Wait" ]
 #           "get_option", "set_option", "option_context", "config_prefix" ]
+
+if six.PY3:
+    from .scheduler_async import AsyncScheduler
+    __all__.append("AsyncScheduler")
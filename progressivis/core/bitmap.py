@@ -16,6 +16,9 @@ else:  # pragma no cover
     # pylint: disable=invalid-name
     _integer_types = (int, np.integer)
 
+# range operations are not available in old versions of pyroaring
+_HAS_RANGES = hasattr(BitMap, 'add_range') and hasattr(BitMap, 'remove_range')
+
 
 class bitmap(BitMap,object):
     # pylint: disable=invalid-name
@@ -25,6 +28,10 @@ class bitmap(BitMap,object):
     def __new__(cls, values=None, copy_on_write=False, optimize=True, no_init=False):
         if isinstance(values, slice):
             values = range(values.start, values.stop, (values.step or 1))
+        elif _HAS_RANGES and isinstance(values, np.ndarray) and values.ndim == 1:
+            ret = super(bitmap, cls).__new__(cls, None, copy_on_write, optimize, no_init)
+            ret._update_array(values) # pylint: disable=protected-access
+            return ret
         return super(bitmap, cls).__new__(cls, values, copy_on_write, optimize, no_init)
         #BitMap.__init__(self, values, copy_on_write)
 
@@ -72,6 +79,17 @@ class bitmap(BitMap,object):
 
     def update(self, values):
         "Add new values from either a bitmap, an array, a slice, or an Iterable"
+        if _HAS_RANGES:
+            # fast paths for contiguous values, the common case of appends
+            if isinstance(values, slice):
+                if values.step is None or values.step == 1:
+                    start = values.start or 0
+                    if values.stop > start:
+                        BitMap.add_range(self, start, values.stop)
+                    return
+            elif isinstance(values, np.ndarray) and values.ndim == 1:
+                self._update_array(values)
+                return
         try:
             BitMap.update(self, values)
         except TypeError:
@@ -87,16 +105,53 @@ class bitmap(BitMap,object):
                 BitMap.update(self, values)
             else:
                 raise
-    def pop(self, length=1):
-        "Remove one or many items and return them as a bitmap"
-        #import pdb;pdb.set_trace()
-        if length >= len(self):
-            ret = bitmap(self)
+    def _update_array(self, values):
+        length = len(values)
+        if length == 0:
+            return
+        first = int(values[0])
+        last = int(values[-1])
+        if first >= 0 and last-first+1 == length and \
+          (length < 3 or np.all(np.diff(values) == 1)):
+            BitMap.add_range(self, first, last+1)
+            return
+        if values.dtype != np.uint32:
+            if values.min() < 0 or values.max() > 0xffffffff:
+                raise OverflowError('Values out of the bitmap range')
+            values = values.astype(np.uint32)
+        BitMap.update(self, array.array('I', values.tobytes()))
+
+    def is_range(self):
+        "Return True if the bitmap contains contiguous values"
+        length = len(self)
+        return length == 0 or self.max()-self.min()+1 == length
+
+    def pop(self, length=1, as_slice=False):
+        """Remove one or many items and return them as a bitmap, or as a
+        slice if `as_slice` is True and they are contiguous"""
+        size = len(self)
+        if size == 0:
+            return slice(0, 0) if as_slice else bitmap()
+        if length >= size:
+            if as_slice and self.is_range():
+                ret = slice(self.min(), self.max()+1)
+            else:
+                ret = bitmap(self)
             self &= NIL_BITMAP
             return ret
+        if _HAS_RANGES:
+            first = self.min()
+            # rank counts the values <= first+length-1
+            if self.rank(first+length-1) == length:
+                BitMap.remove_range(self, first, first+length)
+                if as_slice:
+                    return slice(first, first+length)
+                return bitmap(slice(first, first+length))
         ret = self[0:length]
         self -= ret
-        return bitmap(ret)
+        if as_slice:
+            return ret.to_slice_maybe()
+        return ret
 
     def to_slice_maybe(self):
         "Convert this bitmap to a slice if possible, or return self"
@@ -95,10 +95,7 @@ class BaseChangeManager(object):
 def _next(bm, length, as_slice):
     if length is None:
         length = len(bm)
-    ret = bm.pop(length)
-    if as_slice:
-        ret = ret.to_slice_maybe()
-    return ret
+    return bm.pop(length, as_slice)
 
 
 class _buffer(object):
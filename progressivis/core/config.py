@@ -81,7 +81,20 @@ if len(options) == 0:
     register_option('display.column_space', 12)
     register_option('display.max_rows', 12)
     register_option('display.max_columns', 20)
+    # compact tables when more than ratio of their rows are free slots
+    register_option('table.compact_ratio', 0.5)
+    register_option('table.compact_min_free', 64*1024)
     register_option('storage.default', 'mmap')
+    # virtual size of the sparse files of the arena storage engine
+    register_option('storage.arena.size', 1024*1024*1024)
+    # bytes of the datasets kept in memory by the tiered storage engine,
+    # the least recently used are spilled to disk beyond, None for no limit
+    register_option('storage.memory_budget', None)
+    # bytes of the chunks of the compressed storage engine, the threads
+    # compressing the full chunks and the decoded chunks cached per dataset
+    register_option('storage.compressed.chunk_size', 1024*1024)
+    register_option('storage.compressed.threads', 2)
+    register_option('storage.compressed.cache', 4)
     register_option('storage.hdf5.open', {'driver': 'core',
                                           'backing_store': False})
     register_option('storage.hdf5.compression', {"compression": 'none'})
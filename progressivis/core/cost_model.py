@@ -0,0 +1,74 @@
+"""
+Store of the cost models calibrated by the time predictors of the modules,
+used to warm start the predictors of new modules across sessions.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['CostModelStore']
+
+_replace = getattr(os, 'replace', os.rename)
+
+
+class CostModelStore(object):
+    """
+    Dictionary of cost models saved in a json file, associating the key of
+    a module (class, input dshape and host) with the state of its time
+    predictor. The file is read lazily and merged with the models saved by
+    the other sessions when saving.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self._models = None
+        self._updated = {}
+
+    def _read(self):
+        try:
+            with open(self.filename) as fin:
+                models = json.load(fin)
+        except (IOError, OSError):
+            return {}
+        except ValueError:
+            logger.warning('Ignoring invalid cost model file %s', self.filename)
+            return {}
+        if not isinstance(models, dict):
+            return {}
+        return models
+
+    def models(self):
+        "Return the dictionary of the cost models"
+        if self._models is None:
+            self._models = self._read()
+        return self._models
+
+    def __contains__(self, key):
+        return key in self.models()
+
+    def get(self, key, default=None):
+        "Return the cost model associated with a key"
+        return self.models().get(key, default)
+
+    def put(self, key, model):
+        "Associate a cost model with a key, saved on the next call to `save`"
+        self.models()[key] = model
+        self._updated[key] = model
+
+    def save(self):
+        "Write the updated cost models in the file"
+        if not self._updated:
+            return
+        models = self._read()
+        models.update(self._updated)
+        tmpname = self.filename + '.tmp'
+        with open(tmpname, 'w') as out:
+            json.dump(models, out, indent=1, sort_keys=True)
+        _replace(tmpname, self.filename)
+        logger.debug('Saved %d cost models in %s',
+                     len(self._updated), self.filename)
+        self._models = models
+        self._updated = {}
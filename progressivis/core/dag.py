@@ -0,0 +1,192 @@
+"""
+Directed acyclic graph maintaining a topological order and the reachability
+of visualizations incrementally, when vertices and edges are added or removed.
+"""
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+import six
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['IncrementalDAG']
+
+
+class IncrementalDAG(object):
+    """
+    Graph of modules where an edge goes from a producer to its consumer.
+
+    The topological order is maintained with the dynamic algorithm of
+    Pearce and Kelly: adding an edge only reorders the vertices lying
+    between its two ends in the current order. Each vertex also counts
+    how many of its successors can reach a visualization (plus one if it
+    is a visualization itself), so the set of vertices reaching a
+    visualization is updated only where it changes.
+    """
+    def __init__(self):
+        self._succ = {}
+        self._pred = {}
+        self._ord = {}
+        self._vis = {}
+        self._next_ord = 0
+
+    def __contains__(self, vertex):
+        return vertex in self._ord
+
+    def __len__(self):
+        return len(self._ord)
+
+    def vertices(self):
+        "Return the vertices of the graph"
+        return six.iterkeys(self._ord)
+
+    def successors(self, vertex):
+        "Return the set of direct successors of the vertex"
+        return self._succ[vertex]
+
+    def predecessors(self, vertex):
+        "Return the set of direct predecessors of the vertex"
+        return self._pred[vertex]
+
+    def add_vertex(self, vertex, visualization=False):
+        "Add a vertex, placed after all the others in the order."
+        if vertex in self._ord:
+            return
+        self._succ[vertex] = set()
+        self._pred[vertex] = set()
+        self._ord[vertex] = self._next_ord
+        self._next_ord += 1
+        self._vis[vertex] = 1 if visualization else 0
+
+    def remove_vertex(self, vertex):
+        "Remove a vertex and all its edges."
+        for succ in list(self._succ[vertex]):
+            self.remove_edge(vertex, succ)
+        for pred in list(self._pred[vertex]):
+            self.remove_edge(pred, vertex)
+        del self._succ[vertex]
+        del self._pred[vertex]
+        del self._ord[vertex]
+        del self._vis[vertex]
+
+    def add_edge(self, src, dst):
+        """Add an edge meaning that `src` runs before `dst`.
+        Raise a ValueError if the edge would create a cycle."""
+        if dst in self._succ[src]:
+            return
+        lower, upper = self._ord[dst], self._ord[src]
+        if lower == upper:
+            raise ValueError('Cycle in graph')
+        if lower < upper:
+            forward = self._forward(dst, upper)
+            backward = self._backward(src, lower)
+            self._reorder(backward, forward)
+        self._succ[src].add(dst)
+        self._pred[dst].add(src)
+        if self.reaches_visualization(dst):
+            self._increment_vis(src)
+
+    def remove_edge(self, src, dst):
+        "Remove an edge; the order stays valid."
+        self._succ[src].remove(dst)
+        self._pred[dst].remove(src)
+        if self.reaches_visualization(dst):
+            self._decrement_vis(src)
+
+    def _forward(self, start, upper):
+        # vertices reachable from start placed before upper in the order
+        visited = {start}
+        stack = [start]
+        while stack:
+            vertex = stack.pop()
+            for succ in self._succ[vertex]:
+                order = self._ord[succ]
+                if order == upper:
+                    raise ValueError('Cycle in graph')
+                if succ not in visited and order < upper:
+                    visited.add(succ)
+                    stack.append(succ)
+        return visited
+
+    def _backward(self, start, lower):
+        # vertices reaching start placed after lower in the order
+        visited = {start}
+        stack = [start]
+        while stack:
+            vertex = stack.pop()
+            for pred in self._pred[vertex]:
+                if pred not in visited and self._ord[pred] > lower:
+                    visited.add(pred)
+                    stack.append(pred)
+        return visited
+
+    def _reorder(self, backward, forward):
+        key = self._ord.get
+        vertices = sorted(backward, key=key) + sorted(forward, key=key)
+        slots = sorted(self._ord[vertex] for vertex in vertices)
+        for vertex, order in zip(vertices, slots):
+            self._ord[vertex] = order
+
+    def _increment_vis(self, vertex):
+        stack = [vertex]
+        while stack:
+            vertex = stack.pop()
+            self._vis[vertex] += 1
+            if self._vis[vertex] == 1:  # now reaches a visualization
+                stack.extend(self._pred[vertex])
+
+    def _decrement_vis(self, vertex):
+        stack = [vertex]
+        while stack:
+            vertex = stack.pop()
+            self._vis[vertex] -= 1
+            if self._vis[vertex] == 0:  # does not reach a visualization anymore
+                stack.extend(self._pred[vertex])
+
+    def reaches_visualization(self, vertex):
+        "Return True if a visualization can be reached from the vertex"
+        return self._vis[vertex] > 0
+
+    def order(self):
+        "Return the list of vertices in topological order"
+        return sorted(self._ord, key=self._ord.get)
+
+    def reachable(self, vertex):
+        """Return the set of vertices reachable from the specified one,
+        including itself, that can reach a visualization.
+        """
+        if not self.reaches_visualization(vertex):
+            return set()
+        visited = {vertex}
+        stack = [vertex]
+        while stack:
+            for succ in self._succ[stack.pop()]:
+                if succ not in visited and self._vis[succ] > 0:
+                    visited.add(succ)
+                    stack.append(succ)
+        return visited
+
+    def update(self, dependencies, visualizations=()):
+        """Apply the differences between the graph and the specified
+        dependencies, a dictionary associating each vertex with the set
+        of vertices it depends on.
+        Raise a ValueError if the dependencies contain a cycle.
+        """
+        vertices = set(dependencies)
+        for deps in six.itervalues(dependencies):
+            vertices.update(deps)
+        for vertex in [v for v in self._ord if v not in vertices]:
+            self.remove_vertex(vertex)
+        for vertex in vertices:
+            self.add_vertex(vertex, vertex in visualizations)
+        for vertex in vertices:
+            deps = dependencies.get(vertex, ())
+            for pred in [p for p in self._pred[vertex] if p not in deps]:
+                self.remove_edge(pred, vertex)
+            for pred in deps:
+                self.add_edge(pred, vertex)
+
+    def clear(self):
+        "Remove all the vertices"
+        self.__init__()
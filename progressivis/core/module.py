@@ -6,6 +6,7 @@ from abc import ABCMeta, abstractmethod
 from traceback import print_exc
 import re
 import pdb
+import socket
 import logging
 
 import numpy as np
@@ -22,12 +23,17 @@ from .utils import (ProgressiveError, type_fullname, get_random_name)
 from .slot import (SlotDescriptor, Slot, InputSlots, OutputSlots)
 from .tracer_base import Tracer
 from .time_predictor import TimePredictor
+from .profiler import SamplingProfiler
 from .storagemanager import StorageManager
+from .offload import get_executor, share, offload
 
 if six.PY2:  # pragma no cover
     from inspect import getargspec as getfullargspec
+    def isawaitable(_):
+        "Coroutines are not available in Python 2"
+        return False
 else:  # pragma no cover
-    from inspect import getfullargspec
+    from inspect import getfullargspec, isawaitable
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +79,7 @@ class Module(six.with_metaclass(ModuleMeta, object)):
                  predictor=None,
                  storage=None,
                  storagegroup=None,
+                 executor=None,
                  input_descriptors=None,
                  output_descriptors=None,
                  **kwds):
@@ -89,6 +96,7 @@ class Module(six.with_metaclass(ModuleMeta, object)):
             predictor = TimePredictor.default()
         predictor.name = name
         self.predictor = predictor
+        self._cost_model_loaded = False
         if storage is None:
             storage = StorageManager.default
         self.storage = storage
@@ -110,6 +118,8 @@ class Module(six.with_metaclass(ModuleMeta, object)):
         self.order = None
         self._group = group
         self.tracer = tracer
+        self.profiler = None
+        self.executor = get_executor(executor)
         self._start_time = None
         self._end_time = None
         self._last_update = 0
@@ -287,6 +297,13 @@ class Module(six.with_metaclass(ModuleMeta, object)):
         "Return True if this module brings new data"        
         return False
 
+    def needs_polling(self):
+        """Return True if the scheduler should check whether this module
+        is ready at each pass. Otherwise, the module is only checked when
+        it is not blocked or when one of its input modules has run."""
+        return (self.is_input() or self.is_data_input() or
+                not self.has_any_input())
+
     def get_image(self, run_number=None):  # pragma no cover
         "Return an image created by this module or None"
         # pylint: disable=unused-argument, no-self-use
@@ -599,9 +616,88 @@ class Module(six.with_metaclass(ModuleMeta, object)):
         return self.tracer.trace_stats(max_runs)
 
     def predict_step_size(self, duration):
-        self.predictor.fit(self.trace_stats())
+        if not self._cost_model_loaded:
+            self.load_cost_model()
+        if self.predictor.uses_trace:
+            self.predictor.fit(self.trace_stats())
         return self.predictor.predict(duration, self.default_step_size)
 
+    def profile(self, enabled=True, profiler=None):
+        """Enable or disable the sampling of the steps of this module by the
+        specified profiler, or the default one."""
+        if self.profiler is not None:
+            self.profiler.remove(self)
+            self.profiler = None
+        if not enabled:
+            return
+        if profiler is None:
+            profiler = SamplingProfiler.get_default()
+        profiler.add(self)
+        self.profiler = profiler
+
+    def profile_stats(self, top=20):
+        """Return the functions where the steps of this module spent the
+        most time in the window of the profiler."""
+        if self.profiler is None:
+            return []
+        return self.profiler.stats(self.name, top)
+
+    def cost_model_key(self):
+        """Return the key of the cost model of this module in the store of
+        its storage manager, made of its class, the dshape of its inputs
+        and the host name."""
+        dshapes = []
+        for name in sorted(self._input_slots):
+            slot = self._input_slots[name]
+            if slot is None or name == self.PARAMETERS_SLOT:
+                continue
+            data = slot.data()
+            dshape = getattr(data, 'dshape', None)
+            if dshape is None:
+                dshape = type(data).__name__
+            dshapes.append('%s: %s' % (name, dshape))
+        return '%s|{%s}|%s' % (type_fullname(self), ', '.join(dshapes),
+                               socket.gethostname())
+
+    def load_cost_model(self):
+        """Warm start the time predictor with the cost model saved by a
+        previous session, return True if one was found."""
+        self._cost_model_loaded = True
+        store = self.storage.cost_models()
+        if store is None:
+            return False
+        state = store.get(self.cost_model_key())
+        if state is None:
+            return False
+        logger.info('Warm starting the predictor of %s', self.name)
+        self.predictor.load_state(state)
+        return True
+
+    def save_cost_model(self):
+        """Put the cost model calibrated by the time predictor in the store
+        of the storage manager and return the store, or None."""
+        store = self.storage.cost_models()
+        if store is None or not self._cost_model_loaded:
+            return None # never ran
+        state = self.predictor.state()
+        if state is None:
+            return None
+        store.put(self.cost_model_key(), state)
+        return store
+
+    def share(self, column, loc=None):
+        """Return the values of the column at the specified ids, to be
+        passed to `offload`. Columns stored in mmap files are shared with
+        the worker processes instead of being copied.
+        """
+        return share(column, loc, self.executor)
+
+    def offload(self, func, *args, **kwds):
+        """Call `func(*args, **kwds)` in the executor of this module, or
+        directly when the module has no executor, and return its result.
+        """
+        return offload(self.executor, func, *args, **kwds)
+
     def starting(self):
         pass
 
@@ -664,6 +760,30 @@ class Module(six.with_metaclass(ModuleMeta, object)):
         return v
 
     def run(self, run_number):
+        """Run the module for its quantum.
+        A `run_step` method returning an awaitable is run to completion
+        in a private event loop, see `AsyncScheduler` to await it instead.
+        """
+        steps = self.run_steps(run_number)
+        send, value = steps.send, None
+        while True:
+            try:
+                value = send(value)
+            except StopIteration:
+                return
+            send = steps.send
+            if isawaitable(value):
+                # pylint: disable=broad-except
+                try:
+                    value = _run_until_complete(value)
+                except Exception as exc:
+                    send, value = steps.throw, exc
+
+    def run_steps(self, run_number):
+        """Generator running the module for its quantum, yielding the value
+        returned by each call to `run_step` and expecting the result of
+        `run_step` to be sent back, once awaited if it is awaitable.
+        """
         if self.is_running():
             raise ProgressiveError('Module already running')
         self.steps_acc = 0
@@ -680,13 +800,16 @@ class Module(six.with_metaclass(ModuleMeta, object)):
         self._start_time = now
         self._end_time = self._start_time + quantum
         self._update_params(run_number)
-
-        # TODO Forcing 3 steps, not sure, change when the predictor improves
-        max_time = quantum / 3.0
+        allocator = self.scheduler().allocator
+        timeline = self.scheduler().timeline
+        profiler = self.profiler
+        run_start = now
+        step_count = 0
+        steps_run = 0
 
         run_step_ret = {'reads': 0, 'updates': 0, 'creates': 0}
         self.start_run(run_number)
-        tracer.start_run(now, run_number)
+        tracer.start_run(now, run_number, quantum=quantum)
         while self._start_time < self._end_time:
             remaining_time = self._end_time-self._start_time
             if remaining_time <= 0:
@@ -695,24 +818,28 @@ class Module(six.with_metaclass(ModuleMeta, object)):
                 break  # no need to try to squeeze anything
             logger.debug('Time remaining: %f in module %s',
                          remaining_time, self.pretty_typename())
-            step_size = self.predict_step_size(np.min([max_time,
-                                                       remaining_time]))
+            step_size = allocator.step_size(self, remaining_time, quantum)
             logger.debug('step_size=%d in module %s',
                          step_size, self.pretty_typename())
             if step_size == 0:
                 logger.debug('step_size of 0 in module %s',
                              self.pretty_typename())
                 break
+            step_start = now
             # pylint: disable=broad-except
             try:
                 tracer.before_run_step(now, run_number)
                 if self.debug:
                     pdb.set_trace()
-                run_step_ret = self.run_step(run_number,
-                                             step_size,
-                                             remaining_time)
+                if profiler is not None:
+                    profiler.enter(self)
+                run_step_ret = yield self.run_step(run_number,
+                                                   step_size,
+                                                   remaining_time)
                 next_state = run_step_ret['next_state']
                 now = self.timer()
+                self.predictor.observe(run_step_ret.get('steps_run', 0),
+                                       now - step_start)
             except StopIteration:
                 logger.info('In Module.run(): Received a StopIteration')
                 next_state = Module.state_zombie
@@ -731,11 +858,19 @@ class Module(six.with_metaclass(ModuleMeta, object)):
                 self._start_time = now
                 break
             finally:
+                if profiler is not None:
+                    profiler.leave(self)
                 assert (run_step_ret is not None), "Error: %s run_step_ret"\
                   " not returning a dict" % self.pretty_typename()
                 if self.debug:
                     run_step_ret['debug'] = True
                 tracer.after_run_step(now, run_number, **run_step_ret)
+                if timeline is not None:
+                    timeline.step(self, run_number, step_start, now,
+                                  step_count, run_step_ret.get('steps_run', 0),
+                                  next_state)
+                step_count += 1
+                steps_run += run_step_ret.get('steps_run', 0)
                 self.state = next_state
                 logger.debug('Next step is %s in module %s',
                              self.state_name[next_state],
@@ -753,11 +888,23 @@ class Module(six.with_metaclass(ModuleMeta, object)):
         tracer.end_run(now, run_number,
                        progress_current=progress[0], progress_max=progress[1],
                        quality=self.get_quality())
+        if timeline is not None:
+            timeline.run(self, run_number, run_start, now, step_count,
+                         steps_run, next_state)
         self._stop(run_number)
         if exception:
             raise RuntimeError("{} {}".format(type(exception), exception))
 
 
+def _run_until_complete(awaitable):
+    import asyncio
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(awaitable)
+    finally:
+        loop.close()
+
+
 def _print_len(x):
     if x is not None:
         print(len(x))
@@ -0,0 +1,167 @@
+"""
+Offload CPU-bound computations of modules to worker processes.
+
+Arrays stored in mmap files are not pickled when sent to a worker: only
+a reference to the file is sent and the worker maps the same pages. The
+values of other columns are copied once in a temporary file, removed when
+the computation is done.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import tempfile
+import logging
+
+import numpy as np
+
+from .utils import ProgressiveError, integer_types
+from .bitmap import bitmap
+from .storagemanager import StorageManager
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['PROCESS', 'SharedArray', 'get_executor', 'share', 'offload']
+
+PROCESS = 'process'
+
+OFFLOAD_DIRECTORY = 'offload'
+
+_PROCESS_POOL = None
+
+
+def _process_pool():
+    # pylint: disable=global-statement
+    global _PROCESS_POOL
+    if _PROCESS_POOL is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _PROCESS_POOL = ProcessPoolExecutor()
+    return _PROCESS_POOL
+
+
+def get_executor(executor):
+    """Return the executor specified by the `executor` keyword of a module,
+    either None, 'process' for the shared process pool, or an object with
+    a `submit` method such as a `concurrent.futures.Executor`.
+    """
+    if executor is None:
+        return None
+    if executor == PROCESS:
+        return _process_pool()
+    if hasattr(executor, 'submit'):
+        return executor
+    raise ProgressiveError('Invalid executor %s' % executor)
+
+
+class SharedArray(object):
+    """
+    Picklable reference to some values of an array stored in an mmap file.
+    """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ['filename', 'dtype', 'shape', 'index', 'temporary']
+    def __init__(self, filename, dtype, shape, index, temporary=False):
+        self.filename = filename
+        self.dtype = dtype
+        self.shape = shape
+        self.index = index
+        self.temporary = temporary
+
+    def open(self):
+        "Map the file and return the referenced values"
+        if not np.prod(self.shape):
+            # empty files cannot be mapped
+            return np.empty(self.shape, dtype=self.dtype)[self.index]
+        array = np.memmap(self.filename, dtype=self.dtype,
+                          mode='r', shape=self.shape)
+        return array[self.index]
+
+    def remove(self):
+        "Remove the file of a temporary array"
+        if self.temporary and os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+def _mmap_dataset(column):
+    try:
+        from ..storage.mmap import MMapDataset, OBJECT
+    except ImportError:  # mmap storage is not available on this platform
+        return None
+    dataset = getattr(column, 'dataset', None)
+    if isinstance(dataset, MMapDataset) and dataset.dtype != OBJECT:
+        return dataset
+    return None
+
+
+def _is_thread_executor(executor):
+    from concurrent.futures import ThreadPoolExecutor
+    return isinstance(executor, ThreadPoolExecutor)
+
+
+def _temporary_array(values):
+    "Copy the values in a temporary file and return a `SharedArray` of it"
+    directory = StorageManager.default.filename(OFFLOAD_DIRECTORY)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    (fd, filename) = tempfile.mkstemp(suffix='.dat', dir=directory)
+    os.close(fd)
+    if values.size:
+        array = np.memmap(filename, dtype=values.dtype, mode='w+',
+                          shape=values.shape)
+        array[...] = values
+        array.flush()
+        del array
+    return SharedArray(filename, values.dtype, values.shape, Ellipsis,
+                       temporary=True)
+
+
+def share(column, loc=None, executor=None):
+    """Return the values of the column at the specified ids, in a form
+    suitable to be sent to the executor.
+
+    Without executor or with a thread pool, the values are returned.
+    Otherwise, the values of a column stored in an mmap file are returned
+    as a `SharedArray` of its file, and the values of other columns are
+    copied in a temporary file. Columns of objects are pickled.
+    """
+    index = column.index.id_to_index(loc)
+    if executor is None or _is_thread_executor(executor):
+        return np.asarray(column[index])
+    dataset = _mmap_dataset(column)
+    if dataset is None:
+        values = np.asarray(column[index])
+        if values.dtype == np.object_:
+            return values
+        return _temporary_array(values)
+    if isinstance(index, bitmap):
+        index = np.frombuffer(index.to_array(), dtype=np.uint32)
+    elif index is None:
+        index = slice(None)
+    elif not isinstance(index, (slice, integer_types)):
+        index = np.asarray(index)
+    return SharedArray(dataset.filename, dataset.dtype, dataset.shape, index)
+
+
+def _open_shared(arg):
+    if isinstance(arg, SharedArray):
+        return arg.open()
+    return arg
+
+
+def _call_shared(func, args, kwds):
+    return func(*[_open_shared(arg) for arg in args], **kwds)
+
+
+def offload(executor, func, *args, **kwds):
+    """Call `func(*args, **kwds)` in the executor, or directly if the executor
+    is None, and return its result. Arguments returned by `share` are mapped
+    from their file in the worker.
+    The function and its result should be picklable to run in a process pool.
+    """
+    try:
+        if executor is None:
+            return _call_shared(func, args, kwds)
+        future = executor.submit(_call_shared, func, args, kwds)
+        return future.result()
+    finally:
+        for arg in args:
+            if isinstance(arg, SharedArray):
+                arg.remove()
@@ -0,0 +1,178 @@
+"""
+Sampling profiler of the steps of the modules, cheap enough to be enabled
+in a live session.
+"""
+from __future__ import absolute_import, division, print_function
+
+import sys
+import threading
+import logging
+from collections import deque, Counter
+from timeit import default_timer
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['SamplingProfiler']
+
+
+class SamplingProfiler(object):
+    """
+    Sample the stack of the threads running a step of a profiled module
+    every `interval` seconds, from a background thread, and count the
+    functions found by module over the last `window` seconds.
+
+    For each function, `self` counts the samples where it was running and
+    `total` the samples where it was in the stack. A sample is charged to
+    the module whose `run_step` is in the stack, so coroutines of several
+    modules sharing the thread of an AsyncScheduler are told apart.
+    The sampling thread runs while at least one module is profiled.
+    """
+    default = None
+    BUCKET = 1.0 # seconds of samples aggregated together
+
+    def __init__(self, interval=0.005, window=60):
+        self.interval = interval
+        self.window = window
+        self._active = {}  # thread ident -> {module name: steps running}
+        self._profiled = set()  # names of the profiled modules
+        self._buckets = deque()  # (time, {module: (self, total, samples)})
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def get_default():
+        "Return the default profiler, creating it if needed"
+        if SamplingProfiler.default is None:
+            SamplingProfiler.default = SamplingProfiler()
+        return SamplingProfiler.default
+
+    def start(self):
+        "Start the sampling thread"
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='progressivis profiler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        "Stop the sampling thread"
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def add(self, module):
+        "Profile the module, starting the sampling thread if needed"
+        self._profiled.add(module.name)
+        self.start()
+
+    def remove(self, module):
+        "Stop profiling the module, stopping the thread when none remain"
+        self._profiled.discard(module.name)
+        if not self._profiled:
+            self.stop()
+
+    def enter(self, module):
+        "Called when the current thread starts a step of a profiled module"
+        tid = threading.current_thread().ident
+        with self._lock:
+            names = self._active.setdefault(tid, {})
+            names[module.name] = names.get(module.name, 0) + 1
+
+    def leave(self, module):
+        "Called when the current thread ends a step of a profiled module"
+        tid = threading.current_thread().ident
+        with self._lock:
+            names = self._active.get(tid, {})
+            count = names.pop(module.name, 0) - 1
+            if count > 0:
+                names[module.name] = count
+            if not names:
+                self._active.pop(tid, None)
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            if self._active:
+                self.sample()
+
+    def sample(self):
+        "Take a sample of the stacks of the threads running a step"
+        frames = sys._current_frames() # pylint: disable=protected-access
+        now = default_timer()
+        with self._lock:
+            if not self._buckets or now - self._buckets[-1][0] >= self.BUCKET:
+                self._buckets.append((now, {}))
+                while now - self._buckets[0][0] > self.window:
+                    self._buckets.popleft()
+            bucket = self._buckets[-1][1]
+            for (tid, names) in list(self._active.items()):
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                name = _running_module(frame, names)
+                if name is None:  # running another coroutine
+                    continue
+                if name not in bucket:
+                    bucket[name] = (Counter(), Counter(), [0])
+                (self_counts, total_counts, samples) = bucket[name]
+                samples[0] += 1
+                self_counts[_function(frame)] += 1
+                seen = set()
+                while frame is not None:
+                    function = _function(frame)
+                    if function not in seen:
+                        seen.add(function)
+                        total_counts[function] += 1
+                    frame = frame.f_back
+
+    def modules(self):
+        "Return the names of the modules sampled in the window"
+        with self._lock:
+            return sorted(set(name for (_, bucket) in self._buckets
+                              for name in bucket))
+
+    def stats(self, name, top=20):
+        """Return the `top` functions where a module spends the most time
+        over the window, as a list of dictionaries."""
+        self_counts = Counter()
+        total_counts = Counter()
+        samples = 0
+        with self._lock:
+            for (_, bucket) in self._buckets:
+                if name in bucket:
+                    (selfc, totalc, count) = bucket[name]
+                    self_counts.update(selfc)
+                    total_counts.update(totalc)
+                    samples += count[0]
+        ret = []
+        for (function, count) in self_counts.most_common(top):
+            (filename, lineno, funcname) = function
+            ret.append({'function': funcname,
+                        'filename': filename,
+                        'lineno': lineno,
+                        'self': count,
+                        'total': total_counts[function],
+                        'self_fraction': count / samples,
+                        'total_fraction': total_counts[function] / samples})
+        return ret
+
+
+def _running_module(frame, names):
+    "Return the name of the module running the step in the stack, or None"
+    while frame is not None:
+        if frame.f_code.co_name == 'run_step':
+            module = frame.f_locals.get('self')
+            name = getattr(module, 'name', None)
+            if name in names:
+                return name
+        frame = frame.f_back
+    return None
+
+
+def _function(frame):
+    code = frame.f_code
+    return (code.co_filename, code.co_firstlineno, code.co_name)
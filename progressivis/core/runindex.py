@@ -0,0 +1,214 @@
+"""
+Run-length index mapping ids to indices, for the common case of a few
+large contiguous runs of ids with scattered holes.
+"""
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from progressivis.core.utils import integer_types
+from progressivis.core.intdict import IntDict
+
+
+class RunIndex(object):
+    """
+    Map int64 keys to int64 values as sorted runs of (key, value, length),
+    where the keys key..key+length-1 map to the values value..value+length-1.
+
+    It has the same interface as `IntDict`, lookups are vectorized binary
+    searches. When the runs become too short on average, see `fragmented`,
+    the index should be replaced by an `IntDict` using `to_intdict`.
+    """
+    MIN_RUN_LENGTH = 8
+
+    def __init__(self, keys=None, values=None):
+        self._keys = np.empty(0, dtype=np.int64)
+        self._values = np.empty(0, dtype=np.int64)
+        self._lengths = np.empty(0, dtype=np.int64)
+        self._len = 0
+        if keys is not None:
+            self.update(keys, values)
+        else:
+            assert values is None or len(values) == 0
+
+    def __len__(self):
+        return self._len
+
+    def run_count(self):
+        "Return the number of runs"
+        return len(self._keys)
+
+    def fragmented(self):
+        "Return True if a hash table would be a better index"
+        return self.run_count() * self.MIN_RUN_LENGTH > max(self._len,
+                                                            self.MIN_RUN_LENGTH)
+
+    def runs(self):
+        "Return the arrays of the first keys, first values and lengths of the runs"
+        return (self._keys, self._values, self._lengths)
+
+    def _find(self, keys):
+        "Return the run of each key and a mask of the keys found"
+        pos = np.searchsorted(self._keys, keys, side='right') - 1
+        found = pos >= 0
+        run = np.where(found, pos, 0)
+        if len(self._keys):
+            found &= keys < self._keys[run] + self._lengths[run]
+        else:
+            found[:] = False
+        return (run, found)
+
+    def __getitem__(self, key):
+        (run, found) = self._find(np.array([key], dtype=np.int64))
+        if not found[0]:
+            raise KeyError(key)
+        run = run[0]
+        return int(self._values[run] + key - self._keys[run])
+
+    def __setitem__(self, key, val):
+        assert (isinstance(key, integer_types) and
+                isinstance(val, integer_types))
+        self.update([key], [val])
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._remove(key, key+1)
+
+    def __contains__(self, key):
+        return bool(self._find(np.array([key], dtype=np.int64))[1][0])
+
+    def contains_any(self, keys):
+        assert isinstance(keys, np.ndarray) and keys.dtype == np.int64
+        return bool(np.any(self._find(keys)[1]))
+
+    def get_items(self, key_value):
+        assert (isinstance(key_value, np.ndarray) and
+                key_value.dtype == np.int64)
+        (run, found) = self._find(key_value)
+        if not np.all(found):
+            raise KeyError(key_value[~found][0])
+        key_value += self._values[run] - self._keys[run]
+        return key_value
+
+    get_values = get_items
+
+    def update(self, keys, values):
+        keys = np.asarray(keys, dtype=np.int64)
+        values = np.asarray(values, dtype=np.int64)
+        assert keys.shape == values.shape
+        if len(keys) == 0:
+            return
+        if np.any(keys[1:] < keys[:-1]):
+            order = np.argsort(keys, kind='mergesort')
+            keys = keys[order]
+            values = values[order]
+        # split the new keys in runs
+        breaks = np.flatnonzero((np.diff(keys) != 1) | (np.diff(values) != 1)) + 1
+        starts = np.concatenate(([0], breaks))
+        lengths = np.diff(np.concatenate((starts, [len(keys)])))
+        new_keys = keys[starts]
+        new_values = values[starts]
+        if self._len and self.contains_any(keys):
+            # overwritten keys are removed first
+            for (key, length) in zip(new_keys, lengths):
+                self._remove(int(key), int(key+length))
+        self._insert(new_keys, new_values, lengths)
+
+    def _insert(self, keys, values, lengths):
+        "Insert runs of keys not in the index, merging adjacent runs"
+        keys = np.concatenate((self._keys, keys))
+        values = np.concatenate((self._values, values))
+        lengths = np.concatenate((self._lengths, lengths))
+        order = np.argsort(keys, kind='mergesort')
+        keys = keys[order]
+        values = values[order]
+        lengths = lengths[order]
+        # a run continues the previous one if both keys and values follow
+        ends = keys[:-1] + lengths[:-1]
+        cont = (ends == keys[1:]) & (values[:-1] + lengths[:-1] == values[1:])
+        if np.any(cont):
+            first = np.concatenate(([True], ~cont))
+            group = np.cumsum(first) - 1
+            lengths = np.bincount(group, weights=lengths).astype(np.int64)
+            keys = keys[first]
+            values = values[first]
+        self._keys = keys
+        self._values = values
+        self._lengths = lengths
+        self._len = int(lengths.sum())
+
+    def remove_items(self, keys):
+        """Remove the keys found in the index, return the mask of the keys
+        found."""
+        keys = np.asarray(keys, dtype=np.int64)
+        found = self._find(keys)[1]
+        if not np.any(found):
+            return found
+        removed = np.unique(keys[found])
+        # each removed key ends a piece of its run and starts the next one
+        ends = self._keys + self._lengths
+        starts = np.sort(np.concatenate((self._keys, removed+1)))
+        stops = np.sort(np.concatenate((removed, ends)))
+        keep = stops > starts
+        starts = starts[keep]
+        stops = stops[keep]
+        piece_run = np.searchsorted(self._keys, starts, side='right') - 1
+        self._values = self._values[piece_run] + starts - self._keys[piece_run]
+        self._keys = starts
+        self._lengths = stops - starts
+        self._len = int(self._lengths.sum())
+        return found
+
+    def _remove(self, start, stop):
+        "Remove the keys in [start, stop)"
+        keys = self._keys
+        ends = keys + self._lengths
+        hit = (keys < stop) & (ends > start)
+        if not np.any(hit):
+            return
+        # parts of the runs kept before start and after stop
+        before = hit & (keys < start)
+        after = hit & (ends > stop)
+        keep = ~hit
+        new_keys = [keys[keep], keys[before], np.full(np.count_nonzero(after),
+                                                      stop, dtype=np.int64)]
+        new_values = [self._values[keep], self._values[before],
+                      self._values[after] + stop - keys[after]]
+        new_lengths = [self._lengths[keep], start - keys[before],
+                       ends[after] - stop]
+        keys = np.concatenate(new_keys)
+        order = np.argsort(keys, kind='mergesort')
+        self._keys = keys[order]
+        self._values = np.concatenate(new_values)[order]
+        self._lengths = np.concatenate(new_lengths)[order]
+        self._len = int(self._lengths.sum())
+
+    def items(self):
+        "Return the arrays of all the keys and values"
+        total = self._len
+        if total == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return (empty, empty)
+        offsets = np.arange(total, dtype=np.int64)
+        firsts = np.cumsum(self._lengths) - self._lengths
+        offsets -= np.repeat(firsts, self._lengths)
+        keys = np.repeat(self._keys, self._lengths) + offsets
+        values = np.repeat(self._values, self._lengths) + offsets
+        return (keys, values)
+
+    def to_intdict(self):
+        "Return an IntDict with the same contents"
+        (keys, values) = self.items()
+        return IntDict(keys, values)
+
+
+def id_index(keys, values):
+    """
+    Return a RunIndex mapping the keys to the values, or an IntDict if
+    the keys are too fragmented.
+    """
+    index = RunIndex(keys, values)
+    if index.fragmented():
+        return index.to_intdict()
+    return index
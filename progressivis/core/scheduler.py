@@ -15,8 +15,8 @@ class Scheduler(BaseScheduler):
 
     Manage the execution of the progressive workflow in its own thread.
     """
-    def __init__(self):
-        super(Scheduler, self).__init__()
+    def __init__(self, interaction_latency=1, policy=None, allocator=None):
+        super(Scheduler, self).__init__(interaction_latency, policy, allocator)
         self.thread = None
         #self._thread_parent = None
         self.thread_name = "Progressive Scheduler"
@@ -0,0 +1,135 @@
+"""
+Asyncio Scheduler, runs the progressive modules as a task of an event loop.
+"""
+from __future__ import absolute_import, division, print_function
+
+import logging
+import asyncio
+from inspect import isawaitable
+
+from .scheduler_base import BaseScheduler, IDLE_SLEEP
+from .utils import ProgressiveError, RLock
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['AsyncScheduler']
+
+
+class AsyncScheduler(BaseScheduler):
+    """
+    Scheduler running the modules in a task of an asyncio event loop.
+
+    Modules can define `run_step` as a coroutine function, e.g. to read
+    from the network; the scheduler awaits it, letting the other tasks of
+    the loop run in the meantime. The scheduler lock is only held while
+    the module computes, not while it awaits.
+    """
+    def __init__(self, interaction_latency=1, policy=None, allocator=None):
+        super(AsyncScheduler, self).__init__(interaction_latency, policy, allocator)
+        self.task = None
+        self._loop = None
+        self._resumed = None
+
+    def create_lock(self):
+        return RLock()
+
+    def start(self, tick_proc=None, idle_proc=None, loop=None):
+        """Start the scheduler as a task of the specified event loop, or of
+        the current one, and return the task."""
+        if self.task is not None:
+            raise ProgressiveError('Scheduler already started')
+        if tick_proc:
+            assert callable(tick_proc)
+            self._tick_procs = [tick_proc]
+        else:
+            self._tick_procs = []
+        if idle_proc:
+            assert callable(idle_proc)
+            self._idle_procs = [idle_proc]
+        else:
+            self._idle_procs = []
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        self.task = loop.create_task(self.arun())
+        return self.task
+
+    def run(self):
+        "Run the modules until the scheduler stops, in the current event loop."
+        asyncio.get_event_loop().run_until_complete(self.arun())
+
+    async def arun(self):
+        "Coroutine running the modules until the scheduler stops."
+        self._loop = asyncio.get_event_loop()
+        self._resumed = asyncio.Event()
+        self._start_loop()
+        await self._run_loop()
+        self._end_loop()
+
+    async def _run_loop(self):
+        """Main scheduler loop."""
+        for module in self._next_module():
+            if module is None: # nothing to run in the last pass
+                await self._pause()
+                continue
+            if not self._consider_module(module):
+                self._woken.add(module.name) # keep it for later
+                continue
+            state = module.state
+            if not (module.is_ready() or self.has_input()):
+                self._module_visited(module, state, False)
+                continue
+            self._run_number += 1
+            with self.lock:
+                self._run_tick_procs()
+            await self._run_module(module, self._run_number)
+            self._module_visited(module, state, True)
+            await asyncio.sleep(0) # let the other tasks run
+
+    async def _run_module(self, module, run_number):
+        from .module import Module
+        if type(module).run is not Module.run:
+            # the module needs its own run method
+            with self.lock:
+                module.run(run_number)
+            return
+        steps = module.run_steps(run_number)
+        send, value = steps.send, None
+        while True:
+            with self.lock:
+                try:
+                    value = send(value)
+                except StopIteration:
+                    return
+            send = steps.send
+            if isawaitable(value):
+                # pylint: disable=broad-except
+                try:
+                    value = await value
+                except Exception as exc:
+                    send, value = steps.throw, exc
+
+    async def _pause(self):
+        if not self._idle:
+            logger.info('sleeping %f', IDLE_SLEEP)
+            await asyncio.sleep(IDLE_SLEEP)
+            return
+        self._idle = False
+        with self._hibernate_cond:
+            if not self._can_hibernate():
+                return
+            self._resumed.clear()
+            delay = self._timer_delay()
+        logger.info('hibernating')
+        try:
+            await asyncio.wait_for(self._resumed.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def _notify_loop(self):
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._resumed.set)
+
+    def done(self):
+        self.task = None
+        self._loop = None
@@ -5,6 +5,7 @@ from __future__ import absolute_import, division, print_function
 import time
 import logging
 import functools
+import heapq
 from copy import copy
 #from collections import deque
 from collections import Iterable
@@ -12,21 +13,21 @@ from timeit import default_timer
 from uuid import uuid4
 import six
 
-from scipy.sparse import csr_matrix
-from scipy.sparse.csgraph import shortest_path
-import numpy as np
 
 
 from .utils import ProgressiveError, AttributeDict, FakeLock, Condition
 from .synchronized import synchronized
-from .toposort import toposort
+from .dag import IncrementalDAG
+from .scheduling_policy import SchedulingPolicy
+from .step_allocator import StepAllocator
+from .timeline import Timeline
 
 
 logger = logging.getLogger(__name__)
 
 __all__ = ['BaseScheduler']
 
-KEEP_RUNNING = 5
+IDLE_SLEEP = 0.2
 
 class _InteractionOpts(object):
     def __init__(self, starving_mods=None, max_time=None, max_iter=None):
@@ -46,7 +47,7 @@ class BaseScheduler(object):
         "Return the specified scheduler of, in None, the default one."
         return scheduler or cls.default
 
-    def __init__(self, interaction_latency=1):
+    def __init__(self, interaction_latency=1, policy=None, allocator=None):
         if interaction_latency <= 0:
             raise ProgressiveError('Invalid interaction_latency, '
                                    'should be strictly positive: %s'% interaction_latency)
@@ -69,16 +70,72 @@ class BaseScheduler(object):
         self._new_modules_ids = []
         self._slots_updated = False
         self._run_list = []
-        self._run_index = 0
+        self._woken = set()
+        self._polled = []
+        self._pass_queue = []
+        self._pass_names = set()
+        self._current_priority = None
+        self._has_terminated = False
+        self._idle = False
         self._module_selection = None
         self._selection_target_time = -1
         self.interaction_latency = interaction_latency
-        self._reachability = {}
+        self._graph = IncrementalDAG()
         self._start_inter = 0
         self._inter_cycles_cnt = 0
         self._interaction_opts = None
         self._hibernate_cond = Condition()
-        self._keep_running = KEEP_RUNNING
+        self._wakeup_pending = False
+        self._timers = []
+        self._timer_count = 0
+        self._policy = None
+        self.policy = policy
+        self._allocator = None
+        self.allocator = allocator
+        self.timeline = None
+
+    @property
+    def policy(self):
+        "Return the scheduling policy"
+        return self._policy
+
+    @policy.setter
+    def policy(self, policy):
+        "Set the scheduling policy, the default one if None"
+        if policy is None:
+            policy = SchedulingPolicy()
+        policy.attach(self)
+        self._policy = policy
+        if self._runorder is not None:
+            policy.dataflow_changed()
+
+    @property
+    def allocator(self):
+        "Return the step allocator"
+        return self._allocator
+
+    @allocator.setter
+    def allocator(self, allocator):
+        "Set the step allocator, the default one if None"
+        if allocator is None:
+            allocator = StepAllocator()
+        allocator.attach(self)
+        self._allocator = allocator
+
+    def record_timeline(self, capacity=100000):
+        """Start recording the runs and steps of the modules in a
+        `Timeline`, keeping the last `capacity` events, and return it."""
+        if self.timeline is None:
+            self.timeline = Timeline(capacity)
+        return self.timeline
+
+    def save_timeline(self, filename):
+        """Save the recorded timeline in a json file in the Chrome Trace
+        Event format, read by chrome://tracing and Perfetto."""
+        if self.timeline is None:
+            raise ProgressiveError('No timeline recorded, '
+                                   'call record_timeline first')
+        self.timeline.save(filename, name='scheduler %s' % self.name)
 
     def set_interaction_opts(self, starving_mods=None, max_time=None, max_iter=None):
         if starving_mods:
@@ -174,7 +231,7 @@ class BaseScheduler(object):
             return set()
         # collect all modules reachable from the modified inputs
         for i in inputs:
-            reachable.update(self._reachability[i])
+            reachable.update(self.reachability(i))
         all_vis = self.get_visualizations()
         reachable_vis = reachable.intersection(all_vis)
         if reachable_vis:
@@ -183,79 +240,35 @@ class BaseScheduler(object):
         return None
 
     def order_modules(self):
-        """Compute a topological order for the modules.
-        Should do something smarted with exceptions.
+        """Return a topological order for the modules, maintained by the
+        graph as modules and slots are added or removed.
         """
-        runorder = None
-        try:
-            dependencies = self._collect_dependencies()
-            runorder = toposort(dependencies)
-            #print('normal order of', dependencies, 'is', runorder, file=sys.stderr)
-            self._compute_reachability(dependencies)
-        except ValueError:  # cycle, try to break it then
-            # if there's still a cycle, we cannot run the first cycle
-            # TODO fix this
-            logger.info('Cycle in module dependencies, '
-                        'trying to drop optional fields')
-            dependencies = self._collect_dependencies(only_required=True)
-            runorder = toposort(dependencies)
-            #print('Filtered order of', dependencies, 'is', runorder, file=sys.stderr)
-            self._compute_reachability(dependencies)
-        return runorder
+        return self._graph.order()
+
+    def dependencies(self):
+        """Return the dependencies used to compute the current run order,
+        as a dictionary associating each module name to the set of
+        the names of the modules it depends on.
+        """
+        graph = self._graph
+        return {name: graph.predecessors(name) for name in graph.vertices()}
+
+    def reachability(self, name):
+        """Return the names of the modules reachable from the specified one
+        that lead to a visualization.
+        """
+        return self._graph.reachable(name)
 
     @synchronized
     def _collect_dependencies(self, only_required=False):
         dependencies = {}
         for (mid, module) in six.iteritems(self._modules):
-            if not module.is_valid():
-                continue
             outs = [m.output_module.name for m in module.input_slot_values()
                     if m and (not only_required or
                               module.input_slot_required(m.input_name))]
             dependencies[mid] = set(outs)
         return dependencies
 
-    def _compute_reachability(self, dependencies):
-        # pylint: disable=too-many-locals
-        k = list(dependencies.keys())
-        size = len(k)
-        index = dict(zip(k, range(size)))
-        row = []
-        col = []
-        data = []
-        for (vertex1, vertices) in six.iteritems(dependencies):
-            for vertex2 in vertices:
-                col.append(index[vertex1])
-                row.append(index[vertex2])
-                data.append(1)
-        mat = csr_matrix((data, (row, col)), shape=(size, size))
-        dist = shortest_path(mat,
-                             directed=True,
-                             return_predecessors=False,
-                             unweighted=True)
-        self._reachability = {}
-        reach_no_vis = set()
-        all_vis = set(self.get_visualizations())
-        for index1 in range(size):
-            vertex1 = k[index1]
-            s = {vertex1}
-            for index2 in range(size):
-                vertex2 = k[index2]
-                dst = dist[index1, index2]
-                if dst != 0 and dst != np.inf:
-                    s.add(vertex2)
-            self._reachability[vertex1] = s
-            if not all_vis.intersection(s):
-                logger.info('No visualization after module %s: %s', vertex1, s)
-                reach_no_vis.update(s)
-                if not self.module[vertex1].is_visualization():
-                    reach_no_vis.add(vertex1)
-        logger.info('Module(s) %s always after visualizations', reach_no_vis)
-        # filter out module that reach no vis
-        for (k, v) in six.iteritems(self._reachability):
-            v.difference_update(reach_no_vis)
-        logger.info('reachability map: %s', self._reachability)
-
     @staticmethod
     def _module_order(x, y):
         if 'order' in x:
@@ -361,22 +374,46 @@ class BaseScheduler(object):
         assert callable(idle_proc)
         self._idle_procs.remove(idle_proc)
 
-    def slots_updated(self):
-        "Set by slot when it has been correctly updated"
+    def slots_updated(self, slot=None):
+        """Set by slot when it has been correctly updated, adding the
+        dependency between its modules to the graph."""
         self._slots_updated = True
+        if slot is None:
+            return
+        try:
+            self._graph.add_edge(slot.output_module.name,
+                                 slot.input_module.name)
+        except ValueError:  # cycle, try to break it then
+            # if there's still a cycle, we cannot run the first cycle
+            # TODO fix this
+            logger.info('Cycle in module dependencies, '
+                        'trying to drop optional fields')
+            dependencies = self._collect_dependencies(only_required=True)
+            self._graph.clear()
+            self._graph.update(dependencies, set(self.get_visualizations()))
 
     def run(self):
         "Run the modules, called by start()."
+        self._start_loop()
+        self._run_loop()
+        self._end_loop()
+
+    def _start_loop(self):
         self._stopped = False
         self._running = True
         self._start = default_timer()
         self._before_run()
 
-        self._run_loop()
-
+    def _end_loop(self):
         modules = [self.module[m] for m in self._runorder]
+        stores = []
         for module in reversed(modules):
             module.ending()
+            store = module.save_cost_model()
+            if store is not None and store not in stores:
+                stores.append(store)
+        for store in stores:
+            store.save()
         self._running = False
         self._stopped = True
         self.done()
@@ -385,56 +422,209 @@ class BaseScheduler(object):
         """Main scheduler loop."""
         # pylint: disable=broad-except
         for module in self._next_module():
-            if self.no_more_data() and self.all_blocked() and self.is_waiting_for_input():
-                if not self._keep_running:
-                    with self._hibernate_cond:
-                        self._hibernate_cond.wait()
-            if self._keep_running: self._keep_running -= 1
-            if not (self._consider_module(module) and (module.is_ready() or self.has_input())):
+            if module is None: # nothing to run in the last pass
+                self._pause()
+                continue
+            if not self._consider_module(module):
+                self._woken.add(module.name) # keep it for later
+                continue
+            state = module.state
+            if not (module.is_ready() or self.has_input()):
+                self._module_visited(module, state, False)
                 continue
             self._run_number += 1
             with self.lock:
                 self._run_tick_procs() 
                 module.run(self._run_number)
+            self._module_visited(module, state, True)
+
+    def _pause(self):
+        """Pause between two passes. When all the modules are blocked, wait
+        without consuming CPU until a module is woken up, an input arrives,
+        a timer expires or the scheduler is stopped. Otherwise, when no
+        module could run, sleep a little.
+        The idle condition is computed once per pass, in `_end_of_modules`.
+        """
+        if not self._idle:
+            logger.info('sleeping %f', IDLE_SLEEP)
+            time.sleep(IDLE_SLEEP)
+            return
+        self._idle = False
+        with self._hibernate_cond:
+            if self._can_hibernate():
+                logger.info('hibernating')
+                self._hibernate_cond.wait(self._timer_delay())
+
+    def _can_hibernate(self):
+        # called with the hibernation condition held
+        return not (self._wakeup_pending or self._woken or self._stopped or
+                    self._tick_once_procs or self._new_module_available())
+
+    def _notify_loop(self):
+        # called with the hibernation condition held
+        self._hibernate_cond.notify()
+
+    def _is_idle(self):
+        # Modules that are not polled and not woken up are blocked
+        from .module import Module
+        if self._woken or not self._run_list: # done otherwise
+            return False
+        for m in self._polled:
+            if m.state != Module.state_blocked:
+                return False
+            if not (m.is_input() or m.has_any_input()):
+                return False # source modules are always ready
+        return True
+
+    def _switch_input_mode(self, input_mode):
+        """Enter or leave the interactive mode, returning the new mode."""
+        if input_mode: # end input mode
+            print('Ending interactive mode after', default_timer()-self._start_inter)
+            self._start_inter = 0
+            self._inter_cycles_cnt = 0
+            return False
+        self._start_inter = default_timer()
+        print('Starting interactive mode at', self._start_inter)
+        return True
 
     def _next_module(self):
         """Yields a possibly infinite sequence of modules.
+        Only the modules that have been woken up, that are not blocked, or
+        that need polling are visited in each pass, in topological order.
         Handles order recomputation and starting logic if needed.
+        Yields None at the end of a pass when nothing has run, the caller
+        should pause before the next pass.
         """
-        self._run_index = 0
         first_run = self._run_number
         input_mode = self.has_input()
         self._start_inter = 0
         self._inter_cycles_cnt = 0
+        self._start_pass()
         while not self._stopped:
             # Apply changes in the dataflow
             if self._new_module_available():
                 self._update_modules()
-                self._run_index = 0
+                self._start_pass()
                 first_run = self._run_number
             # If run_list empty, we're done
             if not self._run_list:
                 break
             # Check for interactive input mode
             if input_mode != self.has_input():
-                if input_mode: # end input mode
-                    print('Ending interactive mode after', default_timer()-self._start_inter)
-                    self._start_inter = 0
-                    self._inter_cycles_cnt = 0
-                    input_mode = False
-                else:
-                    self._start_inter = default_timer()
-                    print('Starting interactive mode at', self._start_inter)
-                    input_mode = True
+                input_mode = self._switch_input_mode(input_mode)
                 # Restart from beginning
-                self._run_index = 0
+                self._start_pass()
                 first_run = self._run_number
-            module = self._run_list[self._run_index]
-            self._run_index += 1 # allow it to be reset
-            yield module
-            if self._run_index >= len(self._run_list): # end of modules
-                self._end_of_modules(first_run)
+            if not self._pass_queue: # end of modules
+                self._current_priority = None
+                if self._end_of_modules(first_run):
+                    yield None
                 first_run = self._run_number
+                self._start_pass()
+                continue
+            priority, name = heapq.heappop(self._pass_queue)
+            module = self._modules.get(name)
+            if module is None: # removed in the meantime
+                continue
+            self._current_priority = priority
+            yield module
+        self._current_priority = None
+
+    def _pass_modules(self):
+        "Return the modules to visit in the next pass."
+        self._run_timers()
+        with self._hibernate_cond:
+            names, self._woken = self._woken, set()
+            self._wakeup_pending = False
+        names.update(m.name for m in self._polled)
+        if self.has_input():
+            names.update(self._module_selection)
+        modules = []
+        for name in names:
+            module = self._modules.get(name)
+            if module is not None and module.order is not None:
+                modules.append(module)
+        return modules
+
+    def _start_pass(self):
+        # modules not visited yet when restarting stay scheduled
+        self._woken.update(name for (_, name) in self._pass_queue)
+        self.policy.start_pass()
+        priority = self.policy.priority
+        modules = self._pass_modules()
+        self.allocator.start_cycle(modules)
+        queue = [(priority(m), m.name) for m in modules]
+        heapq.heapify(queue)
+        self._pass_queue = queue
+        self._pass_names = set(name for (_, name) in queue)
+
+    def wake(self, module):
+        """Notify the scheduler that the module may have some work to do,
+        it will be visited in the next pass.
+        Can be called from any thread, the scheduler stops hibernating.
+        """
+        with self._hibernate_cond:
+            self._woken.add(module.name)
+            self._wakeup_pending = True
+            self._notify_loop()
+
+    def call_later(self, delay, proc):
+        """Call `proc(scheduler, run_number)` in the scheduler loop after
+        `delay` seconds, even if the scheduler is hibernating.
+        """
+        assert callable(proc)
+        with self._hibernate_cond:
+            heapq.heappush(self._timers, (default_timer()+delay,
+                                          self._timer_count, proc))
+            self._timer_count += 1
+            self._notify_loop() # the hibernation delay may change
+
+    def _timer_delay(self):
+        "Return the delay before the next timer expires, or None"
+        if not self._timers:
+            return None
+        return max(0, self._timers[0][0] - default_timer())
+
+    def _run_timers(self):
+        #pylint: disable=broad-except
+        now = default_timer()
+        while self._timers and self._timers[0][0] <= now:
+            with self._hibernate_cond:
+                _, _, proc = heapq.heappop(self._timers)
+            try:
+                proc(self, self._run_number)
+            except Exception as exc:
+                logger.warning(exc)
+
+    def _schedule(self, module):
+        # Visit the module in the current pass if it comes later in the order,
+        # in the next pass otherwise.
+        current = self._current_priority
+        if current is not None and module.order is not None:
+            priority = self.policy.priority(module)
+            if priority > current:
+                if module.name not in self._pass_names:
+                    self._pass_names.add(module.name)
+                    heapq.heappush(self._pass_queue, (priority, module.name))
+                return
+        self._woken.add(module.name)
+
+    def _module_visited(self, module, state, has_run):
+        """Update the modules to visit after the specified module has been
+        visited; its state was `state` before the visit.
+        """
+        from .module import Module
+        if has_run:
+            self.policy.module_ran(module, self.timer())
+        if (has_run or module.state != state) and module.name in self._graph:
+            for name in self._graph.successors(module.name):
+                if name in self._modules:
+                    self._schedule(self._modules[name])
+        if module.state == Module.state_terminated:
+            self._has_terminated = True
+        elif has_run or module.state != Module.state_blocked:
+            # check it again in the next pass
+            self._schedule(module)
 
     def _new_module_available(self):
         return self._new_modules_ids or self._slots_updated
@@ -459,7 +649,7 @@ class BaseScheduler(object):
         return True
     
     def _update_modules(self):
-        if self._new_modules_ids:
+        if self._new_module_available():
             # Make a shallow copy of the current run order;
             # if we cannot validate the new state, revert to the copy
             prev_run_list = copy(self._run_list)
@@ -474,18 +664,29 @@ class BaseScheduler(object):
                     module = self._modules[mid]
                     self._run_list.append(module)
                     module.order = i
+                self.policy.dataflow_changed()
             if not self.validate():
                 logger.error("Cannot validate progressive workflow,"
                              " reverting to previous")
                 self._run_list = prev_run_list
+            # The dataflow has changed, visit every module again
+            self._woken.update(m.name for m in self._run_list)
+            self._polled = [m for m in self._run_list if m.needs_polling()]
 
     def _end_of_modules(self, first_run):
+        """Called at the end of each pass, return True when nothing has run
+        or all the modules are blocked; the scheduler should then `_pause`
+        before the next pass."""
         # Reset interaction mode
         #import pdb;pdb.set_trace()
         self._proc_interaction_opts()
         self._selection_target_time = -1
-        new_list = [m for m in self._run_list if not m.is_terminated()]
-        self._run_list = new_list
+        if self._has_terminated:
+            self._has_terminated = False
+            new_list = [m for m in self._run_list if not m.is_terminated()]
+            self._run_list = new_list
+            self._polled = [m for m in self._polled if not m.is_terminated()]
+        self._idle = self._is_idle()
         if first_run == self._run_number: # no module ready
             has_run = False
             for proc in self._idle_procs:
@@ -497,11 +698,14 @@ class BaseScheduler(object):
                 except Exception as exc:
                     logger.error(exc)
             if not has_run:
-                logger.info('sleeping %f', 0.2)
-                time.sleep(0.2)
-        self._run_index = 0
+                return True
+        return self._idle
 
     def _run_tick_procs(self):
+        self._run_every_tick_procs()
+        self._run_tick_once_procs()
+
+    def _run_every_tick_procs(self):
         #pylint: disable=broad-except
         for proc in self._tick_procs:
             logger.debug('Calling tick_proc')
@@ -509,18 +713,25 @@ class BaseScheduler(object):
                 proc(self, self._run_number)
             except Exception as exc:
                 logger.warning(exc)
+
+    def _run_tick_once_procs(self):
+        #pylint: disable=broad-except
         for proc in self._tick_once_procs:
             try:
                 proc()
             except Exception as exc:
                 logger.warning(exc)
-            self._tick_once_procs = []
+        self._tick_once_procs = []
+
+    def _resume(self):
+        "Wake up the scheduler loop if it is hibernating"
+        with self._hibernate_cond:
+            self._wakeup_pending = True
+            self._notify_loop()
 
     def stop(self):
         "Stop the execution."
-        with self._hibernate_cond:
-            self._keep_running = KEEP_RUNNING
-            self._hibernate_cond.notify()
+        self._resume()
         self._stopped = True
 
     def is_running(self):
@@ -567,6 +778,7 @@ class BaseScheduler(object):
     def _add_module(self, module):
         self._new_modules_ids += [module.name]
         self._modules[module.name] = module
+        self._graph.add_vertex(module.name, module.is_visualization())
 
     @property
     def module(self):
@@ -585,6 +797,16 @@ class BaseScheduler(object):
 
     def _remove_module(self, module):
         del self._modules[module.name]
+        if module.profiler is not None:
+            module.profile(False)
+        for slot in module.input_slot_values():
+            if slot is not None:
+                slot.disconnect()
+        for slots in module.output_slot_values():
+            for slot in slots or ():
+                slot.disconnect()
+        if module.name in self._graph:
+            self._graph.remove_vertex(module.name)
 
     def modules(self):
         "Return the dictionary of modules."
@@ -603,10 +825,8 @@ class BaseScheduler(object):
         Notify this scheduler that the module has received input
         that should be served fast.
         """
-        with self._hibernate_cond:
-            self._keep_running = KEEP_RUNNING            
-            self._hibernate_cond.notify()
-        sel = self._reachability[module.name]
+        self._resume()
+        sel = self.reachability(module.name)
         if sel:
             if not self._module_selection:
                 logger.info('Starting input management')
@@ -649,14 +869,9 @@ class BaseScheduler(object):
         return max(0, self._selection_target_time - self.timer())
 
     def fix_quantum(self, module, quantum):
-        "Fix the quantum of the specified module"
-        if self.has_input() and module.name in self._module_selection:
-            quantum = self.time_left() / len(self._module_selection)
-        if quantum == 0:
-            quantum = 0.1
-            logger.info('Quantum is 0 in %s, setting it to'
-                        ' a reasonable value', module.name)
-        return quantum
+        """Fix the quantum of the specified module, as decided by the policy
+        and the step allocator"""
+        return self.allocator.quantum(module, self.policy.quantum(module, quantum))
 
     def close_all(self):
         for m in self.modules().values():
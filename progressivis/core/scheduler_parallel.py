@@ -0,0 +1,218 @@
+"""
+Parallel Scheduler, runs independent modules concurrently on a thread pool.
+"""
+from __future__ import absolute_import, division, print_function
+
+import logging
+import heapq
+from collections import defaultdict
+from multiprocessing import cpu_count
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import six
+
+from .scheduler import Scheduler
+from .utils import ProgressiveError
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['ParallelScheduler']
+
+
+class ParallelScheduler(Scheduler):
+    """
+    Scheduler running the modules whose inputs are ready on a pool of
+    worker threads.
+
+    Each pass over the modules to visit is executed as a wavefront following
+    the module dependencies: a module is submitted once all the modules it
+    depends on have run (or have been skipped) in the current pass, so
+    producers and consumers never run at the same time, while independent
+    branches of the dataflow do. Modules ready at the same time are
+    submitted in the order given by the scheduling policy. Each module run still gets its own
+    run number and is limited by its own quantum.
+    """
+    def __init__(self, max_workers=None, interaction_latency=1, policy=None,
+                 allocator=None):
+        super(ParallelScheduler, self).__init__(interaction_latency, policy,
+                                                allocator)
+        if max_workers is None:
+            max_workers = cpu_count()
+        if max_workers <= 0:
+            raise ProgressiveError('Invalid max_workers, '
+                                   'should be strictly positive: %s'% max_workers)
+        self.max_workers = max_workers
+        self.thread_name = "Progressive Parallel Scheduler"
+        self._wavefront = None
+
+    def _run_loop(self):
+        """Main scheduler loop, one wavefront per pass over the modules."""
+        input_mode = self.has_input()
+        self._start_inter = 0
+        self._inter_cycles_cnt = 0
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while not self._stopped:
+                if self._new_module_available():
+                    self._update_modules()
+                if not self._run_list:
+                    break
+                if input_mode != self.has_input():
+                    input_mode = self._switch_input_mode(input_mode)
+                with self.lock:
+                    # one-shot procs can change the dataflow, only run
+                    # them when no module is running.
+                    self._run_tick_once_procs()
+                first_run = self._run_number
+                self._run_pass(executor)
+                if self._end_of_modules(first_run):
+                    self._pause()
+        finally:
+            executor.shutdown(wait=True)
+
+    def _run_pass(self, executor):
+        self.policy.start_pass()
+        modules = self._pass_modules()
+        self.allocator.start_cycle(modules)
+        wavefront = _Wavefront(self, modules)
+        self._wavefront = wavefront
+        running = {}
+        error = None
+        try:
+            while wavefront.ready or running:
+                while (wavefront.ready and len(running) < self.max_workers
+                       and error is None and not self._stopped):
+                    module = wavefront.pop()
+                    if not self._consider_module(module):
+                        self._woken.add(module.name) # keep it for later
+                        wavefront.settle(module)
+                        continue
+                    state = module.state
+                    if not (module.is_ready() or self.has_input()):
+                        self._module_visited(module, state, False)
+                        wavefront.settle(module)
+                        continue
+                    with self.lock:
+                        self._run_number += 1
+                        run_number = self._run_number
+                        self._run_every_tick_procs()
+                    future = executor.submit(self._run_module, module, run_number)
+                    running[future] = (module, state)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    module, state = running.pop(future)
+                    exc = future.exception()
+                    if exc is not None:
+                        logger.error('Module %s failed in parallel run', module.name)
+                        if error is None:
+                            error = exc
+                    else:
+                        self._module_visited(module, state, True)
+                    wavefront.settle(module)
+        finally:
+            self._wavefront = None
+        if error is not None:
+            raise error
+
+    def _schedule(self, module):
+        # Modules woken up during a pass join it when it is safe
+        if self._wavefront is not None and self._wavefront.add(module):
+            return
+        self._woken.add(module.name)
+
+    @staticmethod
+    def _run_module(module, run_number):
+        with module.lock:
+            module.run(run_number)
+
+
+class _Wavefront(object):
+    """
+    Modules to visit in a pass of the ParallelScheduler, released when all
+    the modules they depend on in the pass have been visited.
+    """
+    def __init__(self, scheduler, modules):
+        self.scheduler = scheduler
+        self.graph = scheduler._graph  # pylint: disable=protected-access
+        self.priority = scheduler.policy.priority
+        self.pending = {m.name: m for m in modules}
+        self.waiting = {}
+        self.successors = defaultdict(list)
+        self.started = set()
+        self.settled = set()
+        for name in self.pending:
+            count = 0
+            for dep in self._dependencies(name):
+                if dep in self.pending:
+                    count += 1
+                    self.successors[dep].append(name)
+            self.waiting[name] = count
+        self.ready = [(self.priority(self.pending[name]), name)
+                      for (name, count) in six.iteritems(self.waiting)
+                      if count == 0]
+        heapq.heapify(self.ready)
+
+    def add(self, module):
+        """Add a module woken up during the pass, returning False if it
+        cannot be visited in this pass anymore."""
+        name = module.name
+        if name in self.pending:
+            return name not in self.started
+        if module.order is None:
+            return False
+        if self._has_pending_successor(name):
+            return False
+        count = 0
+        for dep in self._dependencies(name):
+            if dep in self.pending and dep not in self.settled:
+                count += 1
+                self.successors[dep].append(name)
+        self.pending[name] = module
+        self.waiting[name] = count
+        if count == 0:
+            heapq.heappush(self.ready, (self.priority(module), name))
+        return True
+
+    def _dependencies(self, name):
+        if name not in self.graph:
+            return ()
+        return self.graph.predecessors(name)
+
+    def _has_pending_successor(self, name):
+        # A module cannot run after or concurrently with one of the modules
+        # depending on it
+        graph = self.graph
+        if name not in graph:
+            return False
+        for succ in graph.successors(name):
+            if succ in self.pending and succ not in self.settled:
+                return True
+        if not self.started:
+            return False
+        visited = {name}
+        stack = [name]
+        while stack:
+            for succ in graph.successors(stack.pop()):
+                if succ in self.started:
+                    return True
+                if succ not in visited:
+                    visited.add(succ)
+                    stack.append(succ)
+        return False
+
+    def pop(self):
+        "Return the next module ready to be visited"
+        _, name = heapq.heappop(self.ready)
+        self.started.add(name)
+        return self.pending[name]
+
+    def settle(self, module):
+        "Mark a module as visited, releasing its successors."
+        name = module.name
+        self.settled.add(name)
+        for succ in self.successors.pop(name, ()):
+            self.waiting[succ] -= 1
+            if self.waiting[succ] == 0:
+                priority = self.priority(self.pending[succ])
+                heapq.heappush(self.ready, (priority, succ))
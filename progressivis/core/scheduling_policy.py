@@ -0,0 +1,205 @@
+"""
+Scheduling policies, deciding in which order the scheduler visits the
+modules of a pass and how long each module can run.
+"""
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+import six
+
+from .utils import ProgressiveError
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['SchedulingPolicy', 'EarliestDeadlineFirst']
+
+
+class SchedulingPolicy(object):
+    """
+    Default scheduling policy: modules are visited in topological order and
+    run for their own quantum, except in input mode where the modules
+    selected by the input share the time left before the interaction
+    latency expires.
+    """
+    def __init__(self):
+        self.scheduler = None
+
+    def attach(self, scheduler):
+        "Called when the policy is set on a scheduler"
+        self.scheduler = scheduler
+
+    def dataflow_changed(self):
+        "Called when the modules or their connections have changed"
+        pass
+
+    def start_pass(self):
+        "Called before computing the modules to visit in a pass"
+        pass
+
+    def priority(self, module):
+        """Return the key ordering the visits of the modules in a pass.
+        A module should never come before the modules it depends on."""
+        # pylint: disable=no-self-use
+        return module.order
+
+    def quantum(self, module, quantum):
+        "Return the time the module can run, given its own quantum"
+        sched = self.scheduler
+        selection = sched._module_selection  # pylint: disable=protected-access
+        if sched.has_input() and module.name in selection:
+            quantum = sched.time_left() / len(selection)
+        if quantum == 0:
+            quantum = 0.1
+            logger.info('Quantum is 0 in %s, setting it to'
+                        ' a reasonable value', module.name)
+        return quantum
+
+    def module_ran(self, module, now):
+        "Called after a module has run, `now` is the scheduler time"
+        pass
+
+    def stats(self):
+        "Return a dictionary describing how well the policy is doing"
+        # pylint: disable=no-self-use
+        return {}
+
+
+class EarliestDeadlineFirst(SchedulingPolicy):
+    """
+    Scheduling policy trying to refresh every visualization within the
+    interaction latency of the scheduler.
+
+    When a module feeding a visualization runs, the visualization should
+    be refreshed before `interaction_latency` seconds. Each module is given
+    the earliest deadline of the visualizations it feeds and modules are
+    visited by increasing deadline. A module on a path to a visualization
+    gets a share of the time left before its deadline, split among the
+    modules remaining on the path, and modules feeding no visualization
+    run with a fraction `background_share` of their quantum.
+    The refreshes of each visualization and the deadlines missed are
+    reported by `stats`.
+    """
+    def __init__(self, background_share=0.25, min_quantum=0.01):
+        super(EarliestDeadlineFirst, self).__init__()
+        if not 0 < background_share <= 1:
+            raise ProgressiveError('Invalid background_share, should be '
+                                   'in ]0, 1]: %s' % background_share)
+        if min_quantum <= 0:
+            raise ProgressiveError('Invalid min_quantum, '
+                                   'should be strictly positive: %s' % min_quantum)
+        self.background_share = background_share
+        self.min_quantum = min_quantum
+        self._targets = {}
+        self._stages = {}
+        self._visualizations = set()
+        self._pending_since = {}
+        self._deadlines = {}
+        self._priorities = {}
+        self._stats = {}
+
+    def dataflow_changed(self):
+        sched = self.scheduler
+        graph = sched._graph  # pylint: disable=protected-access
+        self._visualizations = set(sched.get_visualizations())
+        targets = {}
+        stages = {}
+        # visualizations fed by each module and number of modules
+        # on the longest path leading to one of them
+        for name in reversed(graph.order()):
+            tgts = set()
+            stage = 0
+            for succ in graph.successors(name):
+                if succ in targets:
+                    tgts.update(targets[succ])
+                    stage = max(stage, stages[succ])
+            if name in self._visualizations:
+                tgts.add(name)
+            if tgts:
+                targets[name] = frozenset(tgts)
+                stages[name] = stage + 1
+        self._targets = targets
+        self._stages = stages
+        for name in list(self._pending_since):
+            if name not in self._visualizations:
+                del self._pending_since[name]
+        for name in self._visualizations:
+            self._pending_since.setdefault(name, None)
+            self._stats.setdefault(name, {'refreshes': 0, 'misses': 0,
+                                          'max_delay': 0.0,
+                                          'last_refresh': None})
+        self._priorities = {}
+
+    def start_pass(self):
+        now = self.scheduler.timer()
+        latency = self.scheduler.interaction_latency
+        self._deadlines = {}
+        for (name, since) in six.iteritems(self._pending_since):
+            self._deadlines[name] = (now if since is None else since) + latency
+        self._priorities = {}
+
+    def deadline(self, module):
+        """Return the time at which the module should have run for all the
+        visualizations it feeds to be refreshed in time, or None if
+        it feeds no visualization."""
+        sched = self.scheduler
+        selection = sched._module_selection  # pylint: disable=protected-access
+        if sched.has_input() and module.name in selection:
+            return sched._selection_target_time  # pylint: disable=protected-access
+        targets = self._targets.get(module.name)
+        if not targets:
+            return None
+        now = sched.timer()
+        latency = sched.interaction_latency
+        return min(self._deadlines.get(name, now + latency) for name in targets)
+
+    def priority(self, module):
+        # A producer feeds all the visualizations fed by its consumers so its
+        # deadline is never later, ties are broken by the topological order
+        prio = self._priorities.get(module.name)
+        if prio is None:
+            deadline = self.deadline(module)
+            prio = (float('inf') if deadline is None else deadline, module.order)
+            self._priorities[module.name] = prio
+        return prio
+
+    def quantum(self, module, quantum):
+        sched = self.scheduler
+        selection = sched._module_selection  # pylint: disable=protected-access
+        if sched.has_input() and module.name in selection:
+            return super(EarliestDeadlineFirst, self).quantum(module, quantum)
+        deadline = self.deadline(module)
+        if deadline is None:
+            quantum *= self.background_share
+        else:
+            slack = deadline - sched.timer()
+            quantum = min(quantum, slack / self._stages[module.name])
+        return max(quantum, self.min_quantum)
+
+    def module_ran(self, module, now):
+        name = module.name
+        if name in self._visualizations:
+            stats = self._stats[name]
+            since = self._pending_since[name]
+            if since is not None:
+                delay = now - since
+                if delay > self.scheduler.interaction_latency:
+                    stats['misses'] += 1
+                    logger.info('Visualization %s refreshed late by %f s', name,
+                                delay - self.scheduler.interaction_latency)
+                stats['max_delay'] = max(stats['max_delay'], delay)
+            stats['refreshes'] += 1
+            stats['last_refresh'] = now
+            self._pending_since[name] = None
+        # new data is flowing toward the visualizations fed by the module
+        for target in self._targets.get(name, ()):
+            if target != name and self._pending_since.get(target, 0) is None:
+                self._pending_since[target] = now
+
+    def stats(self):
+        """Return a dictionary associating each visualization with its number
+        of refreshes, of refreshes later than the interaction latency,
+        the maximum delay between new data and a refresh, and the time of
+        its last refresh."""
+        return {name: dict(stats) for (name, stats) in six.iteritems(self._stats)
+                if name in self._visualizations}
@@ -33,6 +33,7 @@ class Slot(object):
         self.changes = None
         self._manage_columns = None
         self._last_columns = None
+        self._data_changes = None
 
     def name(self):
         "Return the unique name of that slot"
@@ -53,6 +54,16 @@ class Slot(object):
         "Return a context manager locking this slot for multi-threaded access"
         return self.input_module.lock
 
+    def data_changed(self):
+        """Called when the data of the slot has changed. Changes made outside
+        of a run of the output module, e.g. from another thread, wake up
+        both ends of the slot."""
+        if self.output_module.is_running():
+            return
+        scheduler = self.scheduler()
+        scheduler.wake(self.output_module)
+        scheduler.wake(self.input_module)
+
     def __str__(self):
         return six.u('%s(%s[%s]->%s[%s])' % (self.__class__.__name__,
                                              self.output_module.name,
@@ -87,15 +98,22 @@ class Slot(object):
         # pipeline from a valid state to another are executed atomically
         with scheduler.lock:
             # pylint: disable=protected-access
-            scheduler.slots_updated()
-
             self.output_module._connect_output(self)
             prev_slot = self.input_module._connect_input(self)
             if prev_slot:
+                prev_slot.disconnect()
                 raise ProgressiveError('Input already connected for %s',
                                        six.u(self))
+            scheduler.slots_updated(self)
             scheduler.invalidate()
 
+    def disconnect(self):
+        """Stop listening to the changes of the data, so the slot and its
+        modules can be released"""
+        if self._data_changes is not None:
+            self._data_changes.remove_listener(self.data_changed)
+            self._data_changes = None
+
     def validate_types(self):
         "Validate the types of the endpoints connected through this slot"
         output_type = self.output_module.output_slot_type(self.output_name)
@@ -134,6 +152,10 @@ class Slot(object):
             self.changes = self.create_changes(buffer_created=buffer_created,
                                                buffer_updated=buffer_updated,
                                                buffer_deleted=buffer_deleted)
+            data_changes = getattr(self.data(), 'changes', None)
+            if hasattr(data_changes, 'add_listener'):
+                data_changes.add_listener(self.data_changed)
+                self._data_changes = data_changes
         if self._manage_columns is None:
             self._manage_columns = manage_columns
         if self.changes is None:
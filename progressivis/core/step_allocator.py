@@ -0,0 +1,156 @@
+"""
+Step allocators, splitting the time of a scheduler cycle among the modules
+and deciding the size of their steps.
+"""
+from __future__ import absolute_import, division, print_function
+
+import logging
+
+import six
+
+from .utils import ProgressiveError
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['StepAllocator', 'ThroughputAllocator']
+
+
+class StepAllocator(object):
+    """
+    Default step allocator: each module runs for its own quantum, in steps
+    of at most a third of its quantum sized by its time predictor.
+    """
+    def __init__(self):
+        self.scheduler = None
+
+    def attach(self, scheduler):
+        "Called when the allocator is set on a scheduler"
+        self.scheduler = scheduler
+
+    def start_cycle(self, modules):
+        "Called with the modules to visit at the beginning of each pass"
+        pass
+
+    def quantum(self, module, quantum):
+        """Return the time the module can run in this cycle, given the
+        quantum decided by the scheduling policy"""
+        # pylint: disable=no-self-use,unused-argument
+        return quantum
+
+    def step_size(self, module, remaining_time, quantum):
+        "Return the size of the next step of a module"
+        # pylint: disable=no-self-use
+        # TODO Forcing 3 steps, not sure, change when the predictor improves
+        return module.predict_step_size(min(quantum / 3.0, remaining_time))
+
+    def allocation(self):
+        """Return a dictionary associating the modules of the last cycle
+        with the time allocated to them"""
+        # pylint: disable=no-self-use
+        return {}
+
+
+class ThroughputAllocator(StepAllocator):
+    """
+    Split the time budget of a cycle among its modules according to the
+    work they have to do: the number of items buffered on their input
+    slots divided by the number of operations per second measured by
+    their predictor.
+
+    Each module gets at least `min_share` of an even split of the budget so
+    none is starved. Source modules share the rest like the others, unless
+    one of their consumers has more than `max_lag` seconds of work pending,
+    in which case they only get their minimal share. Steps are sized by the
+    predictors to fill the time allocated, without forcing three steps.
+    The budget defaults to the sum of the quanta of the modules of the
+    cycle and `max_lag` to the interaction latency of the scheduler.
+    Subclasses can change `demand` and `allocate`.
+    """
+    def __init__(self, budget=None, min_share=0.1, max_lag=None):
+        super(ThroughputAllocator, self).__init__()
+        if budget is not None and budget <= 0:
+            raise ProgressiveError('Invalid budget, '
+                                   'should be strictly positive: %s' % budget)
+        if not 0 <= min_share <= 1:
+            raise ProgressiveError('Invalid min_share, should be '
+                                   'in [0, 1]: %s' % min_share)
+        self.budget = budget
+        self.min_share = min_share
+        self.max_lag = max_lag
+        self._allocation = {}
+
+    @staticmethod
+    def throughput(module):
+        "Return the operations per second of a module, 0 if unknown"
+        return getattr(module.predictor, 'a', 0) or 0
+
+    @staticmethod
+    def backlog(module):
+        "Return the number of items created in the input slots of a module"
+        return sum(slot.created.length() for slot in module.input_slot_values()
+                   if slot is not None)
+
+    def lag(self, module):
+        "Return the time needed by a module to process its backlog"
+        throughput = self.throughput(module)
+        if throughput == 0:
+            return 0
+        return self.backlog(module) / throughput
+
+    def demand(self, module):
+        "Return the time a module would need in this cycle"
+        quantum = module.params.quantum
+        if not module.has_any_input():
+            max_lag = self.max_lag
+            if max_lag is None:
+                max_lag = self.scheduler.interaction_latency
+            graph = self.scheduler._graph  # pylint: disable=protected-access
+            consumers = graph.successors(module.name) if module.name in graph else ()
+            modules = self.scheduler.modules()
+            for name in consumers:
+                if name in modules and self.lag(modules[name]) > max_lag:
+                    logger.debug('Slowing down %s, %s lags behind',
+                                 module.name, name)
+                    return 0
+            return quantum
+        throughput = self.throughput(module)
+        backlog = self.backlog(module)
+        if throughput == 0:
+            return quantum if backlog else 0
+        return backlog / throughput
+
+    def allocate(self, demands, budget):
+        """Return a dictionary associating each module name with its share
+        of the budget, given the dictionary of their demands"""
+        if not demands:
+            return {}
+        floor = self.min_share * budget / len(demands)
+        rest = budget - floor * len(demands)
+        total = sum(six.itervalues(demands))
+        if total <= rest:
+            return {name: floor + demand
+                    for (name, demand) in six.iteritems(demands)}
+        return {name: floor + rest * demand / total
+                for (name, demand) in six.iteritems(demands)}
+
+    def start_cycle(self, modules):
+        budget = self.budget
+        if budget is None:
+            budget = sum(m.params.quantum for m in modules)
+        demands = {m.name: self.demand(m) for m in modules}
+        self._allocation = self.allocate(demands, budget)
+
+    def quantum(self, module, quantum):
+        if self.scheduler.has_input():
+            return quantum
+        allocated = self._allocation.get(module.name)
+        if allocated is None:  # woken up during the cycle
+            return quantum
+        # the policy may have shortened or extended the quantum
+        return allocated * quantum / module.params.quantum
+
+    def step_size(self, module, remaining_time, quantum):
+        return module.predict_step_size(remaining_time)
+
+    def allocation(self):
+        return dict(self._allocation)
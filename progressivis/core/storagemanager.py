@@ -8,17 +8,25 @@ import shutil
 import six
 from six.moves import urllib
 import logging
+
+from .cost_model import CostModelStore
+
 logger = logging.getLogger(__name__)
 
 urljoin = urllib.parse.urljoin
 pathname2url = urllib.request.pathname2url
 
 
+COST_MODEL_FILE = 'cost_models.json'
+
+
 class StorageManager(object):
     default = None
 
     def __init__(self, directory=None):
         self._directory = directory
+        self._persistent = directory is not None
+        self._cost_models = None
         self.moduledir = dict()
 
     def start(self):
@@ -56,12 +64,23 @@ class StorageManager(object):
     def url(self, module, filename):
         return urljoin('file:', pathname2url(self.fullname(module, filename)))
 
+    def cost_models(self):
+        """Return the store of the cost models of the modules, or None when
+        the directory is temporary and the models would not be reused."""
+        if not self._persistent:
+            return None
+        if self._cost_models is None:
+            self._cost_models = CostModelStore(self.filename(COST_MODEL_FILE))
+        return self._cost_models
+
     def end(self):
         if self._directory is None:
             return False
         logger.debug('StorageManager removing directory %s', self._directory)
         shutil.rmtree(self._directory, ignore_errors=True)
         self._directory = None
+        self._cost_models = None
+        self._persistent = False
         self.moduledir = {}
 
 
@@ -8,6 +8,7 @@ logger = logging.getLogger(__name__)
 
 class TimePredictor(object):
     default = None
+    uses_trace = True # fit is called with the trace of the module
 
     def __init__(self):
         self.name = None
@@ -18,7 +19,21 @@ class TimePredictor(object):
     def predict(self, duration, default_step):
         pass
 
+    def observe(self, steps, duration):
+        "Called after each step with the number of steps run and its duration"
+        pass
+
+    def state(self):
+        "Return a json serializable state of the fitted model, or None"
+        pass
+
+    def load_state(self, state):
+        "Warm start the predictor with a state returned by `state`"
+        pass
+
 class ConstantTimePredictor(TimePredictor):
+    uses_trace = False
+
     def __init__(self, t):
         self.t = t
 
@@ -70,5 +85,133 @@ class LinearTimePredictor(TimePredictor):
                      self.name, steps, duration)
         return steps
 
+    def state(self):
+        if self.a == 0:
+            return None
+        return {'a': float(self.a)}
+
+    def load_state(self, state):
+        self.a = state.get('a', 0)
+
+
+
+class RingTimePredictor(TimePredictor):
+    """
+    Predictor fitting an affine model, duration = overhead + cost * steps,
+    on the last `size` steps kept in a ring buffer, each step weighing
+    `decay` times less than the next one. Predictions keep a margin of
+    `confidence` standard deviations of the residual durations, so steps
+    rarely exceed their duration, and grow at most `max_growth` times over
+    the largest step observed. Observing a step and predicting take a
+    constant time.
+    A model loaded with `load_state` weighs as `warm_weight` samples older
+    than the observed ones, until the ring is full.
+    """
+    uses_trace = False
+
+    def __init__(self, size=16, decay=0.8, confidence=1.96, max_growth=4,
+                 warm_weight=8):
+        super(RingTimePredictor, self).__init__()
+        self.steps = np.zeros(size)
+        self.durations = np.zeros(size)
+        self.weights = decay ** np.arange(size)[::-1]
+        self.decay = decay
+        self.warm_weight = warm_weight
+        self.warm = None
+        self.confidence = confidence
+        self.max_growth = max_growth
+        self.count = 0
+        self.overhead = 0.0
+        self.cost = 0.0
+        self.sigma = 0.0
+        self.max_steps = 0
+
+    @property
+    def a(self):
+        "Return the estimated number of operations per second, 0 if unknown"
+        if self.cost == 0:
+            return 0
+        return 1.0 / self.cost
+
+    def observe(self, steps, duration):
+        if steps <= 0 or duration <= 0:
+            return
+        size = len(self.steps)
+        pos = self.count % size
+        self.steps[pos] = steps
+        self.durations[pos] = duration
+        self.count += 1
+        self._fit()
+
+    def _fit(self):
+        size = len(self.steps)
+        n = min(self.count, size)
+        # samples from the oldest to the newest
+        order = (np.arange(n) + self.count - n) % size
+        x = self.steps[order]
+        y = self.durations[order]
+        w = self.weights[size-n:]
+        sw = w.sum()
+        mx = np.dot(w, x) / sw
+        my = np.dot(w, y) / sw
+        sxx = np.dot(w, (x - mx)**2)
+        overhead = 0.0
+        cost = 0.0
+        if sxx > 0:
+            cost = np.dot(w, (x - mx) * (y - my)) / sxx
+            overhead = my - cost * mx
+        if cost <= 0 or overhead < 0: # fit through the origin instead
+            overhead = 0.0
+            cost = np.dot(w, y) / np.dot(w, x)
+        residuals = y - (overhead + cost * x)
+        variance = np.dot(w, residuals**2) / sw
+        max_steps = x.max()
+        if self.warm is not None and self.count < size:
+            # blend with the loaded model, older than the n samples
+            ww = self.warm_weight * self.decay ** n
+            tw = ww + sw
+            overhead = (ww * self.warm['overhead'] + sw * overhead) / tw
+            cost = (ww * self.warm['cost'] + sw * cost) / tw
+            variance = (ww * self.warm['sigma']**2 + sw * variance) / tw
+            max_steps = max(max_steps, self.warm['max_steps'])
+        else:
+            self.warm = None
+        self.overhead = overhead
+        self.cost = cost
+        self.sigma = np.sqrt(variance)
+        self.max_steps = max_steps
+        logger.debug('RingTimePredictor %s Fit: %f s + %f s/op (sd %f s)',
+                     self.name, overhead, cost, self.sigma)
+
+    def predict(self, duration, default):
+        if self.cost == 0:
+            return default
+        margin = self.confidence * self.sigma
+        steps = (duration - self.overhead - margin) / self.cost
+        if self.max_steps:
+            steps = min(steps, self.max_growth * self.max_steps)
+        steps = int(max(1, np.floor(steps))) if duration > 0 else 0
+        logger.debug('RingTimePredictor %s: Predicts %d steps for duration %f',
+                     self.name, steps, duration)
+        return steps
+
+    def state(self):
+        if self.cost == 0:
+            return None
+        return {'overhead': float(self.overhead),
+                'cost': float(self.cost),
+                'sigma': float(self.sigma),
+                'max_steps': float(self.max_steps)}
+
+    def load_state(self, state):
+        self.overhead = state.get('overhead', 0.0)
+        self.cost = state.get('cost', 0.0)
+        self.sigma = state.get('sigma', 0.0)
+        self.max_steps = state.get('max_steps', 0)
+        if self.cost > 0:
+            self.warm = {'overhead': self.overhead, 'cost': self.cost,
+                         'sigma': self.sigma, 'max_steps': self.max_steps}
+
+
 if TimePredictor.default is None:
-    TimePredictor.default = LinearTimePredictor
+    TimePredictor.default = RingTimePredictor
@@ -0,0 +1,85 @@
+"""
+Timeline of the runs and steps of the modules of a scheduler, exported in
+the Chrome Trace Event format read by chrome://tracing and Perfetto.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import json
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Timeline']
+
+
+class Timeline(object):
+    """
+    Record the runs and steps of the modules, keeping the last `capacity`
+    events. Times are given by the timer of the scheduler, in seconds.
+    """
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self._events = deque(maxlen=capacity)
+        self._threads = {}
+
+    def __len__(self):
+        return len(self._events)
+
+    def clear(self):
+        "Remove all the events"
+        self._events.clear()
+
+    def _thread_id(self):
+        thread = threading.current_thread()
+        tid = thread.ident
+        if tid not in self._threads:
+            self._threads[tid] = thread.name
+        return tid
+
+    def run(self, module, run_number, start, end, steps, steps_run,
+            next_state):
+        "Record a run of a module"
+        self._events.append(('run', module.name, start, end,
+                             self._thread_id(), run_number,
+                             steps, steps_run, next_state))
+
+    def step(self, module, run_number, start, end, steps, steps_run,
+             next_state):
+        "Record a step of a module"
+        self._events.append(('step', module.name, start, end,
+                             self._thread_id(), run_number,
+                             steps, steps_run, next_state))
+
+    def to_chrome_trace(self, name='progressivis'):
+        """Return a dictionary in the Chrome Trace Event format, to be
+        saved as a json file."""
+        from .module import Module
+        pid = os.getpid()
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid,
+                   'args': {'name': name}}]
+        for (tid, thread_name) in list(self._threads.items()):
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                           'tid': tid, 'args': {'name': thread_name}})
+        for (cat, module, start, end, tid, run_number,
+             steps, steps_run, next_state) in list(self._events):
+            events.append({'name': module,
+                           'cat': cat,
+                           'ph': 'X',
+                           'ts': start * 1e6,
+                           'dur': (end - start) * 1e6,
+                           'pid': pid,
+                           'tid': tid,
+                           'args': {'run_number': run_number,
+                                    'steps': steps,
+                                    'steps_run': steps_run,
+                                    'next_state': Module.state_name[next_state]}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, filename, name='progressivis'):
+        "Save the timeline in a json file in the Chrome Trace Event format"
+        with open(filename, 'w') as out:
+            json.dump(self.to_chrome_trace(name), out)
+        logger.info('Saved %d events in %s', len(self._events), filename)
@@ -62,7 +62,7 @@ class FakeLock(object):
 class FakeCondition(object):
     def __init__(self, lock=None):
         self._lock = lock #  still keeps pylint happy
-    def wait(self):
+    def wait(self, timeout=None):
         pass
     def notify(self):
         pass
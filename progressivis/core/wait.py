@@ -32,15 +32,19 @@ class Wait(Module):
         if np.isnan(delay) and reads < 0:
             return False
         inslot = self.get_input_slot('inp')
-        trace = inslot.output_module.tracer.trace_stats()
-        if len(trace) == 0:
+        count = inslot.output_module.tracer.event_count()
+        if count == 0:
             return False
         if not np.isnan(delay):
-            return len(trace) >= delay
+            return count >= delay
         elif reads >= 0:
             return len(inslot.data()) >= reads
         return False
 
+    def needs_polling(self):
+        # the delay depends on the trace of the input module
+        return True
+
     def get_data(self, name):
         if name == 'inp':
             return self.get_input_slot('inp').data()
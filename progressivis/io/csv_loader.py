@@ -11,8 +11,8 @@ from ..table.module import TableModule
 from ..table.table import Table
 from ..table.dshape import dshape_from_dataframe
 from ..core.utils import (filepath_to_buffer, _infer_compression,
-                              force_valid_id_columns, is_str
-                              )
+                              force_valid_id_columns, is_str,
+                              integer_types)
 from requests.packages.urllib3.exceptions import HTTPError
 from .read_csv import read_csv, recovery, is_recoverable, InputSource
 
@@ -27,6 +27,7 @@ class CSVLoader(TableModule):
                  recovery=0,
                  recovery_table_size=3,
                  save_step_size = 100000,
+                 categorical=None,
                  **kwds):
         self._add_slots(kwds,'input_descriptors',
                         [SlotDescriptor('filenames', type=Table,required=False)])
@@ -61,8 +62,20 @@ class CSVLoader(TableModule):
         self._recovery_table_inv = None
         self._save_step_size = save_step_size
         self._last_saved_id = 0
+        self._categorical = categorical
         self._table = None
 
+    def _categorical_columns(self, df):
+        """Return the names of the columns of df to dictionary-encode, the
+        string columns with at most `categorical` distinct values in the
+        first frame when it is an integer."""
+        categorical = self._categorical
+        if categorical is None:
+            return ()
+        if not isinstance(categorical, integer_types):
+            return categorical
+        return [c for c in df if df[c].dtype == object and
+                df[c].nunique() <= min(categorical, len(df)//2)]
 
     def rows_read(self):
         return self._rows_read
@@ -238,18 +251,17 @@ class CSVLoader(TableModule):
                 if self._table is None:
                     if not self._recovery:
                         self._table_params['name'] = self.generate_table_name('table')
-                        self._table_params['dshape'] = dshape_from_dataframe(df_list[0])
+                        df = df_list[0]
+                        self._table_params['dshape'] = dshape_from_dataframe(
+                            df, self._categorical_columns(df))
                         self._table_params['create'] = True
-                        self._table_params['data'] = pd.concat(df_list)
-                        self._table = Table(**self._table_params)
                     else:
                         self._table_params['name'] = self._recovered_csv_table_name
                         self._table_params['create'] = False
-                        self._table = Table(**self._table_params)
-                        self._table.append(pd.concat(df_list))
-                else:
-                    for df in df_list:
-                        self._table.append(df)
+                    self._table = Table(**self._table_params)
+                # each frame is copied once, directly in the columns
+                for df in df_list:
+                    self._table.append(df)
                 if self.parser.is_flushed() and needs_save and self._recovery_table is None and self._save_context:
                     snapshot = self.parser.get_snapshot(run_number=run_number, table_name=self._table._name,
                                                 last_id=self._table.last_id)
@@ -27,6 +27,7 @@ class Input(TableModule):
         if not isinstance(msg, (list, dict)):
             msg = {'input': msg}
         self._table.add(msg)
+        self.scheduler().wake(self)
 
     def is_input(self):
         return True
@@ -14,10 +14,19 @@ class Variable(Constant):
         self._add_slots(kwds,'input_descriptors',
                         [SlotDescriptor('like', type=Table, required=False)])
         super(Variable, self).__init__(table, **kwds)
+        self._last = 0
 
     def is_input(self):
         return True
 
+    def is_ready(self):
+        if not super(Variable, self).is_ready():
+            return False
+        if self.has_any_input():
+            return True
+        # without input, only run when a new value has been added
+        return self._table is None or len(self._table) > self._last
+
     def from_input(self, input_):
         if not isinstance(input_,dict):
             raise ProgressiveError('Expecting a dictionary')
@@ -39,6 +48,7 @@ class Variable(Constant):
         _ = self.scheduler().for_input(self)
         #last['_update'] = run_number
         self._table.add(last)
+        self.scheduler().wake(self)
         return error
     
     def run_step(self,run_number,step_size,howlong):
@@ -52,6 +62,8 @@ class Variable(Constant):
                                             dshape=like.dshape,
                                             create=True)
                         self._table.append(like.last().to_dict(ordered=True), indices=[0])
+        if self._table is not None:
+            self._last = len(self._table)
         return self._return_run_step(self.state_blocked, steps_run=1)
         #raise StopIteration()
 
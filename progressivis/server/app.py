@@ -320,6 +320,21 @@ def _on_module_df(path):
                 'reason': 'invalid data'}
     return {'columns':['index']+df.columns}
 
+def _on_module_dfbin(data):
+    path = data['path']
+    (mid, slot) = path.split('/')
+    module = path_to_module(mid)
+    if module is None:
+        return {'status': 'failed',
+                'reason': 'invalid module'}
+    df = module.get_data(slot)
+    if df is None:
+        return {'status': 'failed',
+                'reason': 'invalid data'}
+    return df.to_bytes(columns=data.get('columns'),
+                       start=data.get('start'),
+                       stop=data.get('stop'))
+
 def _on_module_quality(mid):
     #print('socketio quality for', mid)
     module = path_to_module(mid)
@@ -384,6 +399,7 @@ def start_server(scheduler=None, debug=False):
     socketio.on_event('/progressivis/module/hotline_on', _on_module_hotline_on)
     socketio.on_event('/progressivis/module/hotline_off', _on_module_hotline_off)
     socketio.on_event('/progressivis/module/df', _on_module_df)
+    socketio.on_event('/progressivis/module/dfbin', _on_module_dfbin)
     socketio.on_event('/progressivis/module/input', _on_module_input)
     socketio.on_event('/progressivis/module/quality', _on_module_quality)
     socketio.on_event('/progressivis/logger', _on_logger)
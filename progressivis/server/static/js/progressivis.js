@@ -136,6 +136,92 @@ function progressivis_get_image(path, success, error, param) {
                      error, param);
 }
 
+var columnar_arrays = {
+    "<f8": Float64Array, "<f4": Float32Array,
+    "<i4": Int32Array, "<u4": Uint32Array,
+    "<i2": Int16Array, "<u2": Uint16Array,
+    "|i1": Int8Array, "|u1": Uint8Array, "|b1": Uint8Array
+};
+
+// 64 bits integers, like the index, are decoded as Numbers in a
+// Float64Array, exact up to 2^53
+function columnar_int64(buffer, offset, size, signed) {
+    var count = size/8,
+        low = new Uint32Array(buffer, offset, count*2),
+        high = signed ? new Int32Array(buffer, offset, count*2) : low,
+        values = new Float64Array(count);
+    for (var i = 0; i < count; i++) {
+        values[i] = low[2*i] + high[2*i+1] * 4294967296;
+    }
+    return values;
+}
+
+function columnar_array(buffer, desc) {
+    if (desc.dtype == "str") {
+        var offsets = new Int32Array(buffer, desc.buffers[0][0], desc.buffers[0][1]/4),
+            text = new Uint8Array(buffer, desc.buffers[1][0], desc.buffers[1][1]),
+            decoder = new TextDecoder("utf-8"),
+            values = [];
+        for (var i = 0; i < offsets.length-1; i++) {
+            values.push(decoder.decode(text.subarray(offsets[i], offsets[i+1])));
+        }
+        return values;
+    }
+    if (desc.dtype == "<i8" || desc.dtype == "<u8") {
+        return columnar_int64(buffer, desc.buffers[0][0], desc.buffers[0][1],
+                              desc.dtype == "<i8");
+    }
+    var type = columnar_arrays[desc.dtype];
+    return new type(buffer, desc.buffers[0][0],
+                    desc.buffers[0][1]/type.BYTES_PER_ELEMENT);
+}
+
+// Decode the binary columnar format of progressivis.table.columnar
+function columnar_decode(buffer) {
+    var size = new DataView(buffer).getUint32(0, true),
+        header = JSON.parse(new TextDecoder("utf-8").decode(
+            new Uint8Array(buffer, 4, size))),
+        columns = {};
+    header.columns.forEach(function(desc) {
+        columns[desc.name] = columnar_array(buffer, desc);
+    });
+    if (header.index) {
+        header.index = columnar_array(buffer, header.index);
+    }
+    header.columns = columns;
+    return header;
+}
+
+function progressivis_get_columns(path, success, error, param) {
+    if (handshake) {
+        return progressivis_get('/progressivis/module/dfbin',
+                                function(data) {
+                                    success(columnar_decode(data));
+                                },
+                                error, Object.assign({path: path}, param));
+    }
+    var body = new FormData();
+    for (var key in param) {
+        if (key == "stop") {
+            body.append("length", param.stop - (param.start || 0));
+        }
+        else if (Array.isArray(param[key])) {
+            param[key].forEach(function(value) {
+                body.append(key, value);
+            });
+        }
+        else {
+            body.append(key, param[key]);
+        }
+    }
+    return fetch($SCRIPT_ROOT+'/progressivis/module/dfbin/'+path,
+                 {method: "POST", body: body})
+        .then(function(response) { return response.arrayBuffer(); })
+        .then(columnar_decode)
+        .then(success)
+        .catch(error);
+}
+
 function progressivis_start(success, error) {
     progressivis_get('/progressivis/scheduler/start', success, error);
 }
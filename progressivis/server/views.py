@@ -6,7 +6,8 @@ from __future__ import absolute_import, division, print_function
 from os.path import join, dirname, abspath
 import logging
 
-from flask import render_template, request, send_from_directory, jsonify, abort, send_file
+from flask import (render_template, request, send_from_directory, jsonify, abort, send_file,
+                   Response)
 
 import six
 
@@ -103,6 +104,21 @@ def _scheduler_step():
     progressivis_bp.step_once()
     return jsonify({'status': 'success'})
 
+@progressivis_bp.route('/progressivis/scheduler/timeline', methods=['GET', 'POST'])
+def _scheduler_timeline():
+    scheduler = progressivis_bp.scheduler
+    if request.method == 'POST':
+        capacity = int(request.values.get('capacity', 100000))
+        scheduler.record_timeline(capacity)
+        return jsonify({'status': 'success'})
+    if scheduler.timeline is None:
+        abort(404)
+    response = jsonify(scheduler.timeline.to_chrome_trace(
+        name='scheduler %s' % scheduler.name))
+    response.headers['Content-Disposition'] = \
+      'attachment; filename=progressivis_timeline.json'
+    return response
+
 @progressivis_bp.route('/progressivis/module/get/<mid>', methods=['POST', 'GET'])
 def _module(mid):
     module = path_to_module(mid)
@@ -117,6 +133,21 @@ def _module(mid):
         return render_template(vis+'.html', title="%s %s"%(vis, mid), id=mid)
     return render_template('module.html', title="Module "+mid, id=mid)
 
+@progressivis_bp.route('/progressivis/module/profile/<mid>', methods=['POST', 'GET'])
+def _module_profile(mid):
+    module = path_to_module(mid)
+    if module is None:
+        abort(404)
+    if request.method == 'POST':
+        enabled = request.values.get('enabled')
+        if enabled is not None:
+            module.profile(enabled.lower() != 'false')
+        return jsonify({'profiling': module.profiler is not None,
+                        'functions': module.profile_stats()})
+    return render_template('profile.html', title="Profile "+mid, id=mid,
+                           profiling=module.profiler is not None,
+                           functions=module.profile_stats())
+
 @progressivis_bp.route('/progressivis/module/image/<mid>', methods=['GET'])
 def _module_image(mid):
     run_number = request.values.get('run_number', None)
@@ -220,12 +251,27 @@ def _dfslice(mid, slot):
     draw_ = int(request.form['draw'])
     length_ = int(request.form['length'])
     df_len = len(df)
-    df_slice = df.iloc[start_:min(start_+length_, df_len)]
     print("reload slice", start_, 'len=', length_, 'table len=', df_len)
     return jsonify({'draw':draw_,
                     'recordsTotal':df_len,
                     'recordsFiltered':df_len,
-                    'data': df_slice.to_json(orient='datatable')})
+                    'data': df.to_json(orient='datatable',
+                                       start=start_, stop=start_+length_)})
+
+@progressivis_bp.route('/progressivis/module/dfbin/<mid>/<slot>', methods=['POST'])
+def _dfbin(mid, slot):
+    module = path_to_module(mid)
+    if module is None:
+        abort(404)
+    df = module.get_data(slot)
+    if df is None:
+        abort(404)
+    start_ = request.form.get('start', type=int)
+    length_ = request.form.get('length', type=int)
+    stop_ = None if length_ is None else (start_ or 0) + length_
+    columns = request.form.getlist('columns') or None
+    return Response(df.to_bytes(columns=columns, start=start_, stop=stop_),
+                    mimetype='application/octet-stream')
 
 @progressivis_bp.route('/exit')
 def _exit_():
@@ -17,6 +17,12 @@ def _pretty_name(x):
     else:
         return '_%.1f%%' % x
 
+def _digest(values):
+    "Return the TDigest of the values"
+    digest = TDigest()
+    digest.batch_update(values)
+    return digest
+
 class Percentiles(TableModule):
     parameters = [('percentiles', object, [0.25, 0.5, 0.75]),
                   ('history', np.dtype(int), 3)]
@@ -73,8 +79,14 @@ class Percentiles(TableModule):
             return self._return_run_step(self.state_blocked, steps_run=steps)
         input_df = dfslot.data()
         with dfslot.lock:
-            x = self.filter_columns(input_df, fix_loc(indices))
-            self.tdigest.batch_update(x[0])
+            if self.executor is None:
+                x = self.filter_columns(input_df, fix_loc(indices))
+                self.tdigest.batch_update(x[0])
+            else:
+                # the digest of the chunk is computed in the executor and
+                # merged with the digest of the previous chunks
+                shared = self.share(input_df[self._columns[0]], fix_loc(indices))
+                self.tdigest = self.tdigest + self.offload(_digest, shared)
         df = self._table
         values = {}
         for n,p in zip(self._pername, self._percentiles):
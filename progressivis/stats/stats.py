@@ -14,6 +14,7 @@ logger = logging.getLogger(__name__)
 
 class Stats(TableModule):
     parameters = [('history', np.dtype(int), 3)]
+    BUFFER_ROWS = 64*1024
 
     def __init__(self, column, min_column=None, max_column=None, reset_index=False, **kwds):
         self._add_slots(kwds,'input_descriptors',
@@ -33,6 +34,7 @@ class Stats(TableModule):
         #                (self._max_column, np.dtype(float), np.nan),]
         self.schema = '{'+self._min_column+': float64, '+self._max_column+': float64}'
         self._table = Table(get_random_name('stats_'), dshape=self.schema)
+        self._buffer = None
 
     def is_ready(self):
         if self.get_input_slot('table').created.any():
@@ -57,10 +59,15 @@ class Stats(TableModule):
         input_df = dfslot.data()
         steps = indices_len(indices)
         if steps > 0:
-            x = input_df.to_array(locs=fix_loc(indices), columns=[self._column])
-            new_min = np.nanmin(x)
-            new_max = np.nanmax(x)
-            
+            columns = [self._column]
+            if self._buffer is None:
+                self._buffer = input_df.array_buffer(self.BUFFER_ROWS, columns)
+            new_min = new_max = np.nan
+            for x in input_df.iter_array(locs=fix_loc(indices), columns=columns,
+                                         out=self._buffer):
+                new_min = np.nanmin([new_min, np.nanmin(x)])
+                new_max = np.nanmax([new_max, np.nanmax(x)])
+
             row = {self._min_column: np.nanmin([prev_min, new_min]),
                    self._max_column: np.nanmax([prev_max, new_max])}
             with self.lock:
@@ -26,8 +26,20 @@ class OnlineVariance(object):
 
     def add(self, iterable):
         if iterable is not None:
-            for datum in iterable:
-                self.include(datum)
+            self.merge(*_moments(np.asarray(iterable, dtype=np.float64)))
+
+    def merge(self, n, mean, M2):
+        """
+        Merge the moments of another set of data, using Chan's parallel
+        algorithm.
+        """
+        if n == 0: return
+        total = self.n + n
+        self.delta = mean - self.mean
+        self.mean += self.delta * n / total
+        self.M2 += M2 + self.delta**2 * self.n * n / total
+        self.n = total
+        self.variance = self.M2 / (self.n - self.ddof)
 
     def include(self, datum):
         if np.isnan(datum): return
@@ -42,6 +54,20 @@ class OnlineVariance(object):
         return np.sqrt(self.variance)
 
 
+def _moments(values):
+    "Return the count, mean and sum of squared deviations of the non-nan values."
+    values = values[~np.isnan(values)]
+    n = len(values)
+    if n == 0:
+        return 0, 0.0, 0.0
+    mean = values.mean()
+    return n, mean, float(np.sum((values - mean)**2))
+
+
+def _columns_moments(*columns):
+    return [_moments(np.asarray(values, dtype=np.float64)) for values in columns]
+
+
 class Var(TableModule):
     """
     Compute the variance of the columns of an input dataframe.
@@ -61,15 +87,18 @@ class Var(TableModule):
             return True
         return super(Var, self).is_ready()
 
-    def op(self, chunk):
-        cols = chunk.columns
+    def op(self, table, loc):
+        cols = self.get_columns(table)
+        # the moments of each column are computed in the module executor
+        shared = [self.share(table[c], loc) for c in cols]
+        moments = self.offload(_columns_moments, *shared)
         ret = {}
-        for c in cols:
+        for c, moment in zip(cols, moments):
             data = self._data.get(c)
             if data is None:
                 data = OnlineVariance()
                 self._data[c] = data
-            data.add(chunk[c])
+            data.merge(*moment)
             ret[c] = data.variance
         return ret
 
@@ -80,18 +109,19 @@ class Var(TableModule):
         if dfslot.updated.any() or dfslot.deleted.any():        
             dfslot.reset()
             self._table = None
+            self._data = {}
             dfslot.update(run_number)
         indices = dfslot.created.next(step_size) # returns a slice
         steps = indices_len(indices)
         if steps==0:
             return self._return_run_step(self.state_blocked, steps_run=0)
         input_df = dfslot.data()
-        op = self.op(self.filter_columns(input_df,fix_loc(indices)))
+        op = self.op(input_df, fix_loc(indices))
         if self._table is None:
             self._table = Table(self.generate_table_name('var'), dshape=input_df.dshape,
 #                                scheduler=self.scheduler(),
                                 create=True)
-        self._table.append(op, indices=[run_number])
+        self._table.add(op)
         print(self._table)
 
         if len(self._table) > self.params.history:
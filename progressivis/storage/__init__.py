@@ -18,6 +18,24 @@ except ImportError:
     mmapengine = None
 
 
+try:
+    from .arena import ArenaStorageEngine, ArenaGroup
+    arenaengine = ArenaStorageEngine()
+except ImportError:
+    arenaengine = None
+
+try:
+    from .tiered import TieredStorageEngine, TieredGroup
+    tieredengine = TieredStorageEngine()
+except ImportError:
+    tieredengine = None
+
+try:
+    from .compressed import CompressedStorageEngine, CompressedGroup
+    compressedengine = CompressedStorageEngine()
+except ImportError:
+    compressedengine = None
+
 # try:
 #     from .pptable import PPTableStorageEngine
 #     pptableengine = PPTableStorageEngine()
@@ -47,4 +65,7 @@ if get_option('storage.default'):
 
 Group.default = staticmethod(NumpyStorageEngine.create_group)
 #Group.default = staticmethod(MMapStorageEngine.create_group)
+#Group.default = staticmethod(ArenaStorageEngine.create_group)
+#Group.default = staticmethod(TieredStorageEngine.create_group)
+#Group.default = staticmethod(CompressedStorageEngine.create_group)
 IS_PERSISTENT = Group.default.__module__=='progressivis.storage.mmap' # TODO consider all other persistent storage (HDF5 etc.)
@@ -0,0 +1,472 @@
+"""
+Storage engine packing the datasets of all the groups into a few large
+arena files, instead of one file per dataset like the mmap engine.
+
+Each arena is a sparse file mapped once in memory, split in extents by an
+allocator merging the free extents. The datasets grow geometrically inside
+their extent, in place when the next extent is free, and the catalog of the
+engine records where each dataset lives.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import json
+from mmap import mmap
+import threading
+import logging
+
+import numpy as np
+
+from progressivis.core.utils import integer_types, get_random_name
+from progressivis.core.config import get_option
+from progressivis.core.storagemanager import StorageManager
+from .base import StorageEngine, Dataset
+from .hierarchy import GroupImpl, AttributeImpl
+from .mmap import PAGESIZE, MADVICE, OBJECT
+
+logger = logging.getLogger(__name__)
+
+ALIGNMENT = 64 # extents start on cache lines
+MIN_EXTENT = 1024 # bytes of the smallest extent of a dataset
+GROWTH = 2
+CATALOG_FILE = 'arena_catalog.json'
+
+
+def _align(nbytes, alignment=ALIGNMENT):
+    return (nbytes + alignment - 1) // alignment * alignment
+
+def _shape_len(shape):
+    length = 1
+    for dim in shape:
+        length *= dim
+    return length
+
+
+class Arena(object):
+    """
+    A sparse file of fixed size mapped in memory, where extents are allocated
+    first-fit. Only the pages written use memory and disk space.
+    The allocator is not thread-safe, the engine lock protects it.
+    """
+    def __init__(self, filename, size):
+        self.filename = filename
+        self.size = size
+        with open(filename, 'wb+') as fd:
+            os.ftruncate(fd.fileno(), size)
+            # the mapping stays valid once the file is closed
+            self.buffer = mmap(fd.fileno(), size)
+        self._top = 0 # start of the space never allocated
+        self._free = {} # offset -> length of the free extents
+        self._free_ends = {} # end -> offset of the free extents
+
+    def allocate(self, nbytes):
+        "Return the offset of a new extent of nbytes, or None if the arena is full"
+        for (offset, length) in list(self._free.items()):
+            if length >= nbytes:
+                self._remove_free(offset)
+                if length > nbytes:
+                    self._add_free(offset+nbytes, length-nbytes)
+                return offset
+        if self._top + nbytes > self.size:
+            return None
+        offset = self._top
+        self._top += nbytes
+        return offset
+
+    def extend(self, offset, nbytes, newbytes):
+        "Try to extend the extent in place, return True if done"
+        end = offset + nbytes
+        more = newbytes - nbytes
+        if end == self._top:
+            if end + more > self.size:
+                return False
+            self._top += more
+            return True
+        length = self._free.get(end)
+        if length is None or length < more:
+            return False
+        self._remove_free(end)
+        if length > more:
+            self._add_free(end+more, length-more)
+        return True
+
+    def free(self, offset, nbytes):
+        "Free an extent, merging it with its free neighbors"
+        end = offset + nbytes
+        if end in self._free:
+            nbytes += self._free[end]
+            self._remove_free(end)
+        previous = self._free_ends.get(offset)
+        if previous is not None:
+            nbytes += offset - previous
+            self._remove_free(previous)
+            offset = previous
+        if offset + nbytes == self._top:
+            self._top = offset
+        else:
+            self._add_free(offset, nbytes)
+
+    def _add_free(self, offset, nbytes):
+        self._free[offset] = nbytes
+        self._free_ends[offset+nbytes] = offset
+
+    def _remove_free(self, offset):
+        nbytes = self._free.pop(offset)
+        del self._free_ends[offset+nbytes]
+
+    @property
+    def used(self):
+        "Return the number of bytes allocated in this arena"
+        return self._top - sum(self._free.values())
+
+    def array(self, offset, dtype, count):
+        "Return an array of count items of dtype mapping the arena at offset"
+        return np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset)
+
+    def advise(self, access, offset, nbytes):
+        "Advise the kernel of the access pattern of a range of bytes"
+        if MADVICE is None:
+            return False
+        begin = offset // PAGESIZE * PAGESIZE
+        self.buffer.madvise(MADVICE[access], begin, offset + nbytes - begin)
+        return True
+
+    def close(self):
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
+
+
+class ArenaDataset(Dataset):
+    """
+    Dataset stored in an extent of an arena, growing geometrically.
+    Datasets of objects are kept in memory, like in the numpy engine.
+    """
+    def __init__(self, engine, path, name, shape=None, dtype=None, data=None,
+                 **kwds):
+        self._engine = engine
+        self._path = path
+        self._name = name
+        self._attrs = AttributeImpl()
+        if data is not None:
+            data = np.asarray(data, dtype=dtype)
+            shape = data.shape
+            if dtype is None:
+                dtype = data.dtype
+        if dtype is None:
+            raise ValueError('dtype required when no data is provided')
+        self._dtype = np.dtype(dtype)
+        if not shape:
+            shape = (0,)
+        kwds.pop('maxshape', None)
+        self._fillvalue = kwds.pop('fillvalue', 0)
+        if kwds:
+            logger.warning('Ignored keywords in ArenaDataset: %s', kwds)
+        self._extent = None
+        self.base = None
+        self.view = None
+        self._allocate(shape)
+        self.view = self.base[:shape[0]]
+        self.view[...] = self._fillvalue
+        if data is not None:
+            self.view[...] = data
+
+    @property
+    def extent(self):
+        "Return the arena, offset and length in bytes of the extent, or None"
+        return self._extent
+
+    def _row_bytes(self, shape):
+        return _shape_len(shape[1:]) * self._dtype.itemsize
+
+    def _allocate(self, shape, rows=None):
+        "Allocate the base array for at least `rows` rows of shape[1:]"
+        if rows is None:
+            rows = shape[0]
+        row = self._row_bytes(shape)
+        if self._dtype == OBJECT:
+            self.base = np.empty((rows,)+tuple(shape[1:]), dtype=OBJECT)
+            return
+        nbytes = _align(max(rows * row, MIN_EXTENT))
+        self._extent = self._engine.allocate(self._path, nbytes)
+        self._map(shape)
+
+    def _map(self, shape):
+        (arena, offset, nbytes) = self._extent
+        row = self._row_bytes(shape)
+        capacity = nbytes // row if row else shape[0]
+        base = arena.array(offset, self._dtype, capacity * row // self._dtype.itemsize)
+        self.base = base.reshape((capacity,)+tuple(shape[1:]))
+
+    @property
+    def capacity(self):
+        "Return the number of rows that fit in the dataset without moving it"
+        return self.base.shape[0]
+
+    def resize(self, size, axis=None):
+        if isinstance(size, integer_types):
+            shape = tuple([size]+list(self.base.shape[1:]))
+        else:
+            shape = tuple(size)
+        oldsize = self.view.shape[0]
+        if shape[1:] != self.base.shape[1:]:
+            with self._engine.lock:
+                self._relayout(shape)
+        elif shape[0] > self.capacity:
+            with self._engine.lock:
+                self._grow(shape)
+        self.view = self.base[:shape[0]]
+        if shape[0] > oldsize:
+            self.view[oldsize:] = self._fillvalue
+
+    def _grow(self, shape):
+        rows = max(shape[0], self.capacity * GROWTH)
+        if self._dtype == OBJECT:
+            old = self.view
+            self._allocate(shape, rows)
+            self.base[:len(old)] = old
+            return
+        (arena, offset, nbytes) = self._extent
+        newbytes = _align(rows * self._row_bytes(shape))
+        if arena.extend(offset, nbytes, newbytes):
+            self._extent = (arena, offset, newbytes)
+            self._engine.catalog_update(self._path, self._extent)
+            self._map(shape)
+            return
+        old = self.view
+        extent = self._extent
+        self._allocate(shape, rows)
+        self.base[:len(old)] = old
+        self._engine.free(None, extent)
+
+    def _relayout(self, shape):
+        "Change the shape of the rows, keeping the common part of the values"
+        old = self.view
+        extent = self._extent
+        self._allocate(shape, max(shape[0], 1))
+        common = tuple(slice(0, min(a, b)) for (a, b) in zip(old.shape, shape))
+        self.base[...] = self._fillvalue
+        if len(old.shape) == len(shape):
+            self.base[common] = old[common]
+        if extent is not None:
+            self._engine.free(None, extent)
+
+    def close(self):
+        "Free the extent of this dataset"
+        if self._extent is not None:
+            self._engine.free(self._path, self._extent)
+            self._extent = None
+        self.base = self.view = None
+
+    def advise(self, access, start=0, stop=None):
+        if self._extent is None or not self.view.size:
+            return False
+        (arena, offset, _) = self._extent
+        row = self.view.nbytes // len(self.view)
+        if stop is None:
+            stop = len(self.view)
+        stop = min(stop, len(self.view))
+        if stop <= start:
+            return False
+        return arena.advise(access, offset + start * row, (stop - start) * row)
+
+    @property
+    def shape(self):
+        return self.view.shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def maxshape(self):
+        return self.view.shape
+
+    @property
+    def fillvalue(self):
+        return self._fillvalue
+
+    @property
+    def chunks(self):
+        return self.view.shape
+
+    @property
+    def size(self):
+        return self.view.shape[0]
+
+    def __getitem__(self, args):
+        return self.view[args]
+
+    def __setitem__(self, args, val):
+        self.view[args] = val
+
+    def __len__(self):
+        return self.view.shape[0]
+
+    @property
+    def attrs(self):
+        return self._attrs
+
+    @property
+    def name(self):
+        return self._name
+
+
+class ArenaGroup(GroupImpl):
+    "Group of arena-based groups and datasets."
+    def __init__(self, name=None, parent=None, engine=None):
+        if name is None:
+            name = get_random_name("arena_")
+        super(ArenaGroup, self).__init__(name, parent=parent)
+        self._engine = engine if engine is not None else parent.engine
+
+    @property
+    def engine(self):
+        "Return the storage engine allocating the extents"
+        return self._engine
+
+    def path(self):
+        "Return the path of the group in the engine"
+        if self.parent is None:
+            return ''
+        return self.parent.path() + '/' + self._name
+
+    def create_dataset(self, name, shape=None, dtype=None, data=None, **kwds):
+        if name in self.dict:
+            raise KeyError('name %s already defined' % name)
+        kwds.pop('chunks', None)
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+        fillvalue = kwds.pop('fillvalue', None)
+        if fillvalue is None:
+            if dtype == OBJECT:
+                fillvalue = ''
+            else:
+                fillvalue = 0
+        arr = ArenaDataset(self._engine, self.path() + '/' + name, name,
+                           shape=shape, dtype=dtype, data=data,
+                           fillvalue=fillvalue, **kwds)
+        self.dict[name] = arr
+        return arr
+
+    def _create_group(self, name, parent):
+        return ArenaGroup(name, parent=parent)
+
+    def free_item(self, item):
+        if isinstance(item, ArenaDataset):
+            item.close()
+        elif isinstance(item, ArenaGroup):
+            item.close_all()
+
+    def close_all(self):
+        "Free the extents of all the datasets of this group and its subgroups"
+        for item in self.dict.values():
+            self.free_item(item)
+
+    def delete(self):
+        "Delete the group and free its datasets"
+        self.close_all()
+        self.dict.clear()
+        if self.parent is not None and self._name in self.parent.dict:
+            del self.parent.dict[self._name]
+
+
+class ArenaStorageEngine(StorageEngine, ArenaGroup):
+    """
+    StorageEngine allocating the datasets in a few large sparse files of
+    `storage.arena.size` bytes, created in the directory of the
+    `StorageManager`.
+    """
+    def __init__(self, arena_size=None):
+        StorageEngine.__init__(self, "arena")
+        ArenaGroup.__init__(self, '/', None, engine=self)
+        self._arena_size = arena_size
+        self._arenas = []
+        self._catalog = {} # dataset path -> (arena number, offset, nbytes)
+        # modules running in threads share the arenas
+        self.lock = threading.RLock()
+
+    @property
+    def arenas(self):
+        "Return the list of arenas"
+        return self._arenas
+
+    def catalog(self):
+        "Return a copy of the catalog, mapping each dataset to its extent"
+        with self.lock:
+            return dict(self._catalog)
+
+    def _new_arena(self, nbytes):
+        size = self._arena_size or get_option('storage.arena.size')
+        size = _align(max(size, nbytes), PAGESIZE)
+        filename = StorageManager.default.filename(
+            get_random_name('arena_%d_' % len(self._arenas)))
+        arena = Arena(filename, size)
+        self._arenas.append(arena)
+        logger.info('Created arena %s of %d bytes', filename, size)
+        return arena
+
+    def allocate(self, path, nbytes):
+        "Allocate an extent of nbytes for the dataset at path"
+        with self.lock:
+            for arena in self._arenas:
+                offset = arena.allocate(nbytes)
+                if offset is not None:
+                    break
+            else:
+                arena = self._new_arena(nbytes)
+                offset = arena.allocate(nbytes)
+            extent = (arena, offset, nbytes)
+            self.catalog_update(path, extent)
+        return extent
+
+    def catalog_update(self, path, extent):
+        "Record the extent of the dataset at path"
+        (arena, offset, nbytes) = extent
+        with self.lock:
+            self._catalog[path] = (self._arenas.index(arena), offset, nbytes)
+
+    def free(self, path, extent):
+        "Free an extent, and forget the dataset at path if specified"
+        (arena, offset, nbytes) = extent
+        with self.lock:
+            arena.free(offset, nbytes)
+            if path is not None:
+                self._catalog.pop(path, None)
+
+    def flush(self):
+        "Write the catalog next to the arenas"
+        if not self._arenas:
+            return
+        with self.lock:
+            catalog = {'arenas': [arena.filename for arena in self._arenas],
+                       'datasets': dict(self._catalog)}
+        with open(StorageManager.default.filename(CATALOG_FILE), 'w') as out:
+            json.dump(catalog, out)
+
+    def close(self, name=None, flags=None, **kwds):
+        "Free all the datasets and unmap the arenas"
+        self.close_all()
+        self.dict.clear()
+        for arena in self._arenas:
+            arena.close()
+            if os.path.exists(arena.filename):
+                os.remove(arena.filename)
+        self._arenas = []
+        self._catalog = {}
+
+    def __contains__(self, name):
+        return ArenaGroup.__contains__(self, name)
+
+    @staticmethod
+    def create_group(name=None, create=True):
+        root = StorageEngine.engines()['arena']
+        with root.lock:
+            if name in root.dict:
+                if create:
+                    name = get_random_name(name[:16]+'_')
+                else:
+                    return root.dict[name]
+            group = ArenaGroup(name, parent=root)
+            root.dict[group.name] = group
+        return group
@@ -3,6 +3,7 @@ from __future__ import absolute_import, division, print_function
 from abc import ABCMeta, abstractmethod, abstractproperty
 from contextlib import contextmanager
 import six
+import numpy as np
 
 
 class StorageObject(six.with_metaclass(ABCMeta, object)):
@@ -136,6 +137,26 @@ class Dataset(StorageObject):
     def read_direct(self, dest, source_sel=None, dest_sel=None):
         dest[dest_sel] = self[source_sel]
 
+    def advise(self, access, start=0, stop=None):
+        """Advise the storage of the access pattern of the rows between
+        start and stop, one of 'normal', 'random', 'sequential' or
+        'willneed'. Return False if the advice is ignored."""
+        return False
+
+    def compact(self, indices, chunk_size=65536):
+        """Move the items at the sorted `indices` to the beginning of the
+        dataset, keeping their order. The dataset is not resized."""
+        start = _first_moved(indices)
+        for i in range(start, len(indices), chunk_size):
+            chunk = indices[i:i+chunk_size]
+            self[i:i+len(chunk)] = self[list(chunk)]
+
+
+def _first_moved(indices):
+    "Return the position of the first index that is not already in place"
+    moved = np.flatnonzero(indices != np.arange(len(indices)))
+    return len(indices) if len(moved) == 0 else int(moved[0])
+
 
 class StorageEngine(Group):
     _engines = dict()
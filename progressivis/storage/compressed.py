@@ -0,0 +1,510 @@
+"""
+Storage engine compressing the full chunks of the datasets.
+
+The rows of a dataset are split in chunks of `storage.compressed.chunk_size`
+bytes. Tables are mostly appended to, so once a chunk is full it is not
+written anymore: it is compressed on a thread pool, with blosc/lz4 and the
+byte shuffle filter when numcodecs is available or zlib on shuffled bytes
+otherwise. Reads decompress the chunks through a small cache of decoded
+chunks, and writing in a compressed chunk decompresses it again.
+"""
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+import threading
+import zlib
+import logging
+
+import numpy as np
+
+from progressivis.core.utils import integer_types, get_random_name
+from progressivis.core.config import get_option
+from progressivis.core.bitmap import bitmap
+from .base import StorageEngine, Dataset
+from .hierarchy import GroupImpl, AttributeImpl
+from .mmap import OBJECT
+
+try:
+    from numcodecs import Blosc
+    BLOSC = Blosc(cname='lz4', clevel=5, shuffle=Blosc.SHUFFLE)
+except ImportError:
+    BLOSC = None
+
+logger = logging.getLogger(__name__)
+
+ZLIB_LEVEL = 1
+
+_THREAD_POOL = None
+
+
+def _thread_pool():
+    # pylint: disable=global-statement
+    global _THREAD_POOL
+    if _THREAD_POOL is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _THREAD_POOL = ThreadPoolExecutor(
+            max_workers=get_option('storage.compressed.threads'))
+    return _THREAD_POOL
+
+
+def pack(array):
+    "Return the compressed bytes of an array"
+    array = np.ascontiguousarray(array)
+    if BLOSC is not None:
+        return BLOSC.encode(array)
+    # shuffle the bytes so the bytes of same rank of the items are together
+    shuffled = array.view(np.uint8).reshape(-1, array.dtype.itemsize).T
+    return zlib.compress(shuffled.tobytes(), ZLIB_LEVEL)
+
+
+def unpack(data, dtype, shape):
+    "Return the array of dtype and shape compressed in data"
+    dtype = np.dtype(dtype)
+    if BLOSC is not None:
+        buf = BLOSC.decode(data)
+        return np.frombuffer(buf, dtype=dtype).reshape(shape)
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    array = np.ascontiguousarray(shuffled.reshape(dtype.itemsize, -1).T)
+    return array.view(dtype).reshape(shape)
+
+
+class _Packed(object):
+    "Compressed chunk"
+    # pylint: disable=too-few-public-methods
+    __slots__ = ['data']
+    def __init__(self, data):
+        self.data = data
+
+
+class CompressedDataset(Dataset):
+    """
+    Dataset stored in chunks of rows, the full chunks being compressed in
+    the background. Datasets of objects are kept uncompressed.
+    """
+    def __init__(self, engine, name, shape=None, dtype=None, data=None,
+                 **kwds):
+        self._engine = engine
+        self._name = name
+        self._attrs = AttributeImpl()
+        if data is not None:
+            data = np.asarray(data, dtype=dtype)
+            shape = data.shape
+            if dtype is None:
+                dtype = data.dtype
+        if dtype is None:
+            raise ValueError('dtype required when no data is provided')
+        self._dtype = np.dtype(dtype)
+        if not shape:
+            shape = (0,)
+        kwds.pop('maxshape', None)
+        self._fillvalue = kwds.pop('fillvalue', 0)
+        if kwds:
+            logger.warning('Ignored keywords in CompressedDataset: %s', kwds)
+        self._lock = threading.RLock()
+        self._cache = OrderedDict() # chunk number -> (packed, decoded) chunk
+        self._pending = {} # chunk number -> future compressing it
+        self._layout(tuple(shape[1:]))
+        self.resize(shape)
+        if data is not None:
+            self[...] = data
+
+    def _layout(self, rowshape):
+        self._rowshape = rowshape
+        row = max(1, int(np.prod(rowshape)) * self._dtype.itemsize)
+        self._chunk_rows = max(1, get_option('storage.compressed.chunk_size') // row)
+        self._chunks = [] # arrays, or _Packed once compressed
+        self._versions = [] # incremented when a chunk is written
+        self._length = 0
+        self._cache.clear()
+
+    @property
+    def chunk_rows(self):
+        "Return the number of rows of the chunks"
+        return self._chunk_rows
+
+    @property
+    def memory_size(self):
+        "Return the bytes taken by the chunks, compressed or not"
+        size = 0
+        for chunk in self._chunks:
+            size += len(chunk.data) if isinstance(chunk, _Packed) else chunk.nbytes
+        return size
+
+    def packed(self):
+        "Return the number of compressed chunks"
+        return sum(1 for chunk in self._chunks if isinstance(chunk, _Packed))
+
+    def _new_chunk(self):
+        return np.full((self._chunk_rows,)+self._rowshape, self._fillvalue,
+                       dtype=self._dtype)
+
+    def _read_chunk(self, i):
+        "Return chunk i, decoded through the cache when it is compressed"
+        chunk = self._chunks[i]
+        if not isinstance(chunk, _Packed):
+            return chunk
+        with self._lock:
+            (packed, decoded) = self._cache.pop(i, (None, None))
+            if packed is not chunk:
+                decoded = unpack(chunk.data, self._dtype,
+                                 (self._chunk_rows,)+self._rowshape)
+            self._cache[i] = (chunk, decoded)
+            while len(self._cache) > self._engine.cache_size:
+                self._cache.popitem(last=False)
+        return decoded
+
+    def _write_chunk(self, i):
+        "Return chunk i to be written, decompressing it if needed"
+        with self._lock:
+            self._versions[i] += 1
+            chunk = self._chunks[i]
+            if isinstance(chunk, _Packed):
+                chunk = np.array(self._read_chunk(i))
+                self._chunks[i] = chunk
+                self._cache.pop(i, None)
+            return chunk
+
+    def _compress(self, i, version, chunk):
+        data = pack(chunk)
+        with self._lock:
+            self._pending.pop(i, None)
+            if i < len(self._chunks) and self._versions[i] == version \
+               and self._chunks[i] is chunk:
+                self._chunks[i] = _Packed(data)
+
+    def _schedule(self, chunks):
+        "Compress the chunks that are full and not compressed"
+        if self._dtype == OBJECT:
+            return
+        with self._lock:
+            for i in chunks:
+                chunk = self._chunks[i]
+                if isinstance(chunk, _Packed) or \
+                   (i+1) * self._chunk_rows > self._length:
+                    continue
+                future = self._engine.submit(self._compress, i,
+                                             self._versions[i], chunk)
+                if not isinstance(future, _Done):
+                    self._pending[i] = future
+
+    def flush(self):
+        "Wait for the compression of the full chunks"
+        for future in list(self._pending.values()):
+            future.result()
+
+    def resize(self, size, axis=None):
+        if isinstance(size, integer_types):
+            shape = (size,) + self._rowshape
+        else:
+            shape = tuple(size)
+        with self._lock:
+            if shape[1:] != self._rowshape:
+                self._relayout(shape)
+                return
+            length = shape[0]
+            oldlength = self._length
+            count = -(-length // self._chunk_rows)
+            del self._chunks[count:]
+            del self._versions[count:]
+            for i in list(self._cache):
+                if i >= count:
+                    del self._cache[i]
+            if length > oldlength and oldlength % self._chunk_rows:
+                # rows left over by a shrink are filled again
+                last = oldlength // self._chunk_rows
+                self._write_chunk(last)[oldlength % self._chunk_rows:] = \
+                    self._fillvalue
+            while len(self._chunks) < count:
+                self._chunks.append(self._new_chunk())
+                self._versions.append(0)
+            self._length = length
+            if length > oldlength:
+                first = oldlength // self._chunk_rows
+                self._schedule(range(first, length // self._chunk_rows))
+
+    def _relayout(self, shape):
+        "Change the shape of the rows, keeping the common part of the values"
+        old = self[:]
+        self._layout(shape[1:])
+        self.resize(shape[0])
+        if len(old.shape) == len(shape):
+            common = tuple(slice(0, min(a, b)) for (a, b) in zip(old.shape, shape))
+            self[common] = old[common]
+
+    def _rows(self, rows):
+        "Return the indices or the (start, stop) of the rows selected"
+        if rows is Ellipsis:
+            return (0, self._length)
+        if isinstance(rows, slice):
+            (start, stop, step) = rows.indices(self._length)
+            if step == 1:
+                return (start, max(start, stop))
+            return np.arange(start, stop, step)
+        if isinstance(rows, bitmap):
+            return np.asarray(rows.to_array(), dtype=np.int64)
+        rows = np.asarray(rows)
+        if rows.dtype == np.bool:
+            return np.flatnonzero(rows)
+        rows = rows.astype(np.int64)
+        if len(rows) and rows.min() < 0:
+            rows = np.where(rows < 0, rows + self._length, rows)
+        return rows
+
+    def _pieces(self, rows):
+        """Iterate over the chunk number, the rows in the chunk and the
+        positions in the selection of the selected rows"""
+        size = self._chunk_rows
+        if isinstance(rows, tuple):
+            (start, stop) = rows
+            for i in range(start // size, -(-stop // size)):
+                first = max(start, i * size)
+                last = min(stop, (i+1) * size)
+                yield (i, slice(first - i*size, last - i*size),
+                       slice(first - start, last - start))
+            return
+        if len(rows) and (rows.min() < 0 or rows.max() >= self._length):
+            raise IndexError('index out of range')
+        chunks = rows // size
+        order = np.argsort(chunks, kind='mergesort')
+        bounds = np.flatnonzero(np.diff(chunks[order])) + 1
+        for positions in np.split(order, bounds):
+            if len(positions):
+                i = int(chunks[positions[0]])
+                yield (i, rows[positions] - i*size, positions)
+
+    def __getitem__(self, args):
+        if isinstance(args, tuple):
+            (rows, rest) = (args[0], args[1:]) if args else (Ellipsis, ())
+        else:
+            (rows, rest) = (args, ())
+        if isinstance(rows, integer_types):
+            index = rows + self._length if rows < 0 else rows
+            if not 0 <= index < self._length:
+                raise IndexError('index %d out of range' % rows)
+            chunk = self._read_chunk(index // self._chunk_rows)
+            return chunk[(index % self._chunk_rows,)+rest]
+        rows = self._rows(rows)
+        if isinstance(rows, tuple):
+            count = rows[1] - rows[0]
+            (start, stop) = rows
+            i = start // self._chunk_rows
+            if count and (stop - 1) // self._chunk_rows == i and \
+               not isinstance(self._chunks[i], _Packed):
+                # the rows are in one uncompressed chunk, return a view
+                first = start - i * self._chunk_rows
+                return self._chunks[i][(slice(first, first+count),)+rest]
+        else:
+            count = len(rows)
+        out = np.empty((count,)+self._rowshape, dtype=self._dtype)
+        pieces = list(self._pieces(rows))
+        packed = [piece for piece in pieces
+                  if isinstance(self._chunks[piece[0]], _Packed)
+                  and piece[0] not in self._cache]
+        if len(packed) > 1:
+            # scans decode the chunks in parallel, without caching them
+            self._engine.run_all(self._unpack_piece, packed, out)
+            done = set(piece[0] for piece in packed)
+            pieces = [piece for piece in pieces if piece[0] not in done]
+        for (i, inner, outer) in pieces:
+            out[outer] = self._read_chunk(i)[inner]
+        return out[(slice(None),)+rest] if rest else out
+
+    def _unpack_piece(self, piece, out):
+        (i, inner, outer) = piece
+        chunk = self._chunks[i]
+        if isinstance(chunk, _Packed):
+            out[outer] = unpack(chunk.data, self._dtype,
+                                (self._chunk_rows,)+self._rowshape)[inner]
+        else:
+            out[outer] = chunk[inner]
+
+    def __setitem__(self, args, val):
+        if isinstance(args, tuple):
+            (rows, rest) = (args[0], args[1:]) if args else (Ellipsis, ())
+        else:
+            (rows, rest) = (args, ())
+        if isinstance(rows, integer_types):
+            index = rows + self._length if rows < 0 else rows
+            if not 0 <= index < self._length:
+                raise IndexError('index %d out of range' % rows)
+            i = index // self._chunk_rows
+            with self._lock:
+                self._write_chunk(i)[(index % self._chunk_rows,)+rest] = val
+            self._schedule([i])
+            return
+        rows = self._rows(rows)
+        count = rows[1] - rows[0] if isinstance(rows, tuple) else len(rows)
+        # broadcast the values to the shape of the selection
+        selection = np.broadcast_to(np.empty((), dtype=self._dtype),
+                                    (count,)+self._rowshape)
+        if rest:
+            selection = selection[(slice(None),)+rest]
+        val = np.broadcast_to(np.asarray(val, dtype=self._dtype),
+                              selection.shape)
+        written = []
+        with self._lock:
+            for (i, inner, outer) in self._pieces(rows):
+                self._write_chunk(i)[(inner,)+rest] = val[outer]
+                written.append(i)
+        self._schedule(written)
+
+    @property
+    def shape(self):
+        return (self._length,)+self._rowshape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def maxshape(self):
+        return self.shape
+
+    @property
+    def fillvalue(self):
+        return self._fillvalue
+
+    @property
+    def chunks(self):
+        return (self._chunk_rows,)+self._rowshape
+
+    @property
+    def size(self):
+        return self._length
+
+    def __len__(self):
+        return self._length
+
+    def close(self):
+        "Release the chunks"
+        self.flush()
+        with self._lock:
+            self._chunks = []
+            self._versions = []
+            self._cache.clear()
+            self._length = 0
+
+    @property
+    def attrs(self):
+        return self._attrs
+
+    @property
+    def name(self):
+        return self._name
+
+
+class CompressedGroup(GroupImpl):
+    "Group of compressed groups and datasets."
+    def __init__(self, name=None, parent=None, engine=None):
+        if name is None:
+            name = get_random_name("compressed_")
+        super(CompressedGroup, self).__init__(name, parent=parent)
+        self._engine = engine if engine is not None else parent.engine
+
+    @property
+    def engine(self):
+        "Return the storage engine compressing the chunks"
+        return self._engine
+
+    def create_dataset(self, name, shape=None, dtype=None, data=None, **kwds):
+        if name in self.dict:
+            raise KeyError('name %s already defined' % name)
+        kwds.pop('chunks', None)
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+        fillvalue = kwds.pop('fillvalue', None)
+        if fillvalue is None:
+            if dtype == OBJECT:
+                fillvalue = ''
+            else:
+                fillvalue = 0
+        arr = CompressedDataset(self._engine, name, shape=shape, dtype=dtype,
+                                data=data, fillvalue=fillvalue, **kwds)
+        self.dict[name] = arr
+        return arr
+
+    def _create_group(self, name, parent):
+        return CompressedGroup(name, parent=parent)
+
+    def free_item(self, item):
+        if isinstance(item, CompressedDataset):
+            item.close()
+        elif isinstance(item, CompressedGroup):
+            item.close_all()
+
+    def close_all(self):
+        "Release the datasets of this group and its subgroups"
+        for item in self.dict.values():
+            self.free_item(item)
+
+    def delete(self):
+        "Delete the group and release its datasets"
+        self.close_all()
+        self.dict.clear()
+        if self.parent is not None and self._name in self.parent.dict:
+            del self.parent.dict[self._name]
+
+
+class CompressedStorageEngine(StorageEngine, CompressedGroup):
+    """
+    StorageEngine keeping the datasets in memory, compressing their full
+    chunks on a pool of `storage.compressed.threads` threads, or in the
+    calling thread when it is 0.
+    """
+    def __init__(self):
+        StorageEngine.__init__(self, "compressed")
+        CompressedGroup.__init__(self, '/', None, engine=self)
+
+    @property
+    def cache_size(self):
+        "Return the number of decoded chunks cached by each dataset"
+        return get_option('storage.compressed.cache')
+
+    def submit(self, function, *args):
+        "Run function on the thread pool and return its future"
+        if not get_option('storage.compressed.threads'):
+            return _Done(function(*args))
+        return _thread_pool().submit(function, *args)
+
+    def run_all(self, function, items, *args):
+        "Run function on each item on the thread pool and wait for them"
+        if not get_option('storage.compressed.threads'):
+            for item in items:
+                function(item, *args)
+            return
+        pool = _thread_pool()
+        for future in [pool.submit(function, item, *args) for item in items]:
+            future.result()
+
+    def flush(self):
+        pass
+
+    def close(self, name=None, flags=None, **kwds):
+        "Release all the datasets"
+        self.close_all()
+        self.dict.clear()
+
+    def __contains__(self, name):
+        return CompressedGroup.__contains__(self, name)
+
+    @staticmethod
+    def create_group(name=None, create=True):
+        root = StorageEngine.engines()['compressed']
+        if name in root.dict:
+            if create:
+                name = get_random_name(name[:16]+'_')
+            else:
+                return root.dict[name]
+        group = CompressedGroup(name, parent=root)
+        root.dict[group.name] = group
+        return group
+
+
+class _Done(object):
+    "Result of a function run synchronously, behaving like a future"
+    # pylint: disable=too-few-public-methods
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
@@ -10,12 +10,20 @@ from resource import getpagesize
 import marshal
 import shutil
 from mmap import mmap
+try:
+    from mmap import MADV_NORMAL, MADV_RANDOM, MADV_SEQUENTIAL, MADV_WILLNEED
+    MADVICE = {'normal': MADV_NORMAL,
+               'random': MADV_RANDOM,
+               'sequential': MADV_SEQUENTIAL,
+               'willneed': MADV_WILLNEED}
+except ImportError: # madvise is available in python >= 3.8
+    MADVICE = None
 import logging
 import six
 import numpy as np
 
 from progressivis.core.utils import integer_types, get_random_name
-from .base import StorageEngine, Dataset
+from .base import StorageEngine, Dataset, _first_moved
 from .hierarchy import GroupImpl, AttributeImpl
 from .mmap_enc import MMapObject
 import sys
@@ -25,6 +33,8 @@ logger = logging.getLogger(__name__)
 METADATA_FILE = ".metadata"
 PAGESIZE = getpagesize()
 FACTOR = 1
+GROWTH = 2 # the files grow geometrically for appends in amortized O(1)
+MIN_LENGTH = PAGESIZE * 10
 
 
 def _shape_len(shape):
@@ -33,6 +43,11 @@ def _shape_len(shape):
         length *= dim
     return length
 
+def _file_length(nbytes, current=0):
+    "Return the length of a file holding nbytes, growing geometrically from current"
+    length = max(nbytes, int(current * GROWTH), MIN_LENGTH)
+    return (length + PAGESIZE - 1) // PAGESIZE * PAGESIZE
+
 class MMapDataset(Dataset):
     """
     Dataset implemented using the mmap file system function.
@@ -74,15 +89,15 @@ class MMapDataset(Dataset):
             dtype = np.dtype(np.int64)
         else:
             self._strings = None
-        nb_item = length//dtype.itemsize
-        last = max(0, length - 1)
-        length = (last // PAGESIZE + 1) * PAGESIZE * 10
         if os.path.exists(self._filename):
             self._file = open(self._filename, 'ab+')
             _read_attributes(self._attrs.attrs, self._metafile)
+            self._dirty = os.path.getsize(self._filename)
         else:
             self._file = open(self._filename, 'wb+') # can raise many exceptions
-            os.ftruncate(self._file.fileno(), length)
+            # the file is sparse, its pages are allocated when written
+            os.ftruncate(self._file.fileno(), _file_length(length))
+            self._dirty = 0 # bytes that can be non zero
         self._buffer = mmap(self._file.fileno(), 0)
 
         if 'maxshape' in kwds:
@@ -101,14 +116,10 @@ class MMapDataset(Dataset):
             #print('fillvalue for %s defaulted to %s'%(self.base.dtype, self._fillvalue))
         if kwds:
             logger.warning('Ignored keywords in MMapDataset: %s', kwds)
-        self.base = np.frombuffer(self._buffer, dtype=dtype, count=nb_item)
-        if self.base.shape != shape:
-            self.base = self.base.reshape(shape)
-        self.view = self.base
-        #if self.base.shape == shape:
-        #    self.view = self.base
-        #else:
-        #    self.view = self.base[:shape[0]]
+        self.base = None
+        self._map(shape)
+        self.view = self.base[:shape[0]]
+        self._dirty = max(self._dirty, length)
         assert self.view.shape == shape
         if data is not None:
             self._fill(0, data)
@@ -151,6 +162,14 @@ class MMapDataset(Dataset):
                 continue
             self._strings.release(offset)
 
+    def compact(self, indices, chunk_size=65536):
+        # objects are moved by moving their offsets in the strings
+        view = self.view
+        start = _first_moved(indices)
+        for i in range(start, len(indices), chunk_size):
+            chunk = indices[i:i+chunk_size]
+            view[i:i+len(chunk)] = view[chunk]
+
     def _set_value_at(self, i, v):
         #TODO free current value
         if v is None:
@@ -169,6 +188,11 @@ class MMapDataset(Dataset):
             self._strings.close()
         _write_attributes(self._attrs.attrs, self._metafile)
     @property
+    def filename(self):
+        "Return the name of the file mapped by this dataset"
+        return self._filename
+
+    @property
     def shape(self):
         return self.view.shape
 
@@ -192,54 +216,66 @@ class MMapDataset(Dataset):
     def size(self):
         return self.view.shape[0]
     
+    def _map(self, shape):
+        "Map the whole file as the array of rows `base`"
+        dtype_ = np.dtype(np.int64) if self.dtype == OBJECT else self.dtype
+        row = _shape_len(shape[1:]) * dtype_.itemsize
+        capacity = len(self._buffer) // row if row else shape[0]
+        base = np.frombuffer(self._buffer, dtype=dtype_,
+                             count=capacity * row // dtype_.itemsize)
+        self.base = base.reshape((capacity,)+tuple(shape[1:]))
+
+    @property
+    def capacity(self):
+        "Return the number of rows that fit in the file without remapping it"
+        return self.base.shape[0]
+
     def resize(self, size, axis=None):
         assert self._buffer is not None
-        shape = self.base.shape
         if isinstance(size, integer_types):
-            length = 1
-            for shap in shape[1:]:
-                length *= shap
-            length *= size
-            shape = tuple([size]+list(shape[1:]))
-        else:
-            length = 1
-            for shap in size:
-                length *= shap
-            shape = size
-        dtype_ = np.dtype(np.int64) if self.dtype==OBJECT else self.dtype
-        nb_item = length
-        length *= dtype_.itemsize
-        last = max(0, length - 1)
-        length = (last // PAGESIZE + 1) * PAGESIZE *10
-        if length != len(self._buffer):
-            self._buffer.resize(length)
-        self.base = np.frombuffer(self._buffer, dtype=dtype_, count=nb_item) # returns an 1D array
-        if self.base.shape != shape:
-            self.base = self.base.reshape(shape)
-        baseshape = np.array(self.base.shape)
-        viewshape = self.view.shape
-        size = np.asarray(shape)
-        if (size > baseshape).any():
-            self.view = None
-            newsize = []
-            for shap, shape in zip(size, baseshape):
-                if shap > shape:
-                    shap = next_pow2(shap)
-                newsize.append(shap)
-            self.base = np.resize(self.base, tuple(newsize))
-        # fill new areas with fillvalue
-        fillvalue_ = 0 if self.dtype==OBJECT else self._fillvalue
-        if any(size > viewshape) and (size != 0).all():
-            newarea = [np.s_[0:os] for os in viewshape]
-            for i, oldsiz in enumerate(viewshape):
-                siz = size[i]
-                if siz > oldsiz:
-                    newarea[i] = np.s_[oldsiz:siz]
-                    self.base[tuple(newarea)] = fillvalue_
-                newarea[i] = np.s_[0:siz]
+            shape = tuple([size]+list(self.base.shape[1:]))
         else:
-            newarea = [np.s_[0:s] for s in size]
-        self.view = self.base[newarea]
+            shape = tuple(size)
+        dtype_ = np.dtype(np.int64) if self.dtype == OBJECT else self.dtype
+        nbytes = _shape_len(shape) * dtype_.itemsize
+        oldsize = self.view.shape[0]
+        if shape[1:] != self.view.shape[1:]:
+            oldsize = 0 # the rows are reinterpreted, fill them again
+        if nbytes > len(self._buffer):
+            # the file is only remapped when its capacity is exceeded
+            self.view = self.base = None
+            self._buffer.resize(_file_length(nbytes, len(self._buffer)))
+            self._map(shape)
+        elif shape[1:] != self.base.shape[1:]:
+            self._map(shape)
+        self.view = self.base[:shape[0]]
+        # fill new areas with fillvalue, the never written parts of the
+        # file are already zeros
+        if shape[0] > oldsize:
+            fillvalue_ = 0 if self.dtype == OBJECT else self._fillvalue
+            row = nbytes // shape[0]
+            if fillvalue_ == 0:
+                end = min(shape[0], -(-self._dirty // row) if row else 0)
+            else:
+                end = shape[0]
+            if end > oldsize:
+                self.view[oldsize:end] = fillvalue_
+        self._dirty = max(self._dirty, nbytes)
+
+    def advise(self, access, start=0, stop=None):
+        """Advise the kernel of the access pattern of the rows between start
+        and stop, one of 'normal', 'random', 'sequential' or 'willneed'.
+        Return False if madvise is not available."""
+        if MADVICE is None or self._buffer is None or not self.view.size:
+            return False
+        row = self.view.nbytes // len(self.view)
+        if stop is None:
+            stop = len(self.view)
+        begin = start * row // PAGESIZE * PAGESIZE
+        end = min(stop * row, len(self._buffer))
+        if end > begin:
+            self._buffer.madvise(MADVICE[access], begin, end - begin)
+        return True
 
     def __getitem__(self, args):
         if self.dtype != OBJECT:
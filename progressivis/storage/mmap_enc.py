@@ -18,6 +18,7 @@ MAX_SHORT = 32
 MAX_SHORT_BIT_LENGTH = MAX_SHORT.bit_length()
 LRU_MAX_SIZE = 128
 FREELIST_SIZE = 63
+GROWTH = 2
 MAX_OVERSIZE = 3 # we can reuse a chunk at most 2**MAX_OVERSIZE times greater than required
 
 def _ofs(idx):
@@ -50,7 +51,8 @@ class MMapObject(object):
         if size > len(self.mmap):
             #pages = (size + PAGESIZE-1) // PAGESIZE * (1+PAGESIZE)
             pages = (size + PAGESIZE-1) // PAGESIZE + 1
-            self._allocate(pages)
+            # grow geometrically for amortized O(1) additions
+            self._allocate(max(pages, len(self.mmap) * GROWTH // PAGESIZE))
 
     def __len__(self):
         return self.sizes[0]
@@ -0,0 +1,407 @@
+"""
+Storage engine keeping the datasets in memory within a memory budget.
+
+The datasets live in memory as numpy datasets while they are used. When the
+memory they take exceeds the `storage.memory_budget` option, the least
+recently used datasets are spilled to mmap files in the directory of the
+`StorageManager`. Accesses to a spilled dataset are served by its file, and
+it is loaded back in memory once the bytes read from the file amount to its
+size, so that scattered reads over datasets larger than the budget do not
+move them back and forth.
+"""
+from __future__ import absolute_import, division, print_function
+
+import os
+import shutil
+from collections import OrderedDict
+import threading
+import logging
+
+import numpy as np
+
+from progressivis.core.utils import get_random_name
+from progressivis.core.config import get_option
+from progressivis.core.storagemanager import StorageManager
+from .base import StorageEngine, Dataset
+from .hierarchy import GroupImpl, AttributeImpl
+from .numpy import NumpyDataset
+from .mmap import MMapDataset, OBJECT
+
+logger = logging.getLogger(__name__)
+
+SPILL_DIRECTORY = 'tiered_spill'
+
+
+class TieredDataset(Dataset):
+    """
+    Dataset held by a numpy dataset while it is in memory, or by a mmap
+    dataset once spilled to disk. The mmap file is kept until the dataset is
+    closed, and only written again when the dataset has changed. The memory
+    of datasets of objects only counts the references to the objects.
+    """
+    def __init__(self, engine, name, shape=None, dtype=None, data=None,
+                 **kwds):
+        self._engine = engine
+        self._name = name
+        self._attrs = AttributeImpl()
+        if data is not None:
+            data = np.asarray(data, dtype=dtype)
+            shape = data.shape
+            if dtype is None:
+                dtype = data.dtype
+        if dtype is None:
+            raise ValueError('dtype required when no data is provided')
+        dtype = np.dtype(dtype)
+        if not shape:
+            shape = (0,)
+        kwds.pop('maxshape', None)
+        self._fillvalue = kwds.pop('fillvalue', 0)
+        if kwds:
+            logger.warning('Ignored keywords in TieredDataset: %s', kwds)
+        if data is None:
+            data = np.full(shape, self._fillvalue, dtype=dtype)
+        self._memory = NumpyDataset(name, data=data, dtype=dtype,
+                                    fillvalue=self._fillvalue)
+        self._disk = None # mmap dataset, up to date when spilled
+        self._directory = None
+        self._dirty = True # the mmap dataset is older than the memory
+        self._disk_reads = 0 # bytes read from the file since spilled
+        self.nbytes = 0 # memory accounted by the engine
+        engine.access(self)
+
+    @property
+    def in_memory(self):
+        "Return True if the dataset is in memory, False if it is spilled"
+        return self._memory is not None
+
+    @property
+    def memory_size(self):
+        "Return the bytes of memory taken by the dataset"
+        if self._memory is None:
+            return 0
+        return self._memory.base.nbytes
+
+    @property
+    def disk_size(self):
+        "Return the bytes the dataset takes once loaded in memory"
+        return np.dtype(self.dtype).itemsize * int(np.prod(self.shape))
+
+    def _dataset(self):
+        return self._memory if self._memory is not None else self._disk
+
+    def _spill(self):
+        "Move the dataset to its mmap file, releasing its memory"
+        if self._memory is None:
+            return
+        memory = self._memory
+        if self._disk is None:
+            self._directory = self._engine.spill_directory(self._name)
+            self._disk = MMapDataset(self._directory, self._name,
+                                     shape=memory.shape, dtype=memory.dtype,
+                                     fillvalue=self._fillvalue)
+        elif self._dirty and self._disk.shape != memory.shape:
+            self._disk.resize(memory.shape)
+        if self._dirty and len(memory):
+            self._disk[:] = memory[:]
+        self._dirty = False
+        self._disk_reads = 0
+        self._memory = None
+
+    def _load(self):
+        "Move the dataset back in memory, keeping its mmap file"
+        if self._memory is not None:
+            return
+        disk = self._disk
+        data = disk[:] if len(disk) else np.empty(disk.shape, disk.dtype)
+        self._memory = NumpyDataset(self._name, data=data, dtype=disk.dtype,
+                                    fillvalue=self._fillvalue)
+
+    def close(self):
+        "Release the memory and the file of the dataset"
+        self._engine.forget(self)
+        if self._disk is not None:
+            self._disk.close()
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+        self._memory = self._disk = None
+
+    @property
+    def view(self):
+        dataset = self._engine.access(self)
+        if dataset is self._memory:
+            self._dirty = True # can be written through
+        return dataset.view
+
+    @property
+    def shape(self):
+        return self._dataset().shape
+
+    @property
+    def dtype(self):
+        return self._dataset().dtype
+
+    @property
+    def maxshape(self):
+        return self._dataset().maxshape
+
+    @property
+    def fillvalue(self):
+        return self._fillvalue
+
+    @property
+    def chunks(self):
+        return self._dataset().chunks
+
+    @property
+    def size(self):
+        return self._dataset().size
+
+    def resize(self, size, axis=None):
+        with self._engine.lock:
+            self._write().resize(size, axis)
+            self._engine.access(self)
+
+    def compact(self, indices, chunk_size=65536):
+        with self._engine.lock:
+            self._write().compact(indices, chunk_size)
+
+    def _write(self):
+        "Return the dataset to write, marking the file outdated if needed"
+        dataset = self._engine.access(self)
+        if dataset is self._memory:
+            self._dirty = True
+        return dataset
+
+    def advise(self, access, start=0, stop=None):
+        return self._dataset().advise(access, start, stop)
+
+    def __getitem__(self, args):
+        dataset = self._engine.access(self)
+        value = dataset[args]
+        if dataset is self._disk:
+            self._engine.read_disk(self, getattr(value, 'nbytes',
+                                                 self.dtype.itemsize))
+        return value
+
+    def __setitem__(self, args, val):
+        # hold the lock so the dataset is not spilled while written
+        with self._engine.lock:
+            self._write()[args] = val
+
+    def __len__(self):
+        return len(self._dataset())
+
+    @property
+    def attrs(self):
+        return self._attrs
+
+    @property
+    def name(self):
+        return self._name
+
+
+class TieredGroup(GroupImpl):
+    "Group of tiered groups and datasets."
+    def __init__(self, name=None, parent=None, engine=None):
+        if name is None:
+            name = get_random_name("tiered_")
+        super(TieredGroup, self).__init__(name, parent=parent)
+        self._engine = engine if engine is not None else parent.engine
+
+    @property
+    def engine(self):
+        "Return the storage engine managing the memory"
+        return self._engine
+
+    def create_dataset(self, name, shape=None, dtype=None, data=None, **kwds):
+        if name in self.dict:
+            raise KeyError('name %s already defined' % name)
+        kwds.pop('chunks', None)
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+        fillvalue = kwds.pop('fillvalue', None)
+        if fillvalue is None:
+            if dtype == OBJECT:
+                fillvalue = ''
+            else:
+                fillvalue = 0
+        arr = TieredDataset(self._engine, name, shape=shape, dtype=dtype,
+                            data=data, fillvalue=fillvalue, **kwds)
+        self.dict[name] = arr
+        return arr
+
+    def _create_group(self, name, parent):
+        return TieredGroup(name, parent=parent)
+
+    def free_item(self, item):
+        if isinstance(item, TieredDataset):
+            item.close()
+        elif isinstance(item, TieredGroup):
+            item.close_all()
+
+    def close_all(self):
+        "Release all the datasets of this group and its subgroups"
+        for item in self.dict.values():
+            self.free_item(item)
+
+    def delete(self):
+        "Delete the group and release its datasets"
+        self.close_all()
+        self.dict.clear()
+        if self.parent is not None and self._name in self.parent.dict:
+            del self.parent.dict[self._name]
+
+
+class TieredStorageEngine(StorageEngine, TieredGroup):
+    """
+    StorageEngine keeping the datasets in memory until they take more than
+    `storage.memory_budget` bytes, then spilling the least recently used
+    datasets to disk. A budget of None keeps everything in memory.
+    """
+    def __init__(self, budget=None):
+        StorageEngine.__init__(self, "tiered")
+        TieredGroup.__init__(self, '/', None, engine=self)
+        self._budget = budget
+        self._lru = OrderedDict() # datasets in memory, least recent first
+        self._used = 0
+        self._recent = None # most recently used dataset
+        self._directory = None
+        self.lock = threading.RLock()
+
+    @property
+    def budget(self):
+        "Return the bytes of memory the datasets can take, or None"
+        if self._budget is not None:
+            return self._budget
+        return get_option('storage.memory_budget')
+
+    @budget.setter
+    def budget(self, budget):
+        self._budget = budget
+        with self.lock:
+            self._enforce(None)
+
+    @property
+    def used(self):
+        "Return the bytes of memory taken by the datasets"
+        return self._used
+
+    def spill_directory(self, name):
+        "Return a new directory for the files of a spilled dataset"
+        if self._directory is None or not os.path.isdir(self._directory):
+            self._directory = StorageManager.default.filename(SPILL_DIRECTORY)
+            if not os.path.isdir(self._directory):
+                os.makedirs(self._directory)
+        directory = os.path.join(self._directory,
+                                 get_random_name(name[:16]+'_'))
+        os.mkdir(directory)
+        return directory
+
+    def access(self, dataset):
+        """Mark the dataset as the most recently used if it is in memory and
+        spill the least recently used datasets to stay within the budget.
+        A spilled dataset is loaded back in memory only when the budget is
+        None, see `read_disk` otherwise. Return the numpy or mmap dataset
+        to use."""
+        memory = dataset._memory
+        if dataset is self._recent and memory is not None and \
+           memory.base.nbytes == dataset.nbytes:
+            return memory # already the most recent, nothing changed
+        budget = self.budget
+        with self.lock:
+            if not dataset.in_memory:
+                if budget is not None:
+                    return dataset._dataset()
+                self._promote(dataset)
+            return self._touch(dataset, budget)
+
+    def read_disk(self, dataset, nbytes):
+        """Account the bytes read from the file of a spilled dataset, loading
+        it back in memory once they amount to its size."""
+        with self.lock:
+            if dataset.in_memory:
+                return
+            dataset._disk_reads += nbytes
+            size = dataset.disk_size
+            budget = self.budget
+            if dataset._disk_reads < size or \
+               (budget is not None and size > budget):
+                return # cheaper to read from the file, or too large
+            self._promote(dataset)
+            self._touch(dataset, budget)
+
+    def _promote(self, dataset):
+        dataset._load()
+        logger.debug('Loaded dataset %s in memory', dataset.name)
+
+    def _touch(self, dataset, budget):
+        key = id(dataset)
+        self._lru.pop(key, None)
+        self._lru[key] = dataset
+        nbytes = dataset.memory_size
+        self._used += nbytes - dataset.nbytes
+        dataset.nbytes = nbytes
+        self._recent = dataset
+        if budget is not None and self._used > budget:
+            self._enforce(dataset)
+        return dataset._dataset()
+
+    def _enforce(self, keep):
+        """Spill the least recently used datasets until within budget, keep
+        being spilled last if it does not fit in the budget alone."""
+        budget = self.budget
+        if budget is None:
+            return
+        for dataset in list(self._lru.values()):
+            if self._used <= budget:
+                return
+            if dataset is not keep:
+                self.spill(dataset)
+        if keep is not None and self._used > budget:
+            self.spill(keep)
+
+    def spill(self, dataset):
+        "Spill a dataset to disk"
+        with self.lock:
+            self._lru.pop(id(dataset), None)
+            if dataset is self._recent:
+                self._recent = None
+            dataset._spill()
+            self._used -= dataset.nbytes
+            dataset.nbytes = 0
+        logger.debug('Spilled dataset %s to disk', dataset.name)
+
+    def forget(self, dataset):
+        "Stop accounting the memory of a dataset"
+        with self.lock:
+            if dataset is self._recent:
+                self._recent = None
+            if self._lru.pop(id(dataset), None) is not None:
+                self._used -= dataset.nbytes
+                dataset.nbytes = 0
+
+    def flush(self):
+        pass
+
+    def close(self, name=None, flags=None, **kwds):
+        "Release all the datasets"
+        self.close_all()
+        self.dict.clear()
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def __contains__(self, name):
+        return TieredGroup.__contains__(self, name)
+
+    @staticmethod
+    def create_group(name=None, create=True):
+        root = StorageEngine.engines()['tiered']
+        if name in root.dict:
+            if create:
+                name = get_random_name(name[:16]+'_')
+            else:
+                return root.dict[name]
+        group = TieredGroup(name, parent=root)
+        root.dict[group.name] = group
+        return group
@@ -1,6 +1,7 @@
 from __future__ import absolute_import, division, print_function
 
 from .column import Column
+from .column_categorical import CategoricalColumn
 from .row import Row
 from .table import Table, BaseTable
 from .table_selected import TableSelectedView
@@ -9,6 +10,7 @@ from .changemanager_table_selected import TableSelectedChangeManager
 from .tracer import TableTracer  # initialize Tracert.default
 
 __all__ = ['Column',
+           'CategoricalColumn',
            'Row',
            'Table',
            'BaseTable',
@@ -10,6 +10,7 @@ from ..core.slot import SlotDescriptor
 from .module import TableModule
 from ..core.bitmap import bitmap
 from .table import Table
+from .column_categorical import CategoricalColumn
 
 
 ops = {"<":   operator.__lt__,
@@ -84,7 +85,13 @@ class CmpQueryLast(TableModule):
             if colname in table_data:
                 arg1 = table_data._column(colname)
                 arg2 = last[colname]
-                res = self._op(arg1[indices], arg2)
+                if isinstance(arg1, CategoricalColumn) and self.op in ('==', '!='):
+                    # compare the codes instead of the values
+                    res = arg1.equal(arg2, indices)
+                    if self.op == '!=':
+                        res = ~res
+                else:
+                    res = self._op(arg1[indices], arg2)
                 res = ids[res]
                 if results is None:
                     results = bitmap(res)
@@ -4,6 +4,7 @@ from collections import Iterable
 import logging
 
 import numpy as np
+import h5py
 
 from progressivis.storage import Group
 from progressivis.core.utils import integer_types, get_random_name
@@ -202,9 +203,15 @@ class Column(BaseColumn):
     def value(self):
         return self.dataset[:]
 
+    def encode(self, values):
+        "Return the array of values converted to the dtype of the dataset"
+        if values.dtype != self.dtype:
+            values = np.asarray(values, dtype=self.dtype)
+        return values
+
     def __getitem__(self, index):
-        if isinstance(index, np.ndarray):
-            index = list(index)
+        if isinstance(index, np.ndarray) and isinstance(self.dataset, h5py.Dataset):
+            index = list(index) # h5py does not accept arrays of indices
         try: # EAFP
             return self.dataset[index]
         except TypeError:
@@ -214,7 +221,8 @@ class Column(BaseColumn):
 
     def read_direct(self, array, source_sel=None, dest_sel=None):
         if hasattr(self.dataset, 'read_direct'):
-            if isinstance(source_sel, np.ndarray) and source_sel.dtype==np.int:
+            if isinstance(source_sel, np.ndarray) and source_sel.dtype==np.int \
+               and isinstance(self.dataset, h5py.Dataset):
                 source_sel = list(source_sel)
 #            if is_fancy(source_sel):
 #                source_sel = fancy_to_mask(source_sel, self.shape)
@@ -0,0 +1,208 @@
+"""
+Column of dictionary-encoded values.
+"""
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+import operator
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_categorical_dtype
+
+from progressivis.core.bitmap import bitmap
+from .column_base import BaseColumn
+from .column import Column
+from .dshape import dshape_create, OBJECT, CODES
+from . import metadata
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["CategoricalColumn"]
+
+# code of the missing values
+MISSING = -1
+# code of a value not in the dictionary, matching no row
+UNKNOWN = -2
+
+
+class CategoricalColumn(Column):
+    """
+    Column of strings stored as integer codes in a numpy dataset, with a
+    dictionary of the values shared by all the rows.
+
+    The column is created for the fields declared `categorical` in the
+    dshape of a table, the dictionary starting with the declared
+    categories and growing with the values written in the column.
+    Reading the column returns the values, `codes` returns the codes so
+    comparisons, group-bys and histograms can run on the integers.
+    """
+    def __init__(self, name, index, base=None, storagegroup=None,
+                 dshape=None, fillvalue=None,
+                 shape=None, chunks=None, data=None, indices=None):
+        self._categories = []
+        self._codes = {}
+        self._lookup = None
+        super(CategoricalColumn, self).__init__(name, index, base=base,
+                                                storagegroup=storagegroup,
+                                                dshape=dshape,
+                                                fillvalue=fillvalue,
+                                                shape=shape, chunks=chunks,
+                                                data=data, indices=indices)
+
+    def create_dataset(self, dshape, fillvalue, shape=None, chunks=None):
+        dshape = dshape_create(dshape)
+        self._set_categories(dshape.measure.categories)
+        fillvalue = self._encode_value(fillvalue)
+        dataset = super(CategoricalColumn, self).create_dataset(dshape,
+                                                                fillvalue,
+                                                                shape=shape,
+                                                                chunks=chunks)
+        dataset.attrs[metadata.ATTR_CATEGORIES] = self._categories
+        return dataset
+
+    def load_dataset(self, dshape, nrow, shape=None, is_id=False):
+        dataset = super(CategoricalColumn, self).load_dataset(dshape, nrow,
+                                                              shape, is_id)
+        if dataset is not None:
+            self._set_categories(dataset.attrs[metadata.ATTR_CATEGORIES])
+        return dataset
+
+    def _set_categories(self, categories):
+        self._categories = list(categories)
+        self._codes = {value: code for (code, value)
+                       in enumerate(self._categories)}
+        self._lookup = None
+
+    @property
+    def categories(self):
+        "Return the list of the values of the dictionary, indexed by code"
+        return self._categories
+
+    @property
+    def dtype(self):
+        return OBJECT
+
+    @property
+    def codes(self):
+        "Return the array of the codes of the column"
+        return self.dataset[:]
+
+    def code(self, value):
+        """Return the code of value, MISSING for None or UNKNOWN when the
+        value is not in the dictionary."""
+        if _is_missing(value):
+            return MISSING
+        return self._codes.get(value, UNKNOWN)
+
+    def _encode_value(self, value):
+        if _is_missing(value):
+            return MISSING
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._categories)
+            self._categories.append(value)
+            self._codes[value] = code
+            self._lookup = None
+        return code
+
+    def encode(self, values):
+        """Return the codes of the values, adding the new values to the
+        dictionary."""
+        count = len(self._categories)
+        if values is None or np.isscalar(values):
+            codes = CODES.type(self._encode_value(values))
+        else:
+            if isinstance(values, (pd.Series, BaseColumn)):
+                values = values.values
+            if is_categorical_dtype(getattr(values, 'dtype', None)):
+                values = pd.Categorical(values)
+                (labels, uniques) = (values.codes, values.categories)
+            else:
+                (labels, uniques) = pd.factorize(np.asarray(values,
+                                                            dtype=OBJECT))
+            # the label -1 of the missing values picks the last code
+            mapping = np.array([self._encode_value(v) for v in uniques]
+                               + [MISSING], dtype=CODES)
+            codes = mapping[labels]
+        if len(self._categories) != count and self.dataset is not None:
+            self.dataset.attrs[metadata.ATTR_CATEGORIES] = self._categories
+        return codes
+
+    def decode(self, codes):
+        "Return the values of the codes"
+        lookup = self._lookup
+        if lookup is None:
+            # the code MISSING picks the last value, None
+            lookup = np.empty(len(self._categories)+1, dtype=OBJECT)
+            lookup[:-1] = self._categories
+            self._lookup = lookup
+        return lookup[codes]
+
+    @property
+    def value(self):
+        return self.decode(self.dataset[:])
+
+    def __getitem__(self, index):
+        return self.decode(super(CategoricalColumn, self).__getitem__(index))
+
+    def read_direct(self, array, source_sel=None, dest_sel=None):
+        # the dataset holds the codes, let the base class decode them
+        return BaseColumn.read_direct(self, array, source_sel, dest_sel)
+
+    def __setitem__(self, index, val):
+        super(CategoricalColumn, self).__setitem__(index, self.encode(val))
+
+    def binary(self, operation, other, **kwargs):
+        if operation in (operator.eq, operator.ne) and \
+           (other is None or np.isscalar(other)):
+            return operation(self.codes, self.code(other))
+        return super(CategoricalColumn, self).binary(operation, other, **kwargs)
+
+    def equal(self, value, index=None):
+        """Return the boolean array of the rows at index equal to value,
+        comparing the codes."""
+        codes = self.dataset[:] if index is None else \
+                super(CategoricalColumn, self).__getitem__(index)
+        return codes == self.code(value)
+
+    def _indices_codes(self, index):
+        if index is None:
+            index = np.arange(self.size)
+            if self.index is not None and self.index.has_freelist():
+                free = np.asarray(self.index.freelist(), dtype=np.int64)
+                index = np.delete(index, free)
+        elif isinstance(index, slice):
+            index = np.arange(*index.indices(self.size))
+        elif isinstance(index, bitmap):
+            index = np.asarray(index.to_array(), dtype=np.int64)
+        else:
+            index = np.asarray(index, dtype=np.int64)
+        return (index, np.asarray(self.dataset[:])[index])
+
+    def histogram(self, index=None):
+        """Return the array of the number of rows at index holding each
+        category, the rows of the table by default."""
+        (_, codes) = self._indices_codes(index)
+        codes = codes[codes >= 0]
+        return np.bincount(codes, minlength=len(self._categories))
+
+    def groups(self, index=None):
+        """Return an ordered dictionary of the categories of the rows at
+        index with the array of the indices of their rows, the rows of the
+        table by default. Rows with missing values are left out."""
+        (index, codes) = self._indices_codes(index)
+        order = np.argsort(codes, kind='mergesort')
+        # shift the codes so the missing values count first
+        counts = np.bincount(codes+1, minlength=len(self._categories)+1)
+        bounds = np.cumsum(counts)
+        rows = index[order]
+        groups = OrderedDict()
+        for code in np.flatnonzero(counts[1:]):
+            groups[self._categories[code]] = rows[bounds[code]:bounds[code+1]]
+        return groups
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
@@ -7,7 +7,7 @@ import logging
 
 from progressivis.core.utils import integer_types, is_none_alike, norm_slice
 from progressivis.core.fast import indices_to_slice
-from progressivis.core.intdict import IntDict
+from progressivis.core.runindex import RunIndex, id_index
 from progressivis.core.index_update import IndexUpdate
 from progressivis.core.config import get_option
 from progressivis.core.bitmap import bitmap
@@ -143,9 +143,16 @@ class IdColumn(Column):
         self._is_identity = False
         valid_ids = olddataset[:] if indices is None else indices
         if indices is None:
-            self._ids_dict = IntDict(valid_ids, valid_ids)
+            self._ids_dict = id_index(valid_ids, valid_ids)
         else:
-            self._ids_dict = IntDict(valid_ids, np.arange(self.size))
+            self._ids_dict = id_index(valid_ids, np.arange(self.size))
+
+    def _check_ids_dict(self):
+        "Switch the run index to a hash table when the runs become too short"
+        ids = self._ids_dict
+        if isinstance(ids, RunIndex) and ids.fragmented():
+            logger.info('# Switching to a hash table index for %s', self.name)
+            self._ids_dict = ids.to_intdict()
 
     def load_dataset(self, dshape, nrow, shape=None):
         if dshape is None:
@@ -241,7 +248,7 @@ class IdColumn(Column):
                 # indices is None or == newindices, super.resize works
                 super(IdColumn, self).resize(newsize)
                 indices = newindices
-                self.add_created(indices)
+                self.add_created(slice(oldsize, newsize))
                 self._last_id += incr
                 self.dataset.attrs[IdColumn.ATTR_LAST_ID] = self._last_id
                 return indices
@@ -276,7 +283,8 @@ class IdColumn(Column):
             self._really_create_dataset()
         else:
             new_locs = self[start:end] if locs is None else locs
-            self._ids_dict.update(new_locs,range(start, end))
+            self._ids_dict.update(new_locs, np.arange(start, end))
+            self._check_ids_dict()
             self.add_created(new_locs)
 
     def _delete_ids(self, locs, index=None):
@@ -336,6 +344,49 @@ class IdColumn(Column):
             index = [index]
         elif isinstance(locs, slice):
             locs = range(*locs.indices(end))
+        if isinstance(ids, RunIndex):
+            self._delete_runs(ids, locs, index, end)
+        else:
+            self._delete_dict(ids, locs, index)
+        self._check_ids_dict()
+
+        # Shrink the dataset if possible
+        end -= 1
+        old_end = end
+        while end >= 0:
+            if self.dataset[end] >= 0:
+                break
+            self._freelist.remove(end)
+            end -= 1
+        if old_end != end:
+            super(IdColumn, self).resize(end+1)
+        return end+1
+
+    def _delete_runs(self, ids, locs, index, end):
+        locs = self._ids_array(locs)
+        if isinstance(index, slice):
+            index = np.arange(index.start, index.stop, index.step or 1)
+        index = np.asarray(index, dtype=np.int64).ravel()
+        if len(index) != len(locs):
+            # inclusive slices of ids can have one more index, like in
+            # _delete_dict, only the ids paired with an index are deleted
+            count = min(len(index), len(locs))
+            (locs, index) = (locs[:count], index[:count])
+        found = ids.remove_items(locs)
+        if not np.all(found):
+            logger.error('Tried to delete nonexistent ids %s', locs[~found])
+        index = index[found]
+        invalid = index == IdColumn.INVALID_ID
+        if np.any(invalid):
+            logger.error('Invalid index -1 for ids %s to delete',
+                         locs[found][invalid])
+        index = index[np.logical_and(~invalid, index < end)]
+        if len(index):
+            self.dataset[index] = IdColumn.INVALID_ID
+            self._freelist.update(index)
+
+    def _delete_dict(self, ids, locs, index):
+        end = int(self.size)
         if isinstance(index, np.ndarray):
             index = np.nditer(index)  # Beware, nditer flattens the array, which is ok here
         elif isinstance(index, slice):
@@ -356,18 +407,24 @@ class IdColumn(Column):
         except TypeError:
             logger.error('Unrecognized locs(%s) or index(%s) types',
                          locs, index)
-            
-        # Shrink the dataset if possible
-        end -= 1
-        old_end = end
-        while end >= 0:
-            if self.dataset[end] >= 0:
-                break
-            self._freelist.remove(end)
-            end -= 1
-        if old_end != end:
-            super(IdColumn, self).resize(end+1)
-        return end+1
+
+    def compact(self):
+        """
+        Remove the free slots, moving the ids to keep them contiguous.
+        Return the array of the previous indices of the rows, or None if
+        there was no free slot. The ids are not changed.
+        """
+        if not self._freelist:
+            return None
+        self._flush_cache()
+        live = bitmap(range(0, self.size)) - self._freelist
+        indices = np.frombuffer(live.to_array(), dtype=np.uint32).astype(np.int64)
+        size = len(indices)
+        self.dataset.compact(indices)
+        self._freelist = bitmap()
+        super(IdColumn, self).resize(size)
+        self._ids_dict = id_index(self.dataset[:size], np.arange(size))
+        return indices
 
     def __contains__(self, loc):
         v = Loc.dispatch(loc)
@@ -429,21 +486,29 @@ class IdColumn(Column):
             if loc < 0:
                 loc = self._last_id+loc
             return self._ids_dict[loc]
+        else:
+            ret = self._ids_dict.get_items(self._ids_array(loc))
+        return indices_to_slice(ret) if as_slice else ret
+
+    def _ids_array(self, loc):
+        "Return a new int64 array of the ids in loc"
+        if isinstance(loc, bitmap):
+            return np.frombuffer(loc.to_array(),
+                                 dtype=np.uint32).astype(np.int64)
+        elif isinstance(loc, np.ndarray):
+            return loc.astype(np.int64)
+        elif isinstance(loc, slice): # slices are inclusive
+            loc_stop = self.last_id if loc.stop is None else loc.stop+1
+            return np.arange(loc.start or 0, loc_stop, loc.step or 1,
+                             dtype=np.int64)
         elif isinstance(loc, Iterable):
             try:
                 count = len(loc)
                 # pylint: disable=bare-except
             except:
                 count=-1
-            ret = np.fromiter(loc, dtype=np.int64, count=count)
-            ret = self._ids_dict.get_items(ret)
-        elif isinstance(loc, slice):
-            loc_stop = self.last_id if loc.stop is None else loc.stop+1
-            ret = np.array(range(loc.start, loc_stop, loc.step or 1), dtype=np.int64)
-            ret = self._ids_dict.get_items(ret)
-        else:
-            raise ValueError('id_to_index not implemented for id "%s"' % loc)
-        return indices_to_slice(ret) if as_slice else ret
+            return np.fromiter(loc, dtype=np.int64, count=count)
+        raise ValueError('id_to_index not implemented for id "%s"' % loc)
 
     def remove_module(self, mid):
         #TODO
@@ -457,6 +522,8 @@ class IdColumn(Column):
                 locs = iter(self.dataset)
         elif isinstance(locs, integer_types):
             locs = [locs]
+        elif isinstance(locs, bitmap):
+            return locs
         return bitmap(locs)
 
     # begin(Change management)
@@ -4,6 +4,7 @@ from .column_id import IdColumn
 from .column_proxy import ColumnProxy
 import numpy as np
 from ..core.bitmap import bitmap
+from ..core.index_update import IndexUpdate
 from ..core.utils import is_none_alike, is_full_slice
 
 class IdColumnSelectedView(ColumnProxy):
@@ -78,7 +79,9 @@ class IdColumnSelectedView(ColumnProxy):
     def compute_updates(self, start, now, mid=None, cleanup=True):
         mask = self.update_mask
         updates = self.base.compute_updates(start, now, mid, cleanup=cleanup)
-        updates.created &= mask
-        updates.updated &= mask
-        updates.deleted &= mask
-        return updates
+        if updates is None:
+            return None
+        # the updates can be shared with other consumers
+        return IndexUpdate(created=updates.created & mask,
+                           updated=updates.updated & mask,
+                           deleted=updates.deleted & mask)
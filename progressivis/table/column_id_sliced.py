@@ -5,6 +5,7 @@ from .column_id import IdColumn
 from .loc import Loc
 
 from ..core.bitmap import bitmap
+from ..core.index_update import IndexUpdate
 
 
 class IdColumnSlicedView(ColumnSlicedView):
@@ -51,7 +52,9 @@ class IdColumnSlicedView(ColumnSlicedView):
         #TODO the mask should be maintained in ID space, not index space
         mask = self.update_mask
         updates = self._base.compute_updates(start, now, mid, cleanup=True)
-        updates.created &= mask
-        updates.updated &= mask
-        updates.deleted &= mask
-        return updates
+        if updates is None:
+            return None
+        # the updates can be shared with other consumers
+        return IndexUpdate(created=updates.created & mask,
+                           updated=updates.updated & mask,
+                           deleted=updates.deleted & mask)
@@ -0,0 +1,154 @@
+"""
+Binary columnar format to send the contents of tables, e.g. to a browser.
+
+The format is made of a header and of the buffers of the columns:
+
+* the length of the header as a little-endian uint32,
+* the header, a JSON object in utf-8,
+* the buffers, each starting at a multiple of 8 bytes from the beginning
+  of the data so they can be mapped by javascript typed arrays.
+
+The header describes the columns in the `columns` list, each with its
+`name`, `dtype` (a numpy dtype string, always little-endian), `shape` and
+`buffers`, a list of `[offset, nbytes]` relative to the beginning of the
+data. Numeric columns have one buffer containing their values, NaN values
+are kept as is. String columns have the `dtype` `"str"` and two buffers,
+the int32 offsets of the values in the second one, in utf-8 like for
+Arrow. The ids of the rows are stored in the `index` entry with the same
+layout when present. Any other item of the header is free, such as the
+`start`, `stop` and `total` of row windows.
+"""
+from __future__ import absolute_import, division, print_function
+
+from collections import OrderedDict
+import json
+import struct
+
+import six
+import numpy as np
+
+__all__ = ['encode_columns', 'decode_columns']
+
+ALIGNMENT = 8
+STRING = 'str'
+_HEADER_LEN = struct.Struct('<I')
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def _little_endian(array):
+    array = np.asarray(array)
+    dtype = array.dtype.newbyteorder('<')
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+def _as_text(value):
+    if value is None:
+        return b''
+    if isinstance(value, six.binary_type):
+        return value
+    return six.text_type(value).encode('utf-8')
+
+
+def _string_buffers(array):
+    values = [_as_text(v) for v in array.ravel().tolist()]
+    offsets = np.zeros(len(values)+1, dtype='<i4')
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    return [offsets, np.frombuffer(b''.join(values), dtype=np.uint8)]
+
+
+def _describe(name, array):
+    "Return the description of an array and its list of buffers"
+    array = np.asarray(array)
+    if array.dtype.kind in 'OSU':
+        return ({'name': name, 'dtype': STRING, 'shape': list(array.shape)},
+                _string_buffers(array))
+    array = _little_endian(array)
+    return ({'name': name, 'dtype': array.dtype.str,
+             'shape': list(array.shape)}, [array])
+
+
+def encode_columns(columns, index=None, **info):
+    """
+    Encode the columns, a mapping of names to arrays, and the index
+    array if specified, in the binary columnar format. The keyword
+    arguments are stored in the header.
+    """
+    descs = []
+    buffers = []
+    for (name, array) in six.iteritems(columns):
+        (desc, bufs) = _describe(name, array)
+        descs.append(desc)
+        buffers.append(bufs)
+    header = dict(info)
+    header['columns'] = descs
+    if index is not None:
+        (desc, bufs) = _describe('index', index)
+        header['index'] = desc
+        descs = descs + [desc]
+        buffers.append(bufs)
+    # the offsets depend on the size of the header, itself depending on
+    # the number of digits of the offsets, so they are computed from a
+    # first estimate of the header size until it does not change
+    header_size = 0
+    while True:
+        pos = _HEADER_LEN.size + header_size
+        pos += _padding(pos)
+        for (desc, bufs) in zip(descs, buffers):
+            desc['buffers'] = []
+            for buf in bufs:
+                desc['buffers'].append([pos, buf.nbytes])
+                pos += buf.nbytes + _padding(buf.nbytes)
+        text = json.dumps(header).encode('utf-8')
+        if len(text) <= header_size:
+            break
+        header_size = len(text)
+    text += b' ' * (header_size - len(text))
+    chunks = [_HEADER_LEN.pack(len(text)), text]
+    size = _HEADER_LEN.size + len(text)
+    chunks.append(b'\0' * _padding(size))
+    for bufs in buffers:
+        for buf in bufs:
+            chunks.append(buf.tobytes())
+            chunks.append(b'\0' * _padding(buf.nbytes))
+    return b''.join(chunks)
+
+
+def _decode_array(data, desc):
+    shape = tuple(desc['shape'])
+    if desc['dtype'] == STRING:
+        ((off, nbytes), (text, _)) = desc['buffers']
+        offsets = np.frombuffer(data, dtype='<i4', count=nbytes // 4,
+                                offset=off)
+        values = data[text:text+int(offsets[-1])]
+        strings = [values[offsets[i]:offsets[i+1]].decode('utf-8')
+                   for i in range(len(offsets)-1)]
+        array = np.empty(len(strings), dtype=object)
+        array[:] = strings
+        return array.reshape(shape)
+    ((off, nbytes),) = desc['buffers']
+    dtype = np.dtype(desc['dtype'])
+    array = np.frombuffer(data, dtype=dtype, count=nbytes // dtype.itemsize,
+                          offset=off)
+    return array.reshape(shape)
+
+
+def decode_columns(data):
+    """
+    Decode data in the binary columnar format, returning the header, the
+    index array or None, and an ordered dictionary of the column arrays.
+    The numeric arrays are read-only views on `data`.
+    """
+    data = memoryview(data).tobytes() if not isinstance(data, bytes) else data
+    (size,) = _HEADER_LEN.unpack_from(data, 0)
+    header = json.loads(data[_HEADER_LEN.size:_HEADER_LEN.size+size]
+                        .decode('utf-8'))
+    columns = OrderedDict()
+    for desc in header['columns']:
+        columns[desc['name']] = _decode_array(data, desc)
+    index = None
+    if 'index' in header:
+        index = _decode_array(data, header['index'])
+    return (header, index, columns)
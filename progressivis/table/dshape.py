@@ -5,6 +5,7 @@ import pandas as pd
 import numpy as np
 import h5py
 import six
+from pandas.api.types import is_categorical_dtype
 from progressivis.core.utils import integer_types, gen_columns
 
 def dshape_print(dshape):
@@ -31,14 +32,27 @@ def dshape_to_shape(dshape, var=None):
 
 OBJECT = np.dtype('O')
 VSTRING = h5py.special_dtype(vlen=str)
+# dtype of the codes of categorical columns
+CODES = np.dtype(np.int32)
+
+def dshape_is_categorical(dshape):
+    "Return True if the values of dshape are dictionary-encoded"
+    return isinstance(dshape.measure, ds.Categorical)
+
+def dshape_categorical(categories=()):
+    return str(ds.Categorical(list(categories)))
 
 def dshape_to_h5py(dshape):
+    if dshape_is_categorical(dshape):
+        return CODES.str
     dtype = dshape.measure.to_numpy_dtype()
     if dtype == OBJECT:
         return VSTRING
     return dtype.str
 
 def dshape_from_dtype(dtype):
+    if is_categorical_dtype(dtype):
+        return dshape_categorical(dtype.categories)
     if dtype is str:
         return "string"
     if dtype is object:
@@ -67,6 +81,8 @@ def dshape_extract(data, columns=None):
     return None
 
 def dataframe_dshape(dtype):
+    if is_categorical_dtype(dtype):
+        return dshape_categorical(dtype.categories)
     if dtype == OBJECT:
         return "string"
     else:
@@ -106,12 +122,18 @@ def dshape_from_pytable(pt):
     return ds.dshape("{"+shape+"}")
 
 
-def dshape_from_dataframe(df):
+def dshape_from_dataframe(df, categorical=()):
+    """Return the dshape of a DataFrame, the string columns named in
+    categorical being dictionary-encoded."""
+    def _dshape(c):
+        if c in categorical:
+            return dshape_categorical()
+        return dataframe_dshape(df[c].dtype)
     columns=df.columns
     if columns.dtype==np.int64:
-        shape = ",".join(["_%s:%s"%(df[c].name, dataframe_dshape(df[c].dtype)) for c in df])
+        shape = ",".join(["_%s:%s"%(df[c].name, _dshape(c)) for c in df])
     else:
-        shape = ",".join(["%s:%s"%(df[c].name, dataframe_dshape(df[c].dtype)) for c in df])
+        shape = ",".join(["%s:%s"%(df[c].name, _dshape(c)) for c in df])
     return ds.dshape("{"+shape+"}")
 
 #myds = dshape("{a: int, b: float32, c: string, d:string, e:string, f:int32, g:float32}")
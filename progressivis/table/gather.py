@@ -0,0 +1,131 @@
+"""
+Gather the rows of columns into dense arrays, copying contiguous runs of
+rows as blocks.
+"""
+from __future__ import absolute_import, division, print_function
+
+import numpy as np
+
+from progressivis.core.bitmap import bitmap
+
+# runs shorter than this on average are gathered with fancy indexing
+MIN_RUN_LENGTH = 16
+
+
+def index_runs(indices):
+    """
+    Return the arrays of the starts and stops of the runs of consecutive
+    indices in `indices`, a slice, a bitmap or an array of indices.
+    """
+    if isinstance(indices, slice):
+        start = indices.start or 0
+        if indices.step not in (None, 1):
+            indices = np.arange(start, indices.stop, indices.step)
+        else:
+            return (np.array([start], dtype=np.int64),
+                    np.array([max(start, indices.stop)], dtype=np.int64))
+    if isinstance(indices, bitmap):
+        indices = np.frombuffer(indices.to_array(), dtype=np.uint32)
+    indices = np.asarray(indices, dtype=np.int64).ravel()
+    if len(indices) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return (empty, empty)
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = indices[np.concatenate(([0], breaks))]
+    stops = indices[np.concatenate((breaks-1, [len(indices)-1]))] + 1
+    return (starts, stops)
+
+
+def split_runs(starts, stops, chunk_rows):
+    """
+    Split the runs in chunks of at most `chunk_rows` rows, yielding the
+    starts and stops of the runs of each chunk.
+    """
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return
+    if total <= chunk_rows:
+        yield (starts, stops)
+        return
+    ends = np.cumsum(lengths) # position after each run in the output
+    for first in range(0, total, chunk_rows):
+        last = min(first + chunk_rows, total)
+        lo = int(np.searchsorted(ends, first, side='right'))
+        hi = int(np.searchsorted(ends, last, side='left')) + 1
+        cstarts = starts[lo:hi].copy()
+        cstops = stops[lo:hi].copy()
+        # cut the first and last runs at the chunk boundaries
+        cstarts[0] += first - (ends[lo] - lengths[lo])
+        cstops[-1] -= ends[hi-1] - last
+        yield (cstarts, cstops)
+
+
+def window_runs(starts, stops, start=None, stop=None):
+    """
+    Return the starts and stops of the runs cut to keep the rows between
+    the positions `start` and `stop` in the concatenation of the runs.
+    """
+    lengths = stops - starts
+    ends = np.cumsum(lengths) # position after each run in the output
+    total = int(ends[-1]) if len(ends) else 0
+    stop = total if stop is None else max(0, min(stop, total))
+    start = 0 if start is None else max(0, min(start, stop))
+    firsts = ends - lengths
+    keep = (ends > start) & (firsts < stop)
+    wstarts = starts[keep] + np.maximum(start - firsts[keep], 0)
+    wstops = stops[keep] - np.maximum(ends[keep] - stop, 0)
+    return (wstarts, wstops)
+
+
+def run_indices(starts, stops):
+    "Return the array of the indices of the runs"
+    lengths = stops - starts
+    count = int(lengths.sum())
+    return np.repeat(starts - np.cumsum(lengths) + lengths, lengths) \
+        + np.arange(count)
+
+
+def advise(columns, access, start=0, stop=None):
+    "Advise the storage of the columns of the access pattern of their rows"
+    for column in columns:
+        advise_ = getattr(getattr(column, 'dataset', None), 'advise', None)
+        if advise_ is not None:
+            advise_(access, start, stop)
+
+
+def gather(columns, offsets, starts, stops, out):
+    """
+    Copy the rows of the runs of the columns in `out`, column `i` going in
+    the columns `offsets[i]:offsets[i+1]` of `out`.
+    """
+    lengths = stops - starts
+    count = int(lengths.sum())
+    if len(starts) * MIN_RUN_LENGTH > count:
+        indices = run_indices(starts, stops)
+        for (i, column) in enumerate(columns):
+            values = column[indices]
+            _store(out, slice(0, count), offsets[i], offsets[i+1], values)
+        return count
+    for (i, column) in enumerate(columns):
+        pos = 0
+        for (start, stop) in zip(starts.tolist(), stops.tolist()):
+            end = pos + stop - start
+            dest = _dest(slice(pos, end), offsets[i], offsets[i+1], column)
+            column.read_direct(out, slice(start, stop), dest)
+            pos = end
+    return count
+
+
+def _dest(rows, start, stop, column):
+    if len(column.shape) == 1:
+        return (rows, start)
+    return (rows, slice(start, stop))
+
+
+def _store(out, rows, start, stop, values):
+    values = np.asarray(values)
+    if values.ndim == 1:
+        out[rows, start] = values
+    else:
+        out[rows, start:stop] = values
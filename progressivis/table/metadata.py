@@ -8,5 +8,6 @@ ATTR_DATASHAPE = 'PROGRESSIVE_DATASHAPE'
 ATTR_VERSION = 'PROGRESSIVE_VERSION'
 VALUE_VERSION = "0.0"
 ATTR_COLUMN = 'PROGRESSIVE_COLUMN'
+ATTR_CATEGORIES = 'PROGRESSIVE_CATEGORIES'
 ATTR_DATASHAPE = 'PROGRESSIVE_DATASHAPE'
 
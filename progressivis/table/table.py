@@ -13,16 +13,23 @@ import numexpr as ne
 
 import six
 
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
 from progressivis.core.utils import (integer_types, get_random_name,
                                      all_int, are_instances, gen_columns)
 from progressivis.core.fast import indices_to_slice
+from progressivis.core.config import get_option
 from progressivis.storage import Group
 from .dshape import (dshape_create, dshape_table_check, dshape_fields,
                      dshape_to_shape, dshape_extract, dshape_compatible,
-                     dshape_from_dtype)
+                     dshape_from_dtype, dshape_is_categorical)
 from . import metadata
 from .table_base import BaseTable
 from .column import Column
+from .column_categorical import CategoricalColumn
 from .column_id import IdColumn
 
 if six.PY2:
@@ -160,7 +167,7 @@ class Table(BaseTable):
         self._ids = IdColumn()
         self._ids.load_dataset(dshape=None, nrow=nrow)
         for (name, dshape) in dshape_fields(self._dshape):
-            column = self._create_column(name)
+            column = self._create_column(name, dshape)
             column.load_dataset(dshape=dshape,
                                 nrow=nrow,
                                 shape=dshape_to_shape(dshape))
@@ -180,14 +187,18 @@ class Table(BaseTable):
             fillvalue = fillvalues.get(name, None)
             chunks = self._chunks_for(name)
             #TODO compute chunks according to the shape
-            column = self._create_column(name)
+            column = self._create_column(name, dshape)
             column.create_dataset(dshape=dshape,
                                   chunks=chunks,
                                   fillvalue=fillvalue,
                                   shape=shape)
 
-    def _create_column(self, name):
-        column = Column(name, self._ids, storagegroup=self.storagegroup)
+    def _create_column(self, name, dshape=None):
+        if dshape is not None and dshape_is_categorical(dshape):
+            column = CategoricalColumn(name, self._ids,
+                                       storagegroup=self.storagegroup)
+        else:
+            column = Column(name, self._ids, storagegroup=self.storagegroup)
         index = len(self._columns)
         self._columndict[name] = index
         self._columns.append(column)
@@ -243,13 +254,42 @@ class Table(BaseTable):
         self._ids._delete_ids(locs, index)
         if self._storagegroup is not None:
             self._storagegroup.release(index)
+        ratio = get_option('table.compact_ratio')
+        if ratio is not None:
+            free = self._ids.freelist_size()
+            if free >= get_option('table.compact_min_free', 0) and \
+               free >= ratio * self._ids.size:
+                self.compact()
         #del
         # for column in self._columns:
         #    column.update()
 
+    def compact(self):
+        """
+        Rewrite the rows densely, removing the slots left by deleted rows.
+
+        The ids of the rows are kept so the change managers following the
+        table are not affected, only the indices of the rows change.
+        Return the array of the previous indices of the rows, `remap[i]`
+        being the previous index of the row now at index `i`, or None if
+        the table had no free slot.
+        """
+        remap = self._ids.compact()
+        if remap is None:
+            return None
+        size = len(remap)
+        for column in self._columns:
+            column.dataset.compact(remap)
+            column.resize(size)
+        self._storagegroup.attrs[metadata.ATTR_NROWS] = size
+        logger.info('Compacted table %s to %d rows', self.name, size)
+        return remap
+
     def parse_data(self, data, indices=None):
         if data is None:
             return None
+        if is_record_batch(data):
+            return record_batch_arrays(data)
         if isinstance(data, Mapping):
             if are_instances(data.values(), np.ndarray) or are_instances(data.values(), list):
                 return data # Table can parse this
@@ -265,6 +305,17 @@ class Table(BaseTable):
         """
         if data is None:
             return
+        if pa is not None and isinstance(data, pa.Table):
+            for batch in data.to_batches():
+                self.append(batch, indices=indices[:batch.num_rows]
+                            if indices is not None else None)
+                if indices is not None:
+                    indices = indices[batch.num_rows:]
+            return
+        arrays = self._column_arrays(data)
+        if arrays is not None:
+            self._append_arrays(arrays, indices)
+            return
         data = self.parse_data(data, indices)
         dshape = dshape_extract(data)
         if not dshape_compatible(dshape, self.dshape):
@@ -296,6 +347,46 @@ class Table(BaseTable):
                 for i in range(length):
                     tocol[indices[i]] = fromcol[i]
 
+    def _column_arrays(self, data):
+        """Return the arrays of the columns of data when it is a record
+        batch, a DataFrame or a dictionary of numpy arrays, or None."""
+        if is_record_batch(data):
+            data = record_batch_arrays(data)
+        elif isinstance(data, pd.DataFrame):
+            if data.columns.dtype == np.int64:
+                return None # columns renamed by dshape_from_dataframe
+            data = {c: data[c].values for c in data.columns}
+        elif not (isinstance(data, Mapping) and
+                  are_instances(data.values(), np.ndarray)):
+            return None
+        arrays = []
+        for colname in self:
+            if colname not in data:
+                raise ValueError('Missing column "%s" in append' % colname)
+            arrays.append(data[colname])
+        return arrays
+
+    def _append_arrays(self, arrays, indices=None):
+        """Append a list of arrays, one per column, writing each array in
+        the column dataset with one copy when the new rows are contiguous."""
+        if not arrays:
+            return
+        length = len(arrays[0])
+        for array in arrays:
+            if len(array) != length:
+                raise ValueError('Cannot append ragged values')
+        if length == 0:
+            return
+        if indices is not None and len(indices) != length:
+            raise ValueError('Bad index length (%d/%d)' % (len(indices), length))
+        indices = indices_to_slice(self._allocate(length, indices))
+        for (column, array) in zip(self._columns, arrays):
+            if isinstance(indices, slice):
+                # the rows are already reported as created, no need to touch
+                column.dataset[indices] = column.encode(array)
+            else:
+                column[indices] = array
+
     def add(self, row, index=None):
         "Add one row to the Table"
         assert len(row) == self.ncol
@@ -435,3 +526,27 @@ class Table(BaseTable):
         return Table(name=name,
                      data=OrderedDict(data),
                      indices=self._ids.values[indices])
+
+
+def is_record_batch(data):
+    "Return True if data is an Arrow RecordBatch"
+    return pa is not None and isinstance(data, pa.RecordBatch)
+
+
+def record_batch_arrays(batch):
+    """Return an OrderedDict of the columns of an Arrow RecordBatch as numpy
+    arrays, sharing the Arrow buffers when the types allow it."""
+    arrays = OrderedDict()
+    for (name, column) in zip(batch.schema.names, batch.columns):
+        array = None
+        if column.null_count == 0:
+            try:
+                array = column.to_numpy(zero_copy_only=True)
+            except (pa.ArrowInvalid, NotImplementedError, TypeError):
+                pass
+        if array is None:
+            array = np.asarray(column.to_pandas())
+            if array.dtype.kind in 'US':
+                array = array.astype(object)
+        arrays[name] = array
+    return arrays
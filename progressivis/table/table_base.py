@@ -11,11 +11,14 @@ import numpy as np
 
 from progressivis.core.utils import (integer_types, 
                                      all_string_or_int, all_bool,
-                                     indices_len, remove_nan,
+                                     remove_nan,
                                      is_none_alike, inter_slice, fix_loc, get_physical_base)
 from progressivis.core.config import get_option
 from progressivis.core.bitmap  import bitmap
 from .dshape import (dshape_print, dshape_join, dshape_union)
+from .gather import (index_runs, split_runs, window_runs, run_indices, gather,
+                     advise)
+from .columnar import encode_columns
 
 if six.PY2:
     from itertools import imap
@@ -27,6 +30,26 @@ logger = logging.getLogger(__name__)
 
 FAST = 1
 
+
+def _nan_to_none(array):
+    "Return the array as a list, with NaN values replaced by None"
+    if array.dtype.kind != 'f':
+        return array.tolist()
+    nans = np.isnan(array)
+    if not nans.any():
+        return array.tolist()
+    values = array.astype(object)
+    values[nans] = None
+    return values.tolist()
+
+
+def _rows(lists, index):
+    "Iterate over the rows of the column lists"
+    if not lists:
+        return ([] for _ in index)
+    return zip(*lists)
+
+
 class _BaseLoc(object):
     # pylint: disable=too-few-public-methods
     def __init__(self, this_table, as_loc=True):
@@ -226,89 +249,76 @@ class BaseTable(six.with_metaclass(ABCMeta, object)):
         "Return a dictionary describing the contents of this columns."
         return self.to_dict(**kwds)
 
-    def to_dict(self, orient='dict', columns=None):
+    def to_dict(self, orient='dict', columns=None, start=None, stop=None):
         # pylint: disable=too-many-branches
         """
         Return a dictionary describing the contents of this columns.
 
         Parameters
         ----------
-        orient : {'dict', 'list', 'split', 'rows', 'record', 'index'}
-            TODO
+        orient : {'dict', 'list', 'split', 'datatable', 'records', 'index'}
+            The layout of the result, as in pandas, 'datatable' returning the
+            list of rows starting with their id, with NaN replaced by None.
         columns : list or `None`
-            TODO
+            The columns to return, or all the columns when `None`
+        start, stop : int or `None`
+            The positions of the first row and after the last row to return,
+            to page through the table.
         """
         if columns is None:
             columns = self.columns
+        (starts, stops) = self._window_runs(start, stop)
+        index = self.index_to_id(run_indices(starts, stops)).tolist()
+        values = [self._gather_column(name, starts, stops) for name in columns]
         if orient == 'dict':
             ret = OrderedDict()
-            for name in columns:
-                col = self[name]
-                ret[name] = dict(zip(self.index,
-                                     col.tolist()))
+            for (name, array) in zip(columns, values):
+                ret[name] = dict(zip(index, array.tolist()))
             return ret
         if orient == 'list':
             ret = OrderedDict()
-            for name in columns:
-                col = self[name]
-                ret[name] = col.tolist()
-            return ret
-        if orient == 'split':
-            ret = {'index': self.index.tolist(),
-                   'columns': columns}
-            data = []
-            cols = [self[c] for c in columns]
-            for i in self.index:
-                line = []
-                for col in cols:
-                    #col_i = col[i]
-                    #if isinstance(col_i, np.ndarray):
-                    #    col_i = col_i.tolist()
-
-                    line.append(get_physical_base(col).loc[i])
-                data.append(line)
-            ret['data'] = data
+            for (name, array) in zip(columns, values):
+                ret[name] = array.tolist()
             return ret
-        #if orient == 'rows':
-        #    data = []
-        #    cols = [self[c] for c in columns]
-        #    for i in self.index:
-        #        line = [i]
-        #        for col in cols:
-        #            line.append(str(col[i]))
-        #        data.append(dict(zip(columns, line)))
-        #    return data
         if orient == 'datatable': # not a pandas compliant mode but useful for JS DataTable
-            ret = []
-            for i in self.index:
-                line = [i]
-                for name in columns:
-                    col = self[name]
-                    line.append(remove_nan(get_physical_base(col).loc[i]))
-                ret.append(line)
-            return ret
+            lists = [_nan_to_none(array) for array in values]
+            return [[i] + list(row) for (i, row) in zip(index, _rows(lists, index))]
+        lists = [array.tolist() for array in values]
+        if orient == 'split':
+            return {'index': index,
+                    'columns': columns,
+                    'data': [list(row) for row in _rows(lists, index)]}
         if orient in ('rows', 'records'):
-            ret = []
-            for i in self.index:
-                line = OrderedDict()
-                for name in columns:
-                    col = self[name]
-                    #line[name] = remove_nan_etc(col.values[i])
-                    line[name] = get_physical_base(col).loc[i]
-                ret.append(line)
-            return ret
+            return [OrderedDict(zip(columns, row)) for row in _rows(lists, index)]
         if orient == 'index':
             ret = OrderedDict()
-            for id_ in self.index:
-                line = {}
-                for name in columns:
-                    col = self[name]
-                    #line[name] = remove_nan_etc(col.values[i])
-                    line[name] = col.loc[id_]
-                ret[int(id_)] = line
+            for (id_, row) in zip(index, _rows(lists, index)):
+                ret[id_] = dict(zip(columns, row))
             return ret
         raise ValueError("to_dict(orient) not implemented for orient={}".format(orient))
 
+    def to_bytes(self, columns=None, start=None, stop=None):
+        """
+        Return the contents of the columns in the binary columnar format of
+        `progressivis.table.columnar`, with the ids of the rows as index.
+        Much faster than `to_dict` for large tables.
+
+        Parameters are the same as `to_dict`, the header also contains the
+        `start`, `stop` and `total` number of rows.
+        """
+        if columns is None:
+            columns = self.columns
+        (starts, stops) = self._window_runs(start, stop)
+        data = OrderedDict()
+        for name in columns:
+            data[name] = self._gather_column(name, starts, stops)
+        index = self.index_to_id(run_indices(starts, stops))
+        total = len(self)
+        start = 0 if start is None else max(0, min(start, total))
+        return encode_columns(data, index=index, name=self.name,
+                              start=start, stop=start+len(index),
+                              total=total)
+
     def to_csv(self, filename, columns=None, sep=','): # TODO: to be improved
         if columns is None:
             columns = self.columns
@@ -600,53 +610,103 @@ class BaseTable(six.with_metaclass(ABCMeta, object)):
         self._setitem_iterable(indices, rowkey, values)
 
 
-    def to_array(self, locs=None, columns=None):
-        """Convert this table to a numpy array
-
-        Parameters
-        ----------
-        locs: a list of ids or None
-            The rows to extract.  Locs can be specified with multiple formats:
-            integer, list, numpy array, Iterable, or slice.
-        columns: a list or None
-            the columns to extract
-        """
+    def _array_layout(self, columns):
         if columns is None:
             columns = self.columns
-
         shapes = [self[c].shape for c in columns]
         offsets = self.column_offsets(columns, shapes)
         dtypes = [self[c].dtype for c in columns]
         dtype = np.find_common_type(dtypes, [])
-        indices = None
-        #TODO split the copy in chunks
+        return ([self._column(c) for c in columns], offsets, dtype)
+
+    def _locs_to_indices(self, locs):
+        "Return the indices of the rows at locs as a slice, bitmap or array"
         if locs is None:
+            if self.base is not None:
+                return self.id_to_index(slice(None, None))
             if self._ids.has_freelist():
-                indices = self._ids[:]
-                mask = np.one(locs.shape, dtype=np.bool)
-                mask[self._ids.freelist()] = False
-                indices = np.ma.masked_array(indices, mask)
-            else:
-                indices = slice(0, self.size)
+                return bitmap(range(0, self._ids.size)) - self._ids.freelist()
+            return slice(0, self.size)
         elif isinstance(locs, (list, np.ndarray)):
-            indices = np.asarray(locs, np.int64)
-            indices = self.id_to_index(indices)
-        elif isinstance(locs, Iterable):
-            indices = self.id_to_index(indices)
+            # id_to_index can overwrite its argument
+            return self.id_to_index(np.array(locs, dtype=np.int64))
         elif isinstance(locs, integer_types):
-            indices = self.id_to_index(slice(locs, locs+1, 1))
-        elif isinstance(locs, slice):
-            indices = self.id_to_index(locs)
-
-        arr = np.empty((indices_len(indices), offsets[-1]), dtype=dtype)
-        for i, column in enumerate(columns):
-            col = self._column(column)
-            shape = shapes[i]
-            if len(shape) == 1:
-                col.read_direct(arr, indices, dest_sel=np.s_[:, offsets[i]])
-            else:
-                col.read_direct(arr, indices, dest_sel=np.s_[:, offsets[i]:offsets[i+1]])
-        return arr
+            return self.id_to_index(slice(locs, locs, 1)) # inclusive
+        elif isinstance(locs, (slice, Iterable)):
+            return self.id_to_index(locs)
+        raise ValueError('Invalid locs %s' % locs)
+
+    def _window_runs(self, start=None, stop=None):
+        "Return the runs of indices of the rows between start and stop"
+        (starts, stops) = index_runs(self._locs_to_indices(None))
+        if start is None and stop is None:
+            return (starts, stops)
+        return window_runs(starts, stops, start, stop)
+
+    def _gather_column(self, name, starts, stops):
+        "Return the array of the values of a column in the runs"
+        column = self._column(name)
+        count = int((stops - starts).sum())
+        out = np.empty((count,)+tuple(column.shape[1:]), dtype=column.dtype)
+        width = column.shape[1] if len(column.shape) > 1 else 1
+        gather([column], [0, width], starts, stops, out.reshape(count, width))
+        return out
+
+    def array_buffer(self, rows, columns=None):
+        """Return an uninitialized array with `rows` rows for the values of
+        the columns, to be passed as the `out` argument of `to_array` or
+        `iter_array`."""
+        (_, offsets, dtype) = self._array_layout(columns)
+        return np.empty((rows, offsets[-1]), dtype=dtype)
+
+    def to_array(self, locs=None, columns=None, out=None):
+        """Convert this table to a numpy array
+
+        Parameters
+        ----------
+        locs: a list of ids or None
+            The rows to extract.  Locs can be specified with multiple formats:
+            integer, list, numpy array, bitmap, Iterable, or slice.
+        columns: a list or None
+            the columns to extract
+        out: a 2d numpy array or None
+            an array to fill, with enough rows and columns, see `array_buffer`.
+            The array returned is then a view on its first rows.
+        """
+        (cols, offsets, dtype) = self._array_layout(columns)
+        (starts, stops) = index_runs(self._locs_to_indices(locs))
+        count = int((stops - starts).sum())
+        if out is None:
+            out = np.empty((count, offsets[-1]), dtype=dtype)
+        elif out.shape[0] < count or out.shape[1] < offsets[-1]:
+            raise ValueError('Array of shape %s too small for %d rows of %d columns'
+                             % (out.shape, count, offsets[-1]))
+        gather(cols, offsets, starts, stops, out)
+        return out[:count]
+
+    def iter_array(self, locs=None, columns=None, max_bytes=16*1024*1024,
+                   out=None):
+        """Iterate over the rows at locs as numpy arrays of at most
+        `max_bytes`, or as many rows as `out` when specified. The arrays
+        returned share the same memory and are only valid until the next one.
+
+        Parameters are the same as `to_array`.
+        """
+        (cols, offsets, dtype) = self._array_layout(columns)
+        (starts, stops) = index_runs(self._locs_to_indices(locs))
+        if out is None:
+            count = int((stops - starts).sum())
+            row_bytes = max(1, offsets[-1] * dtype.itemsize)
+            out = np.empty((max(1, min(count, max_bytes // row_bytes)),
+                            offsets[-1]), dtype=dtype)
+        elif out.shape[1] < offsets[-1]:
+            raise ValueError('Array of shape %s too small for %d columns'
+                             % (out.shape, offsets[-1]))
+        if len(starts):
+            advise(cols, 'sequential', int(starts[0]), int(stops[-1]))
+        for (cstarts, cstops) in split_runs(starts, stops, len(out)):
+            count = gather(cols, offsets, cstarts, cstops, out)
+            yield out[:count]
 
     def unary(self, op, **kwargs):
         axis = kwargs.get('axis', 0) # get() is cheeper than pop(), it avoids to update unused kwargs
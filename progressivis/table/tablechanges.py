@@ -3,141 +3,146 @@ TableChanges keep track of the changes (creation, updates, deletions) in tables/
 """
 from __future__ import absolute_import, division, print_function
 
-import bisect
 import logging
 
+import six
 
 from ..core.index_update import IndexUpdate
 from ..core.bitmap import bitmap
+from ..core.utils import Lock
 from .tablechanges_base import BaseChanges
 
 logger = logging.getLogger(__name__)
 
 
-class Bookmark(object):
-    # pylint: disable=too-few-public-methods
-    "Bookmark for changes"
-    __slots__ = ['time', 'refcount', 'update']
-    def __init__(self, time, refcount=1, update=None):
-        self.time = time
-        self.refcount = refcount
-        self.update = update
-
-
 class TableChanges(BaseChanges):
-    "Keep track of changes in tables"
+    """
+    Keep track of changes in tables in a log of segments shared by all the
+    consumers, each reading it from its own cursor.
+
+    The changes are collected in the last segment of the log. When a
+    consumer reads the changes, the last segment is closed if it is not
+    empty and the consumer gets the segments between its cursor and the
+    end of the log, combined if there are several. Consumers reading the
+    same segments share the same result, which they should not modify.
+    Segments are released as soon as all the cursors have passed them.
+    """
     def __init__(self):
-        self._times = []     # list of times sorted
-        self._bookmarks = [] # list of bookmarks synchronized with times
-        self._mid_time = {}  # time associated with last mid update
+        self._segments = [] # log of IndexUpdate, the last one is open
+        self._first = 0     # position of the first segment of the log
+        self._cursors = {}  # mid -> [time, position of the next segment]
+        self._combined = None # (start, end, IndexUpdate) last segments combined
+        # consumers of the same table can run concurrently in a ParallelScheduler
+        self._lock = Lock()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Add a function called without argument after each change,
+        possibly from another thread than the scheduler."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        "Remove a listener added with `add_listener`"
+        # a new list, _notify can be iterating over the current one
+        self._listeners = [l for l in self._listeners if l != listener]
+
+    def _notify(self):
+        for listener in self._listeners:
+            listener()
+
+    def segment_count(self):
+        "Return the number of segments in the log"
+        return len(self._segments)
 
     def _last_update(self):
-        if not self._bookmarks:
+        if not self._segments:
             return None
-        return self._bookmarks[-1].update
-
-    def _saved_index(self, time):
-        times = self._times
-        i = bisect.bisect_left(times, time)
-        if i != len(times) and times[i] == time:
-            return i
-        return -1
-
-    def _save_time(self, time, mid):
-        if  mid in self._mid_time:
-            # reset
-            logger.debug('Reset received for module %s', mid)
-            last_time = self._mid_time[mid]
-            i = self._saved_index(last_time)
-            assert i != -1
-            bookmark = self._bookmarks[i]
-            if bookmark.time != last_time:
-                raise ValueError('Invalid module time in compute_updates %s instead of %s',
-                                 last_time, bookmark.time)
-            bookmark.refcount -= 1
-            if bookmark.refcount == 0:
-                del self._times[i]
-                del self._bookmarks[i]
-            else:
-                logger.info('refcount is not 0 in reset %s', mid)
-            del self._mid_time[mid]
-
-        self._mid_time[mid] = time
-        if self._times and self._times[-1] == time:
-            bookmark = self._bookmarks[-1]
-            bookmark.refcount += 1
-            return
-        assert  self._saved_index(time) == -1  # double check
-        bookmark = Bookmark(time)
-        self._times.append(time)
-        if not self._bookmarks:
-            update = IndexUpdate(created=None, deleted=None, updated=None)
+        return self._segments[-1]
+
+    def _end(self):
+        "Close the last segment if needed and return the position of the new one"
+        segments = self._segments
+        if not segments:
+            segments.append(IndexUpdate())
         else:
-            update = self._bookmarks[-1].update
-        self._bookmarks.append(bookmark)
-        # if some changes have already been collected, we create a fresh IndexUpdate,
-        # otherwise we share the same entry: multiple times will share the same set of changes.
-        if update.created or update.deleted or update.updated:
-            update = IndexUpdate()
-        bookmark.update = update
-        assert len(self._bookmarks) == len(self._times)
+            update = segments[-1]
+            if update.created or update.updated or update.deleted:
+                segments.append(IndexUpdate())
+        return self._first + len(segments) - 1
+
+    def _release(self):
+        "Release the segments read by all the consumers"
+        if self._cursors:
+            start = min(cursor[1] for cursor in six.itervalues(self._cursors))
+        else:
+            start = self._first + len(self._segments)
+        if start > self._first:
+            del self._segments[:start-self._first]
+            self._first = start
 
     def add_created(self, locs):
-        update = self._last_update()
-        if update is None:
-            return
-        update.add_created(locs)
+        with self._lock:
+            update = self._last_update()
+            if update is not None:
+                update.add_created(locs)
+        self._notify()
 
     def add_updated(self, locs):
-        update = self._last_update()
-        if update is None:
-            return
-        update.add_updated(locs)
+        with self._lock:
+            update = self._last_update()
+            if update is not None:
+                update.add_updated(locs)
+        self._notify()
 
     def add_deleted(self, locs):
-        update = self._last_update()
-        if update is None:
-            return
-        update.add_deleted(locs)
+        with self._lock:
+            update = self._last_update()
+            if update is not None:
+                update.add_deleted(locs)
+        self._notify()
 
     def compute_updates(self, last, now, mid, cleanup=True):
         assert mid is not None
-        time = now
+        with self._lock:
+            return self._compute_updates(last, now, mid)
+
+    def _compute_updates(self, last, now, mid):
         if last == 0:
-            self._save_time(time, mid)
+            if mid in self._cursors:
+                logger.debug('Reset received for module %s', mid)
+            # the consumer will start with all the items of the table
+            self._cursors[mid] = [now, self._end()]
+            self._release()
             return None
-        assert last == self._mid_time[mid]
-        i = self._saved_index(last)
-        bookmark = self._bookmarks[i]
-        update = bookmark.update
-        for j in range(i+1, len(self._bookmarks)):
-            if self._bookmarks[j].update is not update:
-                update = self._combine_updates(update, j)
-                break
-
-        bookmark.refcount -= 1
-        if bookmark.refcount == 0:
-            del self._times[i]
-            del self._bookmarks[i]
+        cursor = self._cursors[mid]
+        if cursor[0] != last:
+            raise ValueError('Invalid module time in compute_updates %s instead of %s',
+                             last, cursor[0])
+        start = cursor[1]
+        end = self._end()
+        cursor[0] = now
+        cursor[1] = end
+        if end - start == 1:
+            update = self._segments[start-self._first]
+        elif end == start: # nothing new
+            update = IndexUpdate()
         else:
-            logger.info('refcount is not 0 in %s', mid)
-        del self._mid_time[mid]
-        self._save_time(time, mid)
+            update = self._combine_updates(start, end)
+        self._release()
         return update
 
-    def _combine_updates(self, update, start):
-        #TODO reuse cached results if it matches
-        new_u = IndexUpdate(
-            created=bitmap(update.created),
-            deleted=bitmap(update.deleted),
-            updated=bitmap(update.updated))
-
-        last_u = None
-        for i in range(start, len(self._bookmarks)):
-            update = self._bookmarks[i].update
-            if update is last_u:
-                continue
-            new_u.combine(update)
-            last_u = new_u
-        #TODO cache results to reuse it if necessary
-        return new_u
+    def _combine_updates(self, start, end):
+        combined = self._combined
+        if combined is not None and combined[0] == start and combined[1] == end:
+            return combined[2]
+        segments = self._segments
+        first = segments[start-self._first]
+        update = IndexUpdate(
+            created=bitmap(first.created),
+            deleted=bitmap(first.deleted),
+            updated=bitmap(first.updated))
+        for i in range(start+1-self._first, end-self._first):
+            update.combine(segments[i])
+        self._combined = (start, end, update)
+        return update
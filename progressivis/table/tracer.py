@@ -2,7 +2,9 @@ from __future__ import absolute_import, division, print_function
 
 from ..core.tracer_base import Tracer
 from .table import Table
+from collections import OrderedDict
 import numpy as np
+import six
 import os
 
 class TableTracer(Tracer):
@@ -14,6 +16,7 @@ class TableTracer(Tracer):
                      "detail: string,"
                      "loadavg: real,"
                      "run: int64,"
+                     "quantum: real,"
                      "steps: int32,"
                      #"reads: int32,"
                      #"updates: int32,"
@@ -32,6 +35,7 @@ class TableTracer(Tracer):
         ('detail', ''),
         ('loadavg', np.nan),
         ('run', 0),
+        ('quantum', np.nan),
         ('steps', 0),
         #('reads', 0),
         #('updates', 0),
@@ -42,25 +46,103 @@ class TableTracer(Tracer):
         ('progress_max', 0.0),
         ('quality', 0.0)
         ])
+    TRACER_DTYPES = OrderedDict([
+        ('type', object),
+        ('start', np.float64),
+        ('end', np.float64),
+        ('duration', np.float64),
+        ('detail', object),
+        ('loadavg', np.float64),
+        ('run', np.int64),
+        ('quantum', np.float64),
+        ('steps', np.int32),
+        ('steps_run', np.int32),
+        ('next_state', np.int32),
+        ('progress_current', np.float64),
+        ('progress_max', np.float64),
+        ('quality', np.float64)
+        ])
+    # columns of the step events taken from the values returned by run_step
+    STEP_COLUMNS = ['next_state', 'progress_current', 'progress_max', 'quality']
+
+    LOADAVG_PERIOD = 1.0 # seconds between two reads of the load average
 
-    def __init__(self, name, storagegroup):
+    def __init__(self, name, storagegroup, capacity=1024, step_sampling=1):
+        """
+        Keep the last `capacity` events in preallocated arrays, used as a
+        ring buffer. The `trace_stats` table is only synchronized with the
+        arrays when requested. When `step_sampling` is greater than 1, only
+        one step out of `step_sampling` is traced.
+        """
+        if capacity < 1 or step_sampling < 1:
+            raise ValueError('Invalid capacity (%s) or step_sampling (%s)' %
+                             (capacity, step_sampling))
         self.table = Table('trace_'+name, dshape=TableTracer.TRACER_DSHAPE,
                            storagegroup=storagegroup,
                            chunks=256)
-        self.table.add(TableTracer.TRACER_INIT)
+        self.capacity = capacity
+        self.step_sampling = step_sampling
+        self._events = {}
+        for (colname, dtype) in six.iteritems(self.TRACER_DTYPES):
+            self._events[colname] = np.empty(capacity, dtype=dtype)
+        self._count = 0  # number of events traced so far
+        self._synced = 0 # number of events copied in the table
+        self._loadavg = np.nan
+        self._loadavg_time = -np.inf
         self.step_count = 0
         self.last_run_step_start = None
-        self.last_run_step_details = []
+        self.last_run_step_details = ''
         self.last_run_start = None
-        self.last_run_details = []
+        self.last_run_details = ''
+        self._add_event(TableTracer.TRACER_INIT)
+
+    def _add_event(self, row):
+        pos = self._count % self.capacity
+        events = self._events
+        for (colname, value) in six.iteritems(row):
+            events[colname][pos] = value
+        self._count += 1
+
+    def _get_loadavg(self, ts):
+        if ts - self._loadavg_time >= self.LOADAVG_PERIOD:
+            self._loadavg = os.getloadavg()[0]
+            self._loadavg_time = ts
+        return self._loadavg
+
+    def event_count(self):
+        "Return the number of events traced so far"
+        return self._count
+
+    def events(self, colname):
+        "Return the values of a column for the events kept, oldest first"
+        column = self._events[colname]
+        if self._count <= self.capacity:
+            return column[:self._count]
+        return np.roll(column, -(self._count % self.capacity))
+
+    def _sync(self):
+        table = self.table
+        length = min(self._count, self.capacity)
+        if len(table) < length:
+            table.resize(length)
+        if self._count > self.capacity:
+            start = 0 # the events have moved, copy them all
+        else:
+            start = self._synced
+        for colname in self.TRACER_DTYPES:
+            table[colname][start:length] = self.events(colname)[start:length]
+        self._synced = self._count
 
     def trace_stats(self, max_runs=None):
+        if self._synced != self._count:
+            self._sync()
         return self.table
 
     def start_run(self,ts,run_number,**kwds):
         self.last_run_start = dict(TableTracer.TRACER_INIT)
         self.last_run_start['start'] = ts
         self.last_run_start['run'] = run_number
+        self.last_run_start['quantum'] = kwds.get('quantum', np.nan)
         self.step_count = 0
 
     def end_run(self,ts,run_number,**kwds):
@@ -71,12 +153,12 @@ class TableTracer(Tracer):
         row['duration'] = ts - row['start']
         row['detail'] = self.last_run_details if self.last_run_details else ''
         row['steps'] = self.step_count
-        row['loadavg'] = os.getloadavg()[0]
+        row['loadavg'] = self._get_loadavg(ts)
         row['type'] = 'run'
         row['progress_current'] = kwds.get('progress_current', 0.0)
         row['progress_max'] = kwds.get('progress_max', 0.0)
         row['quality'] = kwds.get('quality', 0.0)
-        self.table.add(row)
+        self._add_event(row)
         self.last_run_details = ''
         self.last_run_start = None
         
@@ -84,30 +166,26 @@ class TableTracer(Tracer):
         self.last_run_details += ('stopped')
 
     def before_run_step(self,ts,run_number,**kwds):
-        self.last_run_step_start = {
-            'start': ts,
-            'run': run_number,
-            'steps': self.step_count }
+        self.last_run_step_start = ts
 
     def after_run_step(self,ts,run_number,**kwds):
-        row = self.last_run_step_start
-        last_run_start = self.last_run_start
-        for (name, dflt) in TableTracer.TRACER_INIT.items():
-            if name not in row:
-                row[name] = kwds.get(name, dflt)
-        row['end'] = ts
-        row['duration'] = ts - row['start']
-        row['detail'] = self.last_run_step_details if self.last_run_step_details else ''
-        #last_run_start['reads'] += row['reads']
-        #last_run_start['updates'] += row['updates']
-        #last_run_start['creates'] += row['creates']
-        last_run_start['steps_run'] += row['steps_run']
-        if 'debug' in kwds:
-            row['type'] = 'debug_step'
-        else:
-            row['type'] = 'step'
-        row['loadavg'] = os.getloadavg()[0]
-        self.table.add(row)
+        steps_run = kwds.get('steps_run', 0)
+        self.last_run_start['steps_run'] += steps_run
+        if self.step_count % self.step_sampling == 0:
+            start = self.last_run_step_start
+            row = {'type': 'debug_step' if 'debug' in kwds else 'step',
+                   'start': start,
+                   'end': ts,
+                   'duration': ts - start,
+                   'detail': self.last_run_step_details,
+                   'loadavg': self._get_loadavg(ts),
+                   'run': run_number,
+                   'quantum': np.nan,
+                   'steps': self.step_count,
+                   'steps_run': steps_run}
+            for name in self.STEP_COLUMNS:
+                row[name] = kwds.get(name, TableTracer.TRACER_INIT[name])
+            self._add_event(row)
         self.step_count += 1
         self.last_run_details = ''
         self.last_run_step_start = None
@@ -120,11 +198,10 @@ class TableTracer(Tracer):
 
     def get_speed(self, depth=15):
         res = []
-        non_zero = self.table.eval('steps_run!=0', as_slice=False)
-        sz = min(depth, len(non_zero))
-        idx = non_zero[-sz:]
-        for d, s in zip(self.table['duration'].loc[idx],
-                            self.table['steps_run'].loc[idx]):
+        steps_run = self.events('steps_run')
+        non_zero = np.flatnonzero(steps_run)
+        idx = non_zero[-depth:]
+        for d, s in zip(self.events('duration')[idx], steps_run[idx]):
             if np.isnan(d) or d==0:
                 if not s:
                     continue
@@ -1,6 +1,8 @@
 from progressivis.core.bitmap import bitmap
 from . import ProgressiveTest
 
+import numpy as np
+
 
 class TestBitmap(ProgressiveTest):
     def test_bitmap(self):
@@ -55,5 +57,27 @@ class TestBitmap(ProgressiveTest):
         with self.assertRaises(TypeError):
             bm = bm + "hello"
 
+    def test_bitmap_ranges(self):
+        bm = bitmap(np.arange(10, 20))
+        self.assertEqual(bm, bitmap(range(10, 20)))
+        self.assertTrue(bm.is_range())
+        bm.update(np.array([30, 25, 40]))
+        self.assertEqual(bm, bitmap(list(range(10, 20))+[25, 30, 40]))
+        self.assertFalse(bm.is_range())
+        bm.update(np.array([], dtype=np.int64))
+        self.assertEqual(len(bm), 13)
+        with self.assertRaises(OverflowError):
+            bitmap(np.array([1, -1]))
+        bm.update(slice(50, 60))
+        self.assertEqual(len(bm), 23)
+        # contiguous items are popped as slices
+        self.assertEqual(bm.pop(5, as_slice=True), slice(10, 15))
+        self.assertEqual(bm.pop(5), bitmap(range(15, 20)))
+        self.assertEqual(bm.pop(2, as_slice=True), bitmap([25, 30]))
+        self.assertEqual(bm.pop(1, as_slice=True), slice(40, 41))
+        self.assertEqual(bm.pop(100, as_slice=True), slice(50, 60))
+        self.assertEqual(bm.pop(10, as_slice=True), slice(0, 0))
+        self.assertEqual(len(bm), 0)
+
 if __name__ == '__main__':
     ProgressiveTest.main()
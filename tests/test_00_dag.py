@@ -0,0 +1,73 @@
+from . import ProgressiveTest
+
+from progressivis.core.dag import IncrementalDAG
+import numpy as np
+
+
+def _check_order(test, dag, dependencies):
+    order = dag.order()
+    position = {v: i for (i, v) in enumerate(order)}
+    for (v, deps) in dependencies.items():
+        for d in deps:
+            test.assertLess(position[d], position[v])
+
+
+def _descendants(dependencies, vertex):
+    succ = {}
+    for (v, deps) in dependencies.items():
+        for d in deps:
+            succ.setdefault(d, set()).add(v)
+    seen = {vertex}
+    stack = [vertex]
+    while stack:
+        for s in succ.get(stack.pop(), ()):
+            if s not in seen:
+                seen.add(s)
+                stack.append(s)
+    return seen
+
+
+class TestIncrementalDAG(ProgressiveTest):
+    def test_order(self):
+        dag = IncrementalDAG()
+        deps = {'a': set(), 'b': {'c'}, 'c': {'a'}, 'vis': {'b'}}
+        dag.update(deps, {'vis'})
+        _check_order(self, dag, deps)
+        self.assertEqual(dag.reachable('a'), {'a', 'c', 'b', 'vis'})
+        deps['d'] = {'a'}  # a branch leading to no visualization
+        dag.update(deps, {'vis'})
+        self.assertEqual(dag.reachable('a'), {'a', 'c', 'b', 'vis'})
+        self.assertEqual(dag.reachable('d'), set())
+        deps['vis'] = {'b', 'd'}
+        dag.update(deps, {'vis'})
+        self.assertEqual(dag.reachable('a'), {'a', 'c', 'b', 'd', 'vis'})
+        del deps['vis']
+        dag.update(deps, {'vis'})
+        self.assertNotIn('vis', dag)
+        self.assertEqual(dag.reachable('a'), set())
+        with self.assertRaises(ValueError):
+            dag.add_edge('b', 'a')
+
+    def test_random(self):
+        dag = IncrementalDAG()
+        names = ['m%d' % i for i in range(40)]
+        rng = np.random.RandomState(42)
+        rank = rng.permutation(len(names))
+        vis = set(names[:5])
+        deps = {}
+        for _ in range(30):
+            # random edits of an acyclic graph, following a hidden order
+            for v in rng.choice(names, 5):
+                deps[v] = {d for d in rng.choice(names, 3)
+                           if rank[names.index(d)] < rank[names.index(v)]}
+            for v in set(rng.choice(list(deps), 2)):
+                del deps[v]
+            dag.update(deps, vis)
+            _check_order(self, dag, deps)
+            for v in dag.vertices():
+                reach = _descendants(deps, v)
+                expected = {w for w in reach if _descendants(deps, w) & vis}
+                self.assertEqual(dag.reachable(v), expected)
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,70 @@
+from . import ProgressiveTest
+
+from progressivis.core.runindex import RunIndex, id_index
+from progressivis.core.intdict import IntDict
+import numpy as np
+
+
+class TestRunIndex(ProgressiveTest):
+    def test_runindex(self):
+        d = RunIndex()
+        self.assertEqual(len(d), 0)
+        with self.assertRaises(KeyError):
+            d[10]
+        keys = np.arange(10, dtype=np.int64)
+        values = keys+10
+        d = RunIndex(keys, values)
+        self.assertEqual(len(d), 10)
+        self.assertEqual(d.run_count(), 1)
+        with self.assertRaises(KeyError):
+            d[11]
+        for (k, v) in zip(keys, values):
+            self.assertEqual(d[k], v)
+
+        del d[5]
+        self.assertEqual(len(d), 9)
+        self.assertEqual(d.run_count(), 2)
+        with self.assertRaises(KeyError):
+            d[5]
+        with self.assertRaises(KeyError):
+            del d[5]
+
+        d[5] = 15 # put it back, merging the runs
+        self.assertEqual(d.run_count(), 1)
+        d.get_items(keys) # overrides keys
+        self.assertTrue((keys == values).all())
+
+        keys = np.arange(10, 20, dtype=np.int64)
+        values = keys+100
+        d.update(keys, values)
+        self.assertEqual(len(d), 20)
+        self.assertEqual(d.run_count(), 2)
+        for (k, v) in zip(keys, values):
+            self.assertEqual(d[k], v)
+        d.update([12], [5]) # overwrite
+        self.assertEqual(len(d), 20)
+        self.assertEqual(d[12], 5)
+        self.assertEqual(d[13], 113)
+
+        self.assertTrue(10 in d)
+        self.assertFalse(22 in d)
+        self.assertTrue(d.contains_any(np.arange(19, 21, dtype=np.int64)))
+        self.assertFalse(d.contains_any(np.arange(20, 22, dtype=np.int64)))
+
+    def test_remove_items(self):
+        d = RunIndex(np.arange(100), np.arange(100, 200))
+        found = d.remove_items(np.array([0, 10, 11, 50, 99, 150]))
+        self.assertEqual(found.tolist(), [True]*5+[False])
+        self.assertEqual(len(d), 95)
+        self.assertEqual(d.run_count(), 3)
+        (keys, values) = d.items()
+        expected = np.setdiff1d(np.arange(100), [0, 10, 11, 50, 99])
+        self.assertTrue(np.array_equal(keys, expected))
+        self.assertTrue(np.array_equal(values, expected+100))
+
+    def test_id_index(self):
+        keys = np.arange(1000, dtype=np.int64)
+        self.assertIsInstance(id_index(keys, keys), RunIndex)
+        d = id_index(keys[::2], keys[:500])
+        self.assertIsInstance(d, IntDict)
+        self.assertEqual(d[10], 5)
@@ -0,0 +1,50 @@
+from . import ProgressiveTest
+
+from progressivis.core.time_predictor import (TimePredictor,
+                                              RingTimePredictor)
+
+import numpy as np
+
+
+class TestTimePredictor(ProgressiveTest):
+    def test_default(self):
+        self.assertIs(TimePredictor.default, RingTimePredictor)
+
+    def test_ring_predictor(self):
+        predictor = RingTimePredictor(size=8)
+        self.assertEqual(predictor.predict(1.0, 100), 100)
+        self.assertEqual(predictor.a, 0)
+        np.random.seed(42)
+        # 1ms overhead, 10us per item, with some noise
+        for steps in np.random.randint(100, 10000, size=20):
+            duration = 0.001 + 1e-5 * steps * np.random.uniform(0.95, 1.05)
+            predictor.observe(steps, duration)
+        self.assertAlmostEqual(predictor.overhead, 0.001, places=3)
+        self.assertAlmostEqual(predictor.cost, 1e-5, places=6)
+        steps = predictor.predict(0.1, 100)
+        self.assertLessEqual(steps, 4 * predictor.max_steps)
+        # predictions stay under the expected number of steps
+        self.assertLess(steps, (0.1 - 0.001) / 1e-5)
+        self.assertGreater(steps, 0.8 * (0.1 - 0.001) / 1e-5)
+        self.assertEqual(predictor.predict(0.0001, 100), 1)
+        # ignored samples
+        predictor.observe(0, 0.1)
+        self.assertEqual(predictor.predict(0.1, 100), steps)
+
+    def test_ring_predictor_adapts(self):
+        predictor = RingTimePredictor(size=8)
+        for _ in range(8):
+            predictor.observe(1000, 0.01)
+        self.assertAlmostEqual(predictor.a, 1e5)
+        # the module becomes twice slower, old samples leave the ring
+        for _ in range(8):
+            predictor.observe(1000, 0.02)
+        self.assertAlmostEqual(predictor.a, 5e4)
+        # steps grow progressively
+        self.assertEqual(predictor.predict(1.0, 100), 4000)
+        predictor.observe(4000, 0.08)
+        self.assertEqual(predictor.predict(1.0, 100), 16000)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,132 @@
+"Test for the arena storage engine"
+import sys
+import threading
+
+import numpy as np
+
+from progressivis.storage import arenaengine
+from progressivis.storage.arena import Arena, ArenaStorageEngine, ArenaDataset
+from progressivis.storage.base import Group
+from progressivis.core.storagemanager import StorageManager
+from progressivis.table.table import Table
+from . import ProgressiveTest
+
+
+class TestArena(ProgressiveTest):
+    def test_allocator(self):
+        arena = Arena(StorageManager.default.filename('test_arena'), 1 << 20)
+        try:
+            ext1 = arena.allocate(1024)
+            ext2 = arena.allocate(2048)
+            ext3 = arena.allocate(1024)
+            self.assertEqual((ext1, ext2, ext3), (0, 1024, 3072))
+            self.assertIsNone(arena.allocate(1 << 20))
+            arena.free(ext2, 2048)
+            self.assertEqual(arena.used, 2048)
+            # first fit in the hole
+            self.assertEqual(arena.allocate(512), 1024)
+            # the hole is merged with its freed neighbors
+            arena.free(ext1, 1024)
+            arena.free(1024, 512)
+            self.assertEqual(arena.allocate(3072), 0)
+            arena.free(0, 3072)
+            # extend in place at the top or in a free neighbor
+            self.assertTrue(arena.extend(ext3, 1024, 4096))
+            self.assertFalse(arena.extend(ext3, 4096, 2 << 20))
+            self.assertEqual(arena.allocate(1024), 0)
+            self.assertTrue(arena.extend(0, 1024, 3072))
+            self.assertFalse(arena.extend(0, 3072, 4096))
+            arena.free(0, 3072)
+            arena.free(ext3, 4096)
+            self.assertEqual(arena.used, 0)
+        finally:
+            arena.close()
+
+    def test_arena_group(self):
+        group = ArenaStorageEngine.create_group('test_arena_group')
+        self.assertIsInstance(group, Group)
+        self.assertIs(group.engine, arenaengine)
+        dataset = group.create_dataset('d', shape=(10,), dtype=np.float64)
+        self.assertIsInstance(dataset, ArenaDataset)
+        self.assertTrue(np.all(dataset[:] == 0))
+        (arena, offset, _) = dataset.extent
+        for size in range(1000, 100001, 1000):
+            dataset.resize(size)
+            dataset[size-1000:size] = np.arange(size-1000, size)
+        self.assertTrue(np.array_equal(dataset[:], np.arange(100000)))
+        self.assertIn(dataset.extent[0], arenaengine.arenas)
+        self.assertIn('/test_arena_group/d', arenaengine.catalog())
+        group2d = group.create_group('sub')
+        dataset2d = group2d.create_dataset('d2', shape=(5, 3), dtype=np.int32,
+                                           fillvalue=-1)
+        dataset2d.resize(20)
+        self.assertTrue(np.all(dataset2d[:] == -1))
+        strings = group2d.create_dataset('s', shape=(2,), dtype=object)
+        strings.resize(4)
+        strings[3] = 'abc'
+        self.assertEqual(strings[:].tolist(), ['', '', '', 'abc'])
+        group.delete()
+        self.assertNotIn('/test_arena_group/d', arenaengine.catalog())
+        self.assertNotIn('/test_arena_group/sub/d2', arenaengine.catalog())
+        self.assertEqual(arena.allocate(1024), offset)
+        arena.free(offset, 1024)
+
+    def test_arena_table(self):
+        group = ArenaStorageEngine.create_group('test_arena_table')
+        t = Table('table_arena', dshape='{a: int64, b: float64, c: string}',
+                  create=True, storagegroup=group)
+        for i in range(10):
+            t.append({'a': np.arange(i*100, (i+1)*100),
+                      'b': np.random.rand(100),
+                      'c': np.array(['s%d' % j for j in range(100)], dtype=object)})
+        self.assertEqual(len(t), 1000)
+        del t.loc[range(0, 1000, 2)]
+        t.compact()
+        self.assertTrue(np.array_equal(t['a'].values, np.arange(1, 1000, 2)))
+        self.assertEqual(t['c'][0], 's1')
+        group.delete()
+
+    def test_arena_threads(self):
+        errors = []
+        datasets = {}
+        def work(n):
+            try:
+                group = ArenaStorageEngine.create_group('test_arena_threads')
+                for i in range(300):
+                    dataset = group.create_dataset('d%d' % i, shape=(10,),
+                                                   dtype=np.int64)
+                    for size in (200, 500, 1000 + i):
+                        dataset.resize(size)
+                    dataset[:] = n * 1000 + i
+                    if i % 3:
+                        datasets[(n, i)] = dataset
+                    else: # leave holes to reuse
+                        dataset.close()
+            except Exception as exc: # pylint: disable=broad-except
+                errors.append(exc)
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+        # switch threads often to interleave the allocations
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(datasets), 8 * 200)
+        # no extent was given twice, the values were not overwritten
+        for ((n, i), dataset) in datasets.items():
+            self.assertEqual(len(dataset), 1000 + i)
+            self.assertTrue(np.all(dataset[:] == n * 1000 + i))
+        catalog = arenaengine.catalog()
+        for dataset in datasets.values():
+            self.assertIn(dataset._path, catalog)
+        for dataset in datasets.values():
+            dataset.close()
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
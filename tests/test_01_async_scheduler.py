@@ -0,0 +1,64 @@
+from . import ProgressiveTest
+
+import asyncio
+
+from progressivis import Print, Scheduler
+from progressivis.core import AsyncScheduler
+from progressivis.stats import Min, RandomTable
+
+import numpy as np
+
+
+class AsyncRandomTable(RandomTable):
+    "RandomTable waiting for its data like a network source"
+    async def run_step(self, run_number, step_size, howlong):
+        await asyncio.sleep(0.01)
+        if len(self._table) >= self.rows:
+            return self._return_run_step(self.state_zombie, steps_run=0)
+        return super(AsyncRandomTable, self).run_step(run_number, step_size,
+                                                      howlong)
+
+
+class TestAsyncScheduler(ProgressiveTest):
+    def make_dataflow(self, s):
+        random = AsyncRandomTable(10, rows=10000, scheduler=s)
+        min_ = Min(scheduler=s)
+        min_.input.table = random.output.table
+        prt = Print(proc=self.terse, scheduler=s)
+        prt.input.df = min_.output.table
+        return random, min_
+
+    def compare(self, random, min_):
+        v1 = np.array(list(random.table().min().values()))
+        v2 = np.array(list(min_.table().last().values()))
+        self.assertTrue(np.allclose(v1, v2))
+
+    def test_async_scheduler(self):
+        s = AsyncScheduler()
+        random, min_ = self.make_dataflow(s)
+        ticks = [0]
+        async def count_ticks():
+            while s.task is not None:
+                ticks[0] += 1
+                await asyncio.sleep(0.005)
+        async def main():
+            task = s.start()
+            await asyncio.gather(task, count_ticks())
+        asyncio.get_event_loop().run_until_complete(main())
+        self.assertEqual(len(random.table()), 10000)
+        self.compare(random, min_)
+        # other tasks of the loop ran while the scheduler was waiting
+        self.assertGreater(ticks[0], 1)
+        self.assertIsNone(s.task)
+
+    def test_async_run_step_in_thread(self):
+        s = Scheduler()
+        random, min_ = self.make_dataflow(s)
+        s.start()
+        s.join()
+        self.assertEqual(len(random.table()), 10000)
+        self.compare(random, min_)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,89 @@
+"Test for the compressed storage engine"
+import numpy as np
+
+from progressivis.storage import compressedengine
+from progressivis.storage.compressed import (CompressedStorageEngine,
+                                             CompressedDataset, pack, unpack)
+from progressivis.storage.base import Group
+from progressivis.table.table import Table
+from progressivis.core.config import option_context
+from . import ProgressiveTest
+
+
+class TestCompressed(ProgressiveTest):
+    def test_pack(self):
+        array = np.round(np.cumsum(np.random.randn(10000)), 2)
+        data = pack(array)
+        self.assertLess(len(data), array.nbytes)
+        self.assertTrue(np.array_equal(unpack(data, array.dtype, array.shape), array))
+
+    def test_compressed_group(self):
+        group = CompressedStorageEngine.create_group('test_compressed_group')
+        self.assertIsInstance(group, Group)
+        self.assertIs(group.engine, compressedengine)
+        with option_context('storage.compressed.chunk_size', 800):
+            dataset = group.create_dataset('d', shape=(0,), dtype=np.float64)
+            self.assertIsInstance(dataset, CompressedDataset)
+            self.assertEqual(dataset.chunk_rows, 100)
+            for start in range(0, 1000, 37):
+                dataset.resize(start+37)
+                dataset[start:start+37] = np.arange(start, start+37)
+            dataset.flush()
+            # only the tail chunk is not compressed
+            self.assertEqual(dataset.packed(), 10)
+            values = np.arange(1036.)
+            self.assertTrue(np.array_equal(dataset[:], values))
+            self.assertEqual(dataset[500], 500)
+            self.assertEqual(dataset[-1], 1035)
+            indices = np.random.randint(0, 1036, 200)
+            self.assertTrue(np.array_equal(dataset[indices], values[indices]))
+            self.assertTrue(np.array_equal(dataset[10:900:7], values[10:900:7]))
+            # writing in a compressed chunk decompresses it, then compresses
+            # it again
+            dataset[[5, 600, 601]] = -1
+            values[[5, 600, 601]] = -1
+            self.assertTrue(np.array_equal(dataset[:], values))
+            dataset.flush()
+            self.assertEqual(dataset.packed(), 10)
+            dataset.resize(250)
+            dataset.resize(400)
+            self.assertTrue(np.array_equal(dataset[:250], values[:250]))
+            self.assertTrue(np.all(dataset[250:] == 0))
+            dataset2d = group.create_dataset('d2', shape=(10, 3), dtype=np.int32,
+                                             fillvalue=-1)
+            dataset2d.resize(500)
+            dataset2d[100:200, 1] = 7
+            self.assertTrue(np.all(dataset2d[100:200, 1] == 7))
+            self.assertTrue(np.all(dataset2d[:, 0] == -1))
+            dataset2d.resize((500, 4))
+            self.assertEqual(dataset2d[150].tolist(), [-1, 7, -1, -1])
+            strings = group.create_dataset('s', shape=(3,), dtype=object)
+            strings.resize(200)
+            strings[150] = 'abc'
+            self.assertEqual(strings[150], 'abc')
+            self.assertEqual(strings.packed(), 0)
+        group.delete()
+
+    def test_compressed_table(self):
+        group = CompressedStorageEngine.create_group('test_compressed_table')
+        with option_context('storage.compressed.chunk_size', 8000):
+            t = Table('table_compressed', dshape='{a: int64, b: float64, c: string}',
+                      create=True, storagegroup=group)
+            for i in range(10):
+                t.append({'a': np.arange(i*1000, (i+1)*1000),
+                          'b': np.random.rand(1000),
+                          'c': np.array(['s%d' % j for j in range(1000)], dtype=object)})
+        self.assertEqual(len(t), 10000)
+        column = t._column('a')
+        column.dataset.flush()
+        self.assertLess(column.dataset.memory_size, 80000 / 2)
+        self.assertTrue(np.array_equal(t['a'].values, np.arange(10000)))
+        del t.loc[range(0, 10000, 2)]
+        t.compact()
+        self.assertTrue(np.array_equal(t['a'].values, np.arange(1, 10000, 2)))
+        self.assertEqual(t['c'][0], 's1')
+        group.delete()
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,88 @@
+from . import ProgressiveTest
+
+import tempfile
+import shutil
+
+import numpy as np
+
+from progressivis import Print, Scheduler, StorageManager
+from progressivis.stats import Min, RandomTable
+from progressivis.table.constant import Constant
+from progressivis.core.time_predictor import RingTimePredictor
+
+
+class TestCostModel(ProgressiveTest):
+    def setUp(self):
+        super(TestCostModel, self).setUp()
+        self.dtemp = tempfile.mkdtemp(prefix='p10s_')
+
+    def tearDown(self):
+        shutil.rmtree(self.dtemp, ignore_errors=True)
+        super(TestCostModel, self).tearDown()
+
+    def test_temporary_storage(self):
+        self.assertIsNone(StorageManager().cost_models())
+
+    def test_warm_start(self):
+        storage = StorageManager(self.dtemp)
+        s = Scheduler()
+        random = RandomTable(10, rows=100000, scheduler=s, storage=storage)
+        min_ = Min(scheduler=s, storage=storage)
+        min_.input.table = random.output.table
+        prt = Print(proc=self.terse, scheduler=s)
+        prt.input.df = min_.output.table
+        s.start()
+        s.join()
+        key = min_.cost_model_key()
+        self.assertIn('progressivis.stats.min.Min|', key)
+        self.assertIn('table: ', key)
+        # a new session reads the models from the file
+        store = StorageManager(self.dtemp).cost_models()
+        self.assertIn(key, store)
+        self.assertEqual(store.get(key), min_.predictor.state())
+        self.assertIn(random.cost_model_key(), store)
+        # new modules with the same inputs start with the saved model
+        s = Scheduler()
+        cst = Constant(random.table(), scheduler=s)
+        min2 = Min(scheduler=s, storage=StorageManager(self.dtemp))
+        min2.input.table = cst.output.table
+        self.assertEqual(min2.cost_model_key(), key)
+        self.assertNotEqual(min2.predict_step_size(0.1),
+                            min2.default_step_size)
+        self.assertAlmostEqual(min2.predictor.a, min_.predictor.a)
+
+    def test_warm_start_noisy_steps(self):
+        rng = np.random.RandomState(42)
+        saved = RingTimePredictor()
+        for i in range(30):
+            steps = min(1000 * (i + 1), 8000)
+            saved.observe(steps, 0.001 + 1e-5 * steps + rng.normal(0, 2e-4))
+        state = saved.state()
+        expected = saved.predict(0.1, 1)
+        for slowdowns in [(1.5, 1.0), (2.0, 1.0), (0.8, 1.1)]:
+            warm = RingTimePredictor()
+            warm.load_state(state)
+            cold = RingTimePredictor()
+            self.assertEqual(warm.predict(0.1, 1), expected)
+            # the first steps of the session are slower or faster
+            for slowdown in slowdowns:
+                steps = warm.predict(0.1, 1)
+                duration = slowdown * (0.001 + 1e-5 * steps)
+                warm.observe(steps, duration)
+                cold.observe(steps, duration)
+                ratio = warm.predict(0.1, 1) / expected
+                self.assertGreater(ratio, 0.4)
+                self.assertLess(ratio, 1.1)
+                # closer to the saved model than without it
+                cold_ratio = cold.predict(0.1, 1) / expected
+                self.assertLess(abs(np.log(ratio)), abs(np.log(cold_ratio)))
+            self.assertGreaterEqual(warm.max_steps, state['max_steps'])
+        # the loaded model is forgotten when the ring is full
+        for _ in range(16):
+            warm.observe(2000, 0.001 + 1e-5 * 2000)
+        self.assertIsNone(warm.warm)
+        self.assertEqual(warm.max_steps, 2000)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -160,6 +160,38 @@ class TestMMap(ProgressiveTest):
         self.assertEqual(len(t), 67)
         self.assertEqual(_free_chunk_nb(t), 34)
 
+    def test_mmap_growth(self):
+        self._rmtree()
+        group = MMapGroup(self.tmp)
+        dataset = group.create_dataset('growth', shape=(0,), dtype=np.float64)
+        dataset2d = group.create_dataset('growth2d', shape=(0, 3), dtype=np.int32)
+        remaps = 0
+        capacity = dataset.capacity
+        for size in range(1000, 200001, 1000):
+            dataset.resize(size)
+            dataset[size-1000:size] = np.arange(size-1000, size)
+            dataset2d.resize(size)
+            if dataset.capacity != capacity:
+                remaps += 1
+                capacity = dataset.capacity
+        self.assertLess(remaps, 10)
+        self.assertGreaterEqual(capacity, 200000)
+        self.assertTrue(np.array_equal(dataset[:], np.arange(200000)))
+        self.assertEqual(dataset2d.shape, (200000, 3))
+        self.assertTrue(np.all(dataset2d[:] == 0))
+        # rows shrunk then grown again are filled with the fillvalue
+        dataset.resize(10)
+        dataset.resize(20)
+        self.assertTrue(np.array_equal(dataset[:10], np.arange(10)))
+        self.assertTrue(np.all(dataset[10:] == dataset.fillvalue))
+        dataset2d[5:10] = 7
+        dataset2d.resize(5)
+        dataset2d.resize(10)
+        self.assertTrue(np.all(dataset2d[:] == 0))
+        self.assertIn(dataset.advise('sequential'), (True, False))
+        group.close_all()
+        self._rmtree()
+
     def _create_table(self, group):
         table = Table('table',
                       dshape='{a: int64, b: real, c: string, d: 10*int}',
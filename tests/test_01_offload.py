@@ -0,0 +1,59 @@
+"Test for the offloading of computations to worker processes"
+import os.path
+import shutil
+
+import numpy as np
+
+from progressivis.core.bitmap import bitmap
+from progressivis.core.offload import (get_executor, share, offload,
+                                       SharedArray, PROCESS)
+from progressivis.table.table import Table
+from progressivis.storage.mmap import MMapGroup
+from progressivis import ProgressiveError
+from . import ProgressiveTest
+
+
+class TestOffload(ProgressiveTest):
+    tmp = 'test_offload'
+
+    def tearDown(self):
+        if os.path.exists(self.tmp):
+            shutil.rmtree(self.tmp)
+        super(TestOffload, self).tearDown()
+
+    def test_offload_mmap(self):
+        group = MMapGroup(self.tmp)
+        t = Table('table', dshape='{a: float64, b: int64}',
+                  storagegroup=group, create=True)
+        t.append({'a': np.arange(100.0), 'b': np.arange(100)})
+        executor = get_executor(PROCESS)
+        shared = share(t['a'], slice(10, 19), executor)
+        self.assertIsInstance(shared, SharedArray)
+        self.assertEqual(offload(executor, np.sum, shared), np.arange(10.0, 20.0).sum())
+        shared = share(t['b'], bitmap([1, 3, 5]), executor)
+        self.assertEqual(offload(executor, np.sum, shared), 9)
+
+    def test_offload_copy(self):
+        t = Table('table_offload_copy', dshape='{a: float64}', create=True)
+        t.append({'a': np.arange(100.0)})
+        executor = get_executor(PROCESS)
+        shared = share(t['a'], slice(10, 19), executor)
+        self.assertIsInstance(shared, SharedArray)
+        self.assertTrue(shared.temporary)
+        self.assertTrue(os.path.exists(shared.filename))
+        self.assertEqual(offload(executor, np.sum, shared), np.arange(10.0, 20.0).sum())
+        # the temporary file is removed once the computation is done
+        self.assertFalse(os.path.exists(shared.filename))
+
+    def test_offload_inline(self):
+        t = Table('table_offload', dshape='{a: float64}', create=True)
+        t.append({'a': np.arange(10.0)})
+        values = share(t['a'], slice(0, 4))
+        self.assertIsInstance(values, np.ndarray)
+        self.assertEqual(offload(None, np.sum, values), 10.0)
+        with self.assertRaises(ProgressiveError):
+            get_executor('nowhere')
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,42 @@
+from . import ProgressiveTest
+
+from progressivis import Print, ParallelScheduler, ProgressiveError
+from progressivis.stats import Min, Max, RandomTable
+
+import numpy as np
+
+
+class TestParallelScheduler(ProgressiveTest):
+    def test_parallel_min_max(self):
+        s = ParallelScheduler(max_workers=4)
+        random = RandomTable(10, rows=10000, scheduler=s)
+        min_ = Min(scheduler=s)
+        min_.input.table = random.output.table
+        max_ = Max(scheduler=s)
+        max_.input.table = random.output.table
+        pr1 = Print(proc=self.terse, scheduler=s)
+        pr1.input.df = min_.output.table
+        pr2 = Print(proc=self.terse, scheduler=s)
+        pr2.input.df = max_.output.table
+        s.start()
+        s.join()
+        self.compare(random.table().min(), min_.table().last())
+        self.compare(random.table().max(), max_.table().last())
+        # producers always run before their consumers
+        self.assertTrue(min_.last_update() >= random.last_update())
+        self.assertTrue(max_.last_update() >= random.last_update())
+
+    def compare(self, res1, res2):
+        v1 = np.array(list(res1.values()))
+        v2 = np.array(list(res2.values()))
+        self.assertTrue(np.allclose(v1, v2))
+
+    def test_parallel_workers(self):
+        with self.assertRaises(ProgressiveError):
+            ParallelScheduler(max_workers=0)
+        s = ParallelScheduler()
+        self.assertTrue(s.max_workers >= 1)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
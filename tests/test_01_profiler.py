@@ -0,0 +1,102 @@
+from . import ProgressiveTest
+
+import asyncio
+from timeit import default_timer
+
+from progressivis import Module
+from progressivis.core import SamplingProfiler, AsyncScheduler
+
+
+def spin(duration):
+    end = default_timer() + duration
+    count = 0
+    while default_timer() < end:
+        count += 1
+    return count
+
+
+class SpinModule(Module):
+    "Source module spinning during each step"
+    def __init__(self, steps=30, **kwds):
+        super(SpinModule, self).__init__(**kwds)
+        self.steps = steps
+
+    def predict_step_size(self, duration):
+        return 1
+
+    def run_step(self, run_number, step_size, howlong):
+        spin(0.01)
+        self.steps -= 1
+        if self.steps <= 0:
+            return self._return_run_step(self.state_zombie, steps_run=1)
+        return self._return_run_step(self.state_ready, steps_run=1)
+
+
+class SleepModule(SpinModule):
+    "Source module waiting during each step, like a network source"
+    async def run_step(self, run_number, step_size, howlong):
+        await asyncio.sleep(0.02)
+        self.steps -= 1
+        if self.steps <= 0:
+            return self._return_run_step(self.state_zombie, steps_run=1)
+        return self._return_run_step(self.state_ready, steps_run=1)
+
+
+class TestProfiler(ProgressiveTest):
+    def test_profiler(self):
+        s = self.scheduler()
+        profiler = SamplingProfiler(interval=0.001)
+        module = SpinModule(name='spin', scheduler=s)
+        other = SpinModule(name='other', scheduler=s)
+        self.assertEqual(module.profile_stats(), [])
+        module.profile(profiler=profiler)
+        s.start()
+        s.join()
+        profiler.stop()
+        self.assertEqual(profiler.modules(), ['spin'])
+        stats = module.profile_stats(top=5)
+        self.assertGreater(len(stats), 0)
+        self.assertLessEqual(len(stats), 5)
+        functions = [f['function'] for f in stats]
+        self.assertIn('spin', functions)
+        for function in stats:
+            self.assertLessEqual(function['self'], function['total'])
+            self.assertLessEqual(function['total_fraction'], 1)
+        self.assertEqual(other.profile_stats(), [])
+        module.profile(False)
+        self.assertIsNone(module.profiler)
+
+    def test_profiler_thread(self):
+        s = self.scheduler()
+        profiler = SamplingProfiler()
+        module = SpinModule(name='spin', scheduler=s)
+        other = SpinModule(name='other', scheduler=s)
+        module.profile(profiler=profiler)
+        other.profile(profiler=profiler)
+        module.profile(False)
+        self.assertIsNotNone(profiler._thread)
+        # the sampling thread stops with the last profiled module
+        other.profile(False)
+        self.assertIsNone(profiler._thread)
+
+    def test_profiler_async(self):
+        s = AsyncScheduler()
+        profiler = SamplingProfiler(interval=0.001)
+        module = SleepModule(steps=10, name='sleep', scheduler=s)
+        module.profile(profiler=profiler)
+        async def spinning():
+            while s.task is not None:
+                spin(0.005)
+                await asyncio.sleep(0)
+        async def main():
+            task = s.start()
+            await asyncio.gather(task, spinning())
+        asyncio.get_event_loop().run_until_complete(main())
+        module.profile(False)
+        # the coroutine spinning while the module waits is not charged to it
+        functions = [f['function'] for f in profiler.stats('sleep')]
+        self.assertNotIn('spin', functions)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -1,8 +1,10 @@
 from . import ProgressiveTest
 from time import sleep
+from timeit import default_timer
 
-from progressivis import Print, Scheduler
+from progressivis import Print, Every, Scheduler
 from progressivis.io import CSVLoader
+from progressivis.io.input import Input
 from progressivis.stats import Min
 from progressivis.datasets import get_dataset
 
@@ -45,5 +47,89 @@ class TestScheduler(ProgressiveTest):
         s.stop()
         s.join()
 
+    def test_scheduler_graph(self):
+        s = Scheduler()
+        inp = Input(name='inp', scheduler=s)
+        every = Every(proc=self.terse, name='every', scheduler=s)
+        # modules and slots are added to the graph as they are created
+        self.assertEqual(s.dependencies(), {'inp': set(), 'every': set()})
+        every.input.df = inp.output.table
+        self.assertEqual(s.dependencies()['every'], {'inp'})
+        self.assertEqual(s.order_modules(), ['inp', 'every'])
+        s.remove_module(every)
+        self.assertEqual(s.dependencies(), {'inp': set()})
+
+    def test_scheduler_remove_listener(self):
+        s = Scheduler()
+        inp = Input(scheduler=s)
+        every = Every(proc=self.terse, scheduler=s)
+        every.input.df = inp.output.table
+        inp.from_input('hello')
+        slot = every.get_input_slot('df')
+        slot.update(1)
+        changes = inp.table().changes
+        self.assertEqual(changes._listeners, [slot.data_changed])
+        # the removed module is not woken up by the changes anymore
+        s.remove_module(every)
+        self.assertEqual(changes._listeners, [])
+
+    def test_scheduler_wakeup(self):
+        s = Scheduler()
+        inp = Input(scheduler=s)
+        every = Every(proc=self.terse, scheduler=s)
+        every.input.df = inp.output.table
+        calls = [0]
+        is_ready = every.is_ready
+        def counting_is_ready():
+            calls[0] += 1
+            return is_ready()
+        every.is_ready = counting_is_ready
+        inp.from_input('hello')
+        s.start()
+        sleep(1)
+        count = calls[0]
+        self.assertGreater(count, 0)
+        sleep(1)
+        # blocked modules are not checked until their input module has run
+        self.assertEqual(calls[0], count)
+        inp.from_input('world')
+        s.for_input(inp)
+        sleep(1)
+        self.assertGreater(calls[0], count)
+        s.stop()
+        s.join()
+    def test_scheduler_hibernation(self):
+        s = Scheduler()
+        inp = Input(scheduler=s)
+        received = []
+        every = Every(proc=lambda df: received.append(default_timer()),
+                      scheduler=s)
+        every.input.df = inp.output.table
+        passes = [0]
+        pass_modules = s._pass_modules
+        def counting_pass_modules():
+            passes[0] += 1
+            return pass_modules()
+        s._pass_modules = counting_pass_modules
+        s.start()
+        sleep(1)
+        count = passes[0]
+        sleep(1)
+        # all the modules are blocked, no pass is made
+        self.assertEqual(passes[0], count)
+        start = default_timer()
+        inp.from_input('hello')
+        sleep(0.5)
+        self.assertEqual(len(received), 1)
+        self.assertLess(received[0]-start, 0.1)
+        timers = []
+        s.call_later(0.2, lambda s, run_number: timers.append(default_timer()))
+        start = default_timer()
+        sleep(0.5)
+        self.assertEqual(len(timers), 1)
+        self.assertGreaterEqual(timers[0]-start, 0.2)
+        s.stop()
+        s.join()
+
 if __name__ == '__main__':
     ProgressiveTest.main()
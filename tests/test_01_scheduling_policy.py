@@ -0,0 +1,64 @@
+from . import ProgressiveTest
+
+from progressivis import Print, Every, Scheduler, ParallelScheduler, ProgressiveError
+from progressivis.core import EarliestDeadlineFirst
+from progressivis.stats import Min, Max, RandomTable
+
+import numpy as np
+
+
+class View(Every):
+    "Every module pretending to be a visualization"
+    def is_visualization(self):
+        return True
+
+
+class TestSchedulingPolicy(ProgressiveTest):
+    def run_edf(self, s):
+        policy = s.policy
+        quanta = {}
+        quantum = policy.quantum
+        def recording_quantum(module, q):
+            ret = quantum(module, q)
+            quanta.setdefault(module.name, []).append(ret/q)
+            return ret
+        policy.quantum = recording_quantum
+        random = RandomTable(10, rows=10000, scheduler=s)
+        min_ = Min(name='min', scheduler=s)
+        min_.input.table = random.output.table
+        view = View(name='view', proc=self.terse, scheduler=s)
+        view.input.df = min_.output.table
+        max_ = Max(name='max', scheduler=s)
+        max_.input.table = random.output.table
+        prt = Print(proc=self.terse, scheduler=s)
+        prt.input.df = max_.output.table
+        s.start()
+        s.join()
+        self.assertTrue(np.allclose(list(random.table().min().values()),
+                                    list(min_.table().last().values())))
+        self.assertTrue(np.allclose(list(random.table().max().values()),
+                                    list(max_.table().last().values())))
+        # modules feeding no visualization run in the background
+        self.assertTrue(all(r == policy.background_share for r in quanta['max']))
+        self.assertTrue(all(r <= 1 for r in quanta['min']))
+        stats = policy.stats()
+        self.assertEqual(list(stats.keys()), ['view'])
+        self.assertGreater(stats['view']['refreshes'], 0)
+        self.assertLessEqual(stats['view']['misses'], stats['view']['refreshes'])
+
+    def test_edf(self):
+        self.run_edf(Scheduler(policy=EarliestDeadlineFirst()))
+
+    def test_edf_parallel(self):
+        self.run_edf(ParallelScheduler(max_workers=2,
+                                       policy=EarliestDeadlineFirst()))
+
+    def test_edf_params(self):
+        with self.assertRaises(ProgressiveError):
+            EarliestDeadlineFirst(background_share=0)
+        with self.assertRaises(ProgressiveError):
+            EarliestDeadlineFirst(min_quantum=0)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,49 @@
+from . import ProgressiveTest
+
+from progressivis import Print, Scheduler, ProgressiveError
+from progressivis.core import ThroughputAllocator
+from progressivis.stats import Min, RandomTable
+
+import numpy as np
+
+
+class TestStepAllocator(ProgressiveTest):
+    def test_throughput_allocator(self):
+        allocator = ThroughputAllocator()
+        s = Scheduler(allocator=allocator)
+        random = RandomTable(10, rows=100000, scheduler=s)
+        min_ = Min(scheduler=s)
+        min_.input.table = random.output.table
+        prt = Print(proc=self.terse, scheduler=s)
+        prt.input.df = min_.output.table
+        s.start()
+        s.join()
+        v1 = np.array(list(random.table().min().values()))
+        v2 = np.array(list(min_.table().last().values()))
+        self.assertTrue(np.allclose(v1, v2))
+        # the time allocated to each run is traced
+        trace = min_.tracer.trace_stats()
+        quanta = [quantum for (type_, quantum)
+                  in zip(trace['type'].tolist(), trace['quantum'].tolist())
+                  if type_ == 'run']
+        self.assertGreater(len(quanta), 0)
+        self.assertFalse(np.isnan(quanta).any())
+
+    def test_allocate(self):
+        allocator = ThroughputAllocator(min_share=0.2)
+        alloc = allocator.allocate({'a': 0, 'b': 10, 'c': 30}, 1.0)
+        self.assertAlmostEqual(sum(alloc.values()), 1.0)
+        self.assertAlmostEqual(alloc['a'], 0.2/3)
+        self.assertAlmostEqual(alloc['c']-alloc['a'], 3*(alloc['b']-alloc['a']))
+        # small demands are fully served
+        alloc = allocator.allocate({'a': 0.1, 'b': 0.2}, 1.0)
+        self.assertAlmostEqual(alloc['a'], 0.2)
+        self.assertAlmostEqual(alloc['b'], 0.3)
+        with self.assertRaises(ProgressiveError):
+            ThroughputAllocator(budget=0)
+        with self.assertRaises(ProgressiveError):
+            ThroughputAllocator(min_share=2)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
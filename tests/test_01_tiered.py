@@ -0,0 +1,112 @@
+"Test for the tiered storage engine"
+import numpy as np
+
+from progressivis.storage import tieredengine
+from progressivis.storage.tiered import TieredStorageEngine, TieredDataset
+from progressivis.storage.base import Group
+from progressivis.table.table import Table
+from . import ProgressiveTest
+
+
+class TestTiered(ProgressiveTest):
+    def setUp(self):
+        super(TestTiered, self).setUp()
+        self._budget = tieredengine._budget
+
+    def tearDown(self):
+        tieredengine.budget = self._budget
+        super(TestTiered, self).tearDown()
+
+    def test_tiered_group(self):
+        group = TieredStorageEngine.create_group('test_tiered_group')
+        self.assertIsInstance(group, Group)
+        self.assertIs(group.engine, tieredengine)
+        tieredengine.budget = 3 * 8000
+        datasets = []
+        for i in range(5):
+            dataset = group.create_dataset('d%d' % i, shape=(1000,),
+                                           dtype=np.float64)
+            self.assertIsInstance(dataset, TieredDataset)
+            dataset[:] = np.arange(1000) + i
+            datasets.append(dataset)
+        self.assertLessEqual(tieredengine.used, tieredengine.budget)
+        # the least recently used datasets are on disk
+        self.assertEqual([d.in_memory for d in datasets],
+                         [False, False, True, True, True])
+        self.assertEqual(datasets[0].shape, (1000,))
+        # reading a dataset loads it back, spilling the oldest one
+        self.assertTrue(np.array_equal(datasets[0][:], np.arange(1000)))
+        self.assertTrue(datasets[0].in_memory)
+        self.assertFalse(datasets[2].in_memory)
+        datasets[1].resize(2000)
+        self.assertTrue(np.all(datasets[1][1000:] == 0))
+        self.assertTrue(np.array_equal(datasets[1][:1000], np.arange(1000) + 1))
+        self.assertLessEqual(tieredengine.used, tieredengine.budget)
+        strings = group.create_dataset('s', shape=(3,), dtype=object)
+        strings[1] = 'abc'
+        tieredengine.spill(strings)
+        self.assertEqual(strings[:].tolist(), ['', 'abc', ''])
+        # a dataset larger than the budget is read from its file
+        big = group.create_dataset('big', shape=(10000,), dtype=np.float64)
+        self.assertFalse(big.in_memory)
+        big[5] = 1
+        self.assertEqual(big[5], 1)
+        tieredengine.budget = None
+        self.assertEqual(big[6], 0)
+        self.assertTrue(big.in_memory)
+        used = tieredengine.used
+        group.delete()
+        self.assertLess(tieredengine.used, used)
+
+    def test_tiered_partial_reads(self):
+        group = TieredStorageEngine.create_group('test_tiered_partial_reads')
+        tieredengine.budget = 10000
+        a = group.create_dataset('a', data=np.arange(1000.))
+        b = group.create_dataset('b', data=np.arange(1000.))
+        self.assertEqual([a.in_memory, b.in_memory], [False, True])
+        directory = a._directory
+        # scattered reads are served by the file, without moving the datasets
+        for i in range(100):
+            self.assertEqual(a[i], i)
+            self.assertEqual(b[i], i)
+        self.assertEqual([a.in_memory, b.in_memory], [False, True])
+        # once the reads amount to its size, the dataset is loaded back
+        self.assertTrue(np.array_equal(a[:], np.arange(1000.)))
+        self.assertEqual([a.in_memory, b.in_memory], [True, False])
+        # writes to a spilled dataset go to its file
+        b[:] = 1
+        self.assertFalse(b.in_memory)
+        # the file is kept and only written when the dataset has changed
+        a[0] = -1
+        tieredengine.spill(a)
+        self.assertEqual(a._directory, directory)
+        self.assertEqual(a[0], -1)
+        self.assertTrue(np.all(a[1:] == np.arange(1., 1000.)))
+        self.assertTrue(np.all(b[:] == 1))
+        self.assertTrue(b.in_memory)
+        tieredengine.spill(b)
+        self.assertFalse(b._dirty)
+        self.assertTrue(np.all(b[:] == 1))
+        group.delete()
+
+    def test_tiered_table(self):
+        group = TieredStorageEngine.create_group('test_tiered_table')
+        tieredengine.budget = 100000
+        t = Table('table_tiered', dshape='{a: int64, b: float64, c: string}',
+                  create=True, storagegroup=group)
+        for i in range(10):
+            t.append({'a': np.arange(i*1000, (i+1)*1000),
+                      'b': np.random.rand(1000),
+                      'c': np.array(['s%d' % j for j in range(1000)], dtype=object)})
+        self.assertEqual(len(t), 10000)
+        self.assertLessEqual(tieredengine.used, 100000)
+        self.assertTrue(np.array_equal(t['a'].values, np.arange(10000)))
+        del t.loc[range(0, 10000, 2)]
+        t.compact()
+        self.assertTrue(np.array_equal(t['a'].values, np.arange(1, 10000, 2)))
+        self.assertEqual(t['c'][0], 's1')
+        group.delete()
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,59 @@
+from . import ProgressiveTest
+
+import json
+import os
+import tempfile
+
+from progressivis import Print, Scheduler, ProgressiveError
+from progressivis.stats import Min, RandomTable
+
+
+class TestTimeline(ProgressiveTest):
+    def test_timeline(self):
+        s = Scheduler()
+        random = RandomTable(10, rows=10000, scheduler=s)
+        min_ = Min(name='min', scheduler=s)
+        min_.input.table = random.output.table
+        prt = Print(proc=self.terse, scheduler=s)
+        prt.input.df = min_.output.table
+        with self.assertRaises(ProgressiveError):
+            s.save_timeline('timeline.json')
+        timeline = s.record_timeline()
+        s.start()
+        s.join()
+        self.assertGreater(len(timeline), 0)
+        trace = timeline.to_chrome_trace()
+        events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        runs = [e for e in events if e['cat'] == 'run' and e['name'] == 'min']
+        steps = [e for e in events if e['cat'] == 'step' and e['name'] == 'min']
+        self.assertGreater(len(runs), 0)
+        self.assertEqual(len(steps), sum(e['args']['steps'] for e in runs))
+        self.assertEqual(sum(e['args']['steps_run'] for e in steps),
+                         sum(e['args']['steps_run'] for e in runs))
+        random_runs = [e for e in events
+                       if e['cat'] == 'run' and e['name'] == random.name]
+        self.assertEqual(random_runs[-1]['args']['next_state'], 'zombie')
+        # steps are nested in their run
+        run = runs[0]
+        for step in steps:
+            if step['args']['run_number'] == run['args']['run_number']:
+                self.assertGreaterEqual(step['ts'], run['ts'])
+                self.assertLessEqual(step['ts'] + step['dur'],
+                                     run['ts'] + run['dur'] + 1e-3)
+                self.assertEqual(step['tid'], run['tid'])
+        threads = [e for e in trace['traceEvents'] if e['name'] == 'thread_name']
+        self.assertEqual(len(threads), 1)
+        (fd, filename) = tempfile.mkstemp(prefix='p10s_', suffix='.json')
+        os.close(fd)
+        try:
+            s.save_timeline(filename)
+            with open(filename) as fin:
+                saved = json.load(fin)
+            self.assertEqual(len(saved['traceEvents']),
+                             len(trace['traceEvents']))
+        finally:
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
@@ -0,0 +1,67 @@
+from . import ProgressiveTest
+
+from progressivis.core.utils import get_random_name
+from progressivis.storage import Group
+from progressivis.table.tracer import TableTracer
+
+import numpy as np
+
+
+class TestTracer(ProgressiveTest):
+    def make_tracer(self, **kwds):
+        group = Group.default(get_random_name('test_tracer'))
+        return TableTracer('test', group, **kwds)
+
+    def trace_run(self, tracer, run_number, steps):
+        ts = float(run_number)
+        tracer.start_run(ts, run_number, quantum=0.5)
+        for i in range(steps):
+            tracer.before_run_step(ts+i*0.1, run_number)
+            tracer.after_run_step(ts+i*0.1+0.05, run_number,
+                                  steps_run=10, next_state=1)
+        tracer.end_run(ts+0.9, run_number)
+
+    def test_tracer(self):
+        tracer = self.make_tracer(capacity=100)
+        self.assertEqual(tracer.event_count(), 1)
+        for run_number in range(1, 4):
+            self.trace_run(tracer, run_number, 2)
+        self.assertEqual(tracer.event_count(), 10)
+        trace = tracer.trace_stats()
+        self.assertEqual(len(trace), 10)
+        self.assertEqual(trace['type'].tolist(),
+                         [''] + ['step', 'step', 'run'] * 3)
+        self.assertEqual(trace['steps_run'].tolist(),
+                         [0] + [10, 10, 20] * 3)
+        self.assertEqual(trace['quantum'][3], 0.5)
+        self.assertTrue(np.allclose(tracer.get_speed(),
+                                    [200, 200, 22.2222] * 3, rtol=1e-3))
+
+    def test_tracer_wraps(self):
+        tracer = self.make_tracer(capacity=8)
+        for run_number in range(1, 11):
+            self.trace_run(tracer, run_number, 2)
+        self.assertEqual(tracer.event_count(), 31)
+        trace = tracer.trace_stats()
+        self.assertEqual(len(trace), 8)
+        # the last events are kept, oldest first
+        self.assertEqual(trace['run'].tolist(),
+                         [8, 8, 9, 9, 9, 10, 10, 10])
+        self.assertTrue(np.all(np.diff(trace['end'].values) > 0))
+        self.trace_run(tracer, 11, 2)
+        self.assertEqual(tracer.trace_stats()['run'].tolist(),
+                         [9, 9, 10, 10, 10, 11, 11, 11])
+
+    def test_step_sampling(self):
+        tracer = self.make_tracer(step_sampling=4)
+        self.trace_run(tracer, 1, 10)
+        trace = tracer.trace_stats()
+        types = trace['type'].tolist()
+        self.assertEqual(types.count('step'), 3)
+        # the run still counts every step
+        self.assertEqual(trace['steps'][len(trace)-1], 10)
+        self.assertEqual(trace['steps_run'][len(trace)-1], 100)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
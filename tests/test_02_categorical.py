@@ -0,0 +1,79 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from progressivis.table.table import Table
+from progressivis.table.column_categorical import (CategoricalColumn,
+                                                   MISSING, UNKNOWN)
+from progressivis.io import CSVLoader
+from . import ProgressiveTest
+
+
+class TestCategorical(ProgressiveTest):
+    def test_categorical_column(self):
+        t = Table('table_categorical',
+                  dshape='{a: int64, c: categorical[["x", "y"]]}', create=True)
+        c = t._column('c')
+        self.assertIsInstance(c, CategoricalColumn)
+        self.assertEqual(c.categories, ['x', 'y'])
+        t.append({'a': np.arange(6),
+                  'c': np.array(['x', 'z', 'y', 'z', None, 'x'], dtype=object)})
+        t.add({'a': 6, 'c': 'w'})
+        self.assertEqual(c.categories, ['x', 'y', 'z', 'w'])
+        self.assertTrue(np.array_equal(c.codes, [0, 2, 1, 2, MISSING, 0, 3]))
+        self.assertEqual(c.values.tolist(), ['x', 'z', 'y', 'z', None, 'x', 'w'])
+        self.assertEqual(t['c'][2], 'y')
+        self.assertEqual(c.code('z'), 2)
+        self.assertEqual(c.code('unknown'), UNKNOWN)
+        self.assertTrue(np.array_equal(c == 'z', c.values == 'z'))
+        self.assertFalse(np.any(c == 'unknown'))
+        self.assertTrue(np.array_equal(c.equal('x', [0, 1, 5]), [True, False, True]))
+        self.assertTrue(np.array_equal(c.histogram(), [2, 1, 2, 1]))
+        groups = c.groups()
+        self.assertEqual(list(groups.keys()), ['x', 'y', 'z', 'w'])
+        self.assertTrue(np.array_equal(groups['z'], [1, 3]))
+        t.loc[0, 'c'] = 'y'
+        del t.loc[[1]]
+        self.assertTrue(np.array_equal(c.histogram(), [1, 2, 1, 1]))
+        self.assertTrue(np.array_equal(c.histogram(slice(2, 4)), [0, 1, 1, 0]))
+        self.assertTrue(np.array_equal(c.groups()['y'], [0, 2]))
+        self.assertEqual(t.to_dict(orient='list')['c'], ['y', 'y', 'z', None, 'x', 'w'])
+
+    def test_categorical_dataframe(self):
+        df = pd.DataFrame({'a': [1, 2, 3],
+                           'k': pd.Series(['u', 'v', 'u'], dtype='category')})
+        t = Table('table_categorical_df', data=df)
+        self.assertIsInstance(t._column('k'), CategoricalColumn)
+        t.append(pd.DataFrame({'a': [4], 'k': pd.Series(['w'], dtype='category')}))
+        self.assertEqual(t['k'].values.tolist(), ['u', 'v', 'u', 'w'])
+        self.assertTrue(np.array_equal(t._column('k').codes, [0, 1, 0, 2]))
+
+    def test_csv_categorical(self):
+        (fd, filename) = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as out:
+            out.write('a,s,k\n')
+            for i in range(100):
+                out.write('%d,s%d,%s\n' % (i, i, 'kind%d' % (i % 3)))
+        try:
+            s = self.scheduler()
+            module = CSVLoader(filename, index_col=False, categorical=10,
+                               scheduler=s)
+            s.start()
+            s.join()
+            table = module.table()
+            self.assertEqual(len(table), 100)
+            self.assertNotIsInstance(table._column('s'), CategoricalColumn)
+            k = table._column('k')
+            self.assertIsInstance(k, CategoricalColumn)
+            self.assertEqual(sorted(k.categories), ['kind0', 'kind1', 'kind2'])
+            self.assertEqual(k[4], 'kind1')
+        finally:
+            os.remove(filename)
+
+
+if __name__ == '__main__':
+    ProgressiveTest.main()
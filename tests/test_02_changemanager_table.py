@@ -6,6 +6,7 @@ from collections import namedtuple
 from progressivis.table.table import Table
 from progressivis.table.changemanager_table import TableChangeManager
 from progressivis.table.tablechanges import TableChanges
+from progressivis.core.bitmap import bitmap
 
 from . import ProgressiveTest
 
@@ -167,7 +168,8 @@ class TestTableChangeManager(ProgressiveTest):
         changemanager.update(last, table, mid=mid1)
         self.assertEqual(changemanager.last_update(), last)
         self.assertEqual(changemanager.created.length(), 0)
-        self.assertEqual(changemanager.updated.length(), 0)
+        # row 0 was updated for cm3 and row 2 deleted since the last update
+        self.assertEqual(changemanager.updated.next(), slice(0, 1))
         self.assertEqual(changemanager.deleted.next(), slice(2, 3))
         with self.assertRaises(KeyError):
             table.loc[2]
@@ -183,13 +185,46 @@ class TestTableChangeManager(ProgressiveTest):
         cm2.update(last2, table, mid=mid2)
         self.assertEqual(cm2.last_update(), last2)
         self.assertEqual(cm2.created.next(), slice(6, 8))
-        self.assertEqual(cm2.updated.next(), slice(5, 6))
+        self.assertEqual(list(cm2.updated.next()), [0, 5])
         self.assertEqual(list(cm2.deleted.next()), [2, 4])
 
         #TODO test reset
         changemanager.reset()
         self.assertEqual(changemanager.last_update(), 0)
 
+    def test_shared_log(self):
+        "test the log of changes shared by several consumers"
+        changes = TableChanges()
+        changes.add_created(bitmap(range(0, 10))) # no consumer yet
+        self.assertEqual(changes.segment_count(), 0)
+        self.assertIsNone(changes.compute_updates(0, 1, mid=1))
+        self.assertIsNone(changes.compute_updates(0, 1, mid=2))
+        self.assertIsNone(changes.compute_updates(0, 1, mid=3))
+        changes.add_created(bitmap(range(10, 20)))
+        changes.add_updated(bitmap(range(0, 5)))
+        update1 = changes.compute_updates(1, 2, mid=1)
+        update2 = changes.compute_updates(1, 2, mid=2)
+        self.assertIs(update1, update2) # consumers share the segment
+        self.assertEqual(update1.created, bitmap(range(10, 20)))
+        self.assertEqual(update1.updated, bitmap(range(0, 5)))
+        changes.add_deleted(bitmap(range(0, 2)))
+        update1 = changes.compute_updates(2, 3, mid=1)
+        self.assertEqual(update1.deleted, bitmap([0, 1]))
+        # the lagging consumer gets the segments combined
+        update3 = changes.compute_updates(1, 3, mid=3)
+        self.assertEqual(update3.created, bitmap(range(10, 20)))
+        self.assertEqual(update3.updated, bitmap(range(2, 5)))
+        self.assertEqual(update3.deleted, bitmap([0, 1]))
+        # segments are released once read by all the consumers
+        self.assertEqual(changes.segment_count(), 2)
+        update2 = changes.compute_updates(2, 3, mid=2)
+        self.assertEqual(update2.deleted, bitmap([0, 1]))
+        self.assertEqual(changes.segment_count(), 1)
+        update2 = changes.compute_updates(3, 4, mid=2)
+        self.assertEqual(len(update2.created), 0)
+        with self.assertRaises(ValueError):
+            changes.compute_updates(2, 5, mid=1)
+
 
 if __name__ == '__main__':
     ProgressiveTest.main()
@@ -1,4 +1,4 @@
-from . import ProgressiveTest
+from . import ProgressiveTest, skipIf
 
 import datashape as ds
 
@@ -10,9 +10,27 @@ from progressivis.table.table_selected import TableSelectedView
 from progressivis.io.csv_loader import CSVLoader
 from progressivis.datasets import get_dataset
 from progressivis.storage import Group
+from progressivis.storage.mmap import MMapGroup
+from progressivis.core.bitmap import bitmap
+from progressivis.core.intdict import IntDict
+from progressivis.core.runindex import RunIndex
+from progressivis.core.config import option_context
+from progressivis.table.tablechanges import TableChanges
 
 import numpy as np
 import pandas as pd
+import os
+import shutil
+import tempfile
+
+try:
+    from unittest import mock
+except ImportError: # python 2
+    import mock
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
 
 
 class TestTable(ProgressiveTest):
@@ -355,6 +373,113 @@ class TestTable(ProgressiveTest):
             self.assertTrue(np.all(coldf==colt.values))
         #print(t)
 
+    def test_id_index(self):
+        t = Table('table_id_index', dshape="{a: int}", create=True)
+        t.append({'a': np.arange(1000)})
+        index = t.index
+        del t.loc[[10, 11, 500]]
+        self.assertFalse(index.is_identity)
+        self.assertIsInstance(index._ids_dict, RunIndex)
+        self.assertEqual(index._ids_dict.run_count(), 3)
+        self.assertEqual(len(t), 997)
+        self.assertEqual(index.id_to_index(12), 12)
+        ids = bitmap([0, 12, 501, 999])
+        self.assertTrue(np.array_equal(t.loc[ids]['a'].values,
+                                       [0, 12, 501, 999]))
+        with self.assertRaises(KeyError):
+            index.id_to_index(10)
+        del t.loc[950:959]
+        self.assertIsInstance(index._ids_dict, RunIndex)
+        self.assertEqual(len(t), 988)
+        # too many holes, switch to a hash table
+        del t.loc[range(101, 901, 2)]
+        self.assertIsInstance(index._ids_dict, IntDict)
+        self.assertEqual(len(t), 588)
+        self.assertEqual(index.id_to_index(102), 102)
+
+    def test_compact(self):
+        t = Table('table_compact', dshape="{a: int, b: string}", create=True)
+        t.append({'a': np.arange(100),
+                  'b': np.array(['s%d' % i for i in range(100)], dtype=object)})
+        t.changes = TableChanges()
+        self.assertIsNone(t.changes.compute_updates(0, 1, mid=1))
+        del t.loc[range(0, 90, 3)]
+        self.assertEqual(t.changes.compute_updates(1, 2, mid=1).deleted,
+                         bitmap(range(0, 90, 3)))
+        self.assertEqual(t.index.freelist_size(), 30)
+        remap = t.compact()
+        self.assertEqual(t.index.freelist_size(), 0)
+        self.assertEqual(t.size, 70)
+        self.assertEqual(len(t), 70)
+        ids = np.setdiff1d(np.arange(100), np.arange(0, 90, 3))
+        self.assertTrue(np.array_equal(remap, ids))
+        self.assertTrue(np.array_equal(t['a'].values, ids))
+        self.assertEqual(list(t['b'][:3]), ['s1', 's2', 's4'])
+        self.assertEqual(t.at[50, 'a'], 50)
+        self.assertEqual(t.at[50, 'b'], 's50')
+        # the ids are unchanged, nothing to report to the change managers
+        update = t.changes.compute_updates(2, 3, mid=1)
+        self.assertEqual(len(update.created)+len(update.updated)
+                         +len(update.deleted), 0)
+        self.assertIsNone(t.compact())
+        t.append({'a': [100], 'b': np.array(['s100'], dtype=object)})
+        self.assertEqual(t.at[100, 'a'], 100)
+        self.assertEqual(t.id_to_index(100), 70)
+
+    def test_compact_auto(self):
+        t = Table('table_compact_auto', dshape="{a: int}", create=True)
+        t.append({'a': np.arange(100)})
+        with option_context('table.compact_min_free', 10):
+            del t.loc[range(0, 40)]
+            self.assertEqual(t.size, 60) # not enough free slots
+            del t.loc[range(40, 60, 2)]
+        self.assertEqual(t.size, 50)
+        self.assertEqual(t.index.freelist_size(), 0)
+        self.assertEqual(t.at[61, 'a'], 61)
+
+    def test_append_arrays(self):
+        t = Table('table_append_arrays', dshape="{a: int, b: float32, c: string}",
+                  create=True)
+        t.changes = TableChanges()
+        self.assertIsNone(t.changes.compute_updates(0, 1, mid=1))
+        a = np.arange(10)
+        b = np.random.rand(10) # converted to float32
+        c = np.array(['s%d' % i for i in range(10)], dtype=object)
+        t.append({'a': a, 'b': b, 'c': c})
+        self.assertTrue(np.array_equal(t['a'].values, a))
+        self.assertTrue(np.allclose(t['b'].values, b))
+        self.assertEqual(t['b'].dtype, np.float32)
+        self.assertEqual(t.at[3, 'c'], 's3')
+        update = t.changes.compute_updates(1, 2, mid=1)
+        self.assertEqual(update.created, bitmap(range(10)))
+        self.assertEqual(len(update.updated), 0)
+        t.append(pd.DataFrame({'a': a, 'b': b, 'c': c, 'd': a}))
+        self.assertEqual(len(t), 20)
+        self.assertEqual(t.at[13, 'c'], 's3')
+        # the free slots are reused
+        del t.loc[[2, 5]]
+        t.append({'a': np.array([100, 101]), 'b': np.zeros(2),
+                  'c': np.array(['x', 'y'], dtype=object)})
+        self.assertEqual(len(t), 20)
+        self.assertEqual(list(t['a'][[2, 5]]), [100, 101])
+        with self.assertRaises(ValueError):
+            t.append({'a': a, 'b': b})
+        with self.assertRaises(ValueError):
+            t.append({'a': a, 'b': b[:5], 'c': c})
+
+    @skipIf(pa is None, "pyarrow not installed, test skipped")
+    def test_append_arrow(self):
+        t = Table('table_append_arrow', dshape="{a: int64, b: float64, c: string}",
+                  create=True)
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(np.arange(10)), pa.array(np.random.rand(10)),
+             pa.array(['s%d' % i for i in range(10)])], ['a', 'b', 'c'])
+        t.append(batch)
+        t.append(pa.Table.from_batches([batch, batch]))
+        self.assertEqual(len(t), 30)
+        self.assertTrue(np.array_equal(t['a'].values, np.tile(np.arange(10), 3)))
+        self.assertEqual(t.at[23, 'c'], 's3')
+
     def test_read_direct(self):
         t = Table('table_read_direct', dshape="{a: int, b: float32}", create=True)
         t.resize(10)
@@ -426,7 +551,76 @@ class TestTable(ProgressiveTest):
         self.assertTrue(np.allclose(b[indices], arr[:, 1]))
         self.assertTrue(np.allclose(c[indices], arr[:, 2]))
         
-        #TODO more tests multidimensional columns and deleted rows
+        # Keys as a bitmap
+        arr = t.to_array(bitmap([1, 2, 3, 7]), columns=['a'])
+        self.assertTrue(np.array_equal(arr[:, 0], ivalues[[1, 2, 3, 7]]))
+
+        # Output buffer
+        out = t.array_buffer(20)
+        self.assertEqual(out.shape, (20, 3))
+        arr = t.to_array(slice(0, 4), out=out)
+        self.assertEqual(arr.shape, (5, 3))
+        self.assertTrue(arr.base is out or arr.base is out.base)
+        self.assertTrue(np.allclose(a[0:5], out[0:5, 0]))
+        with self.assertRaises(ValueError):
+            t.to_array(out=out[:5])
+
+        # Deleted rows
+        del t.loc[[3, 4]]
+        arr = t.to_array()
+        self.assertEqual(arr.shape, (8, 3))
+        self.assertTrue(np.allclose(arr[:, 0], np.delete(ivalues, [3, 4])))
+
+        #TODO more tests multidimensional columns
+
+    def test_iter_array(self):
+        t = Table('table_iter_array', dshape="{a: int, b: 2 * float64}", create=True)
+        values = np.arange(1000)
+        t.append({'a': values, 'b': np.column_stack([values, -values])})
+        del t.loc[range(100, 200)]
+        expected = np.column_stack([np.delete(values, range(100, 200))]*2)
+        expected = np.column_stack([expected, -expected[:, 0]])
+        chunks = list(np.array(x) for x in t.iter_array(max_bytes=300*24))
+        self.assertEqual([len(x) for x in chunks], [300, 300, 300])
+        self.assertTrue(np.array_equal(np.concatenate(chunks), expected))
+        # fragmented rows, with a buffer
+        locs = np.arange(0, 1000, 3)
+        locs = locs[(locs < 100) | (locs >= 200)]
+        out = t.array_buffer(64)
+        chunks = list(np.array(x) for x in t.iter_array(locs, out=out))
+        self.assertEqual(sum(len(x) for x in chunks), len(locs))
+        self.assertTrue(all(len(x) == 64 for x in chunks[:-1]))
+        self.assertTrue(np.array_equal(np.concatenate(chunks)[:, 0], locs))
+        self.assertTrue(np.array_equal(np.concatenate(chunks)[:, 2], -locs))
+
+    def test_gather_fancy(self):
+        tmp = tempfile.mkdtemp(prefix='p10s_')
+        try:
+            for group in [Group.default('gather'),
+                          MMapGroup(os.path.join(tmp, 'gather'))]:
+                self._gather_fancy(group)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def _gather_fancy(self, group):
+        t = Table('table_gather_fancy', dshape="{a: int, b: float64}",
+                  create=True, storagegroup=group)
+        values = np.arange(1000)
+        t.append({'a': values, 'b': values * 0.5})
+        dataset = t._column('b').dataset
+        getitem = type(dataset).__getitem__
+        # fragmented rows are read with one fancy indexing read per column
+        with mock.patch.object(type(dataset), '__getitem__', autospec=True,
+                               side_effect=getitem) as read:
+            locs = np.arange(0, 1000, 3)
+            arr = t.to_array(locs)
+        self.assertTrue(any(isinstance(call[0][1], np.ndarray)
+                            for call in read.call_args_list))
+        self.assertFalse(any(isinstance(call[0][1], list)
+                             for call in read.call_args_list))
+        self.assertTrue(np.array_equal(arr[:, 0], locs))
+        self.assertTrue(np.array_equal(arr[:, 1], locs * 0.5))
+        self.assertTrue(np.array_equal(t['b'][locs], locs * 0.5))
 
     def test_convert(self):
         arr = np.random.rand(10,5)
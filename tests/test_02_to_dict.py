@@ -1,6 +1,7 @@
 from . import ProgressiveTest
 from progressivis.table.table import Table
 from progressivis.table.table_selected import TableSelectedView
+from progressivis.table.columnar import encode_columns, decode_columns
 from progressivis.core.bitmap import bitmap
 
 import numpy as np
@@ -47,4 +48,64 @@ class TestToDict(ProgressiveTest):
         self.assertEqual(df.to_dict(orient='list'), t.to_dict(orient='list'))
         self.assertEqual(df.to_dict(orient='split'), t.to_dict(orient='split'))
         self.assertEqual(df.to_dict(orient='rows'), t.to_dict(orient='rows'))        
-        self.assertEqual(df.to_dict(orient='index'), t.to_dict(orient='index'))        
+        self.assertEqual(df.to_dict(orient='index'), t.to_dict(orient='index'))
+
+    def test_to_dict_window(self):
+        t = Table(name=None, dshape='{a: int64, b: float64}', create=True)
+        t.append({'a': np.arange(10), 'b': np.arange(10, dtype=np.float64)})
+        t.loc[6, 'b'] = np.nan
+        del t.loc[[2, 3]]
+        lists = t.to_dict(orient='list', start=2, stop=5)
+        self.assertEqual(lists['a'], [4, 5, 6])
+        self.assertEqual(lists['b'][:2], [4.0, 5.0])
+        self.assertTrue(np.isnan(lists['b'][2]))
+        split = t.to_dict(orient='split', start=2, stop=5)
+        self.assertEqual(split['index'], [4, 5, 6])
+        self.assertEqual([row[0] for row in split['data']], [4, 5, 6])
+        self.assertEqual(t.to_dict(orient='datatable', start=4),
+                         [[6, 6, None], [7, 7, 7.0], [8, 8, 8.0], [9, 9, 9.0]])
+        self.assertEqual(t.to_dict(orient='datatable', start=7, stop=20),
+                         [[9, 9, 9.0]])
+        self.assertEqual(t.to_dict(orient='datatable', start=20), [])
+
+    def test_to_bytes(self):
+        df = pd.DataFrame(data={'a': [1, 2, 3, 4, 5, 6, 7, 8],
+                                'b': [1.5, np.nan, 3, 4, 5, 6, 7, 8],
+                                'c': ['a', 'b', 'cd', 'ef', 'fg', 'gh', 'hi', u'\xe9t\xe9']})
+        t = Table(name=None, data=df)
+        del t.loc[[3, 4]]
+        (header, index, columns) = decode_columns(t.to_bytes())
+        self.assertEqual(header['total'], 6)
+        self.assertEqual((header['start'], header['stop']), (0, 6))
+        self.assertEqual(index.tolist(), [0, 1, 2, 5, 6, 7])
+        self.assertEqual(list(columns.keys()), ['a', 'b', 'c'])
+        for name in ['a', 'b', 'c']:
+            self.assertEqual(columns[name].dtype, t[name].dtype)
+        self.assertEqual(columns['a'].tolist(), [1, 2, 3, 6, 7, 8])
+        self.assertTrue(np.isnan(columns['b'][1]))
+        self.assertEqual(columns['c'].tolist(), ['a', 'b', 'cd', 'gh', 'hi', u'\xe9t\xe9'])
+        (header, index, columns) = decode_columns(t.to_bytes(columns=['c'],
+                                                             start=2, stop=4))
+        self.assertEqual((header['start'], header['stop']), (2, 4))
+        self.assertEqual(index.tolist(), [2, 5])
+        self.assertEqual(columns['c'].tolist(), ['cd', 'gh'])
+        view = TableSelectedView(t, bitmap([1, 5, 7]))
+        (header, index, columns) = decode_columns(view.to_bytes(columns=['a']))
+        self.assertEqual(header['total'], 3)
+        self.assertEqual(index.tolist(), [1, 5, 7])
+        self.assertEqual(columns['a'].tolist(), [2, 6, 8])
+
+    def test_columnar(self):
+        data = {'x': np.arange(12, dtype='>f4').reshape(4, 3),
+                'y': np.array([True, False, True, True])}
+        buf = encode_columns(data, run=3)
+        (header, index, columns) = decode_columns(buf)
+        self.assertIsNone(index)
+        self.assertEqual(header['run'], 3)
+        for desc in header['columns']:
+            for (offset, _) in desc['buffers']:
+                self.assertEqual(offset % 8, 0)
+        self.assertEqual(columns['x'].dtype.str, '<f4')
+        self.assertTrue(np.array_equal(columns['x'], data['x']))
+        self.assertTrue(np.array_equal(columns['y'], data['y']))
+
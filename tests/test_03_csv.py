@@ -1,7 +1,10 @@
 from . import ProgressiveTest
+from time import sleep
+from timeit import default_timer
 
 from progressivis.io import CSVLoader
 from progressivis.table.constant import Constant
+from progressivis.io.variable import Variable
 from progressivis.table.table import Table
 from progressivis.datasets import get_dataset#, RandomBytesIO
 from progressivis.core.utils import RandomBytesIO
@@ -82,6 +85,30 @@ class TestProgressiveLoadCSV(ProgressiveTest):
         s.join()        
         self.assertEqual(len(csv.table()), 60000)
 
+    def test_read_appended_fake_csv(self):
+        s=self.scheduler()
+        filenames = Table(name='file_names2',
+                          dshape='{filename: string}',
+                          data={'filename': ['buffer://fake1?cols=10&rows=30000']})
+        var = Variable(table=filenames, scheduler=s)
+        csv = CSVLoader(index_col=False, header=None, scheduler=s)
+        csv.input.filenames = var.output.table
+        csv.start()
+        self.wait_for(lambda: csv.table() is not None and len(csv.table()) == 30000)
+        # the scheduler hibernates until a file name is added
+        sleep(0.5)
+        filenames.add({'filename': 'buffer://fake2?cols=10&rows=30000'})
+        self.wait_for(lambda: len(csv.table()) == 60000)
+        s.stop()
+        s.join()
+        self.assertEqual(len(csv.table()), 60000)
+
+    def wait_for(self, cond, timeout=30):
+        start = default_timer()
+        while not cond():
+            self.assertLess(default_timer()-start, timeout)
+            sleep(0.1)
+
 
 
 if __name__ == '__main__':
@@ -4,6 +4,9 @@ from progressivis import Every
 from progressivis.stats import Percentiles
 from progressivis.io import CSVLoader
 from progressivis.datasets import get_dataset
+from progressivis.stats import RandomTable
+
+import numpy as np
 
 class TestPercentiles(ProgressiveTest):
     def test_percentile(self):
@@ -23,5 +26,21 @@ class TestPercentiles(ProgressiveTest):
         #pd.set_option('display.expand_frame_repr', False)
         #print(repr(module.table()))
 
+    def test_percentile_process(self):
+        s = self.scheduler()
+        random = RandomTable(1, rows=10000, scheduler=s)
+        module=Percentiles('_1', name='test_percentile_process',
+                           executor='process', scheduler=s)
+        module.input.table = random.output.table
+        prt = Every(proc=self.terse, name='print', scheduler=s)
+        prt.input.df = module.output.percentiles
+        s.start()
+        s.join()
+        last = module.table().last().to_dict(ordered=True)
+        values = random.table()['_1'].values
+        self.assertTrue(np.allclose(list(last.values()),
+                                    np.percentile(values, [25, 50, 75]),
+                                    atol=0.02))
+
 if __name__ == '__main__':
     ProgressiveTest.main()
@@ -2,6 +2,7 @@ from . import ProgressiveTest
 
 from progressivis import Print
 from progressivis.stats import Var, RandomTable
+from progressivis.stats.var import OnlineVariance
 
 import numpy as np
 
@@ -22,5 +23,26 @@ class Testvar(ProgressiveTest):
         print('res2:', res2)
         self.assertTrue(np.allclose(res1, res2))
 
+    def test_var_process(self):
+        s = self.scheduler()
+        random = RandomTable(3, rows=10000, scheduler=s)
+        var=Var(scheduler=s, executor='process')
+        var.input.table = random.output.table
+        pr=Print(proc=self.terse, scheduler=s)
+        pr.input.df = var.output.table
+        s.start()
+        s.join()
+        res1 = np.array([float(e) for e in random.table().var(ddof=1).values()])
+        res2 = np.array([float(e) for e in var.table().last().to_dict(ordered=True).values()])
+        self.assertTrue(np.allclose(res1, res2))
+
+    def test_online_variance(self):
+        data = np.random.rand(1000)
+        ov = OnlineVariance()
+        ov.add(data[:300])
+        ov.add(data[300:])
+        self.assertTrue(np.isclose(ov.variance, data.var(ddof=1)))
+        self.assertTrue(np.isclose(ov.mean, data.mean()))
+
 if __name__ == '__main__':
     ProgressiveTest.main()
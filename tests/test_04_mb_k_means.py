@@ -4,6 +4,7 @@ from progressivis import Print, Every #, log_level
 from progressivis.cluster import MBKMeans
 from progressivis.io import CSVLoader
 from progressivis.datasets import get_dataset
+from progressivis.stats import RandomTable
 
 
 #from sklearn.cluster import MiniBatchKMeans
@@ -44,6 +45,19 @@ class TestMBKmeans(ProgressiveTest):
         #print km.mbk.cluster_centers_
         #self.assertTrue(np.allclose(mbk.cluster_centers_, km.mbk.cluster_centers_))
 
+    def test_mb_k_means_process(self):
+        s = self.scheduler()
+        random = RandomTable(2, rows=5000, scheduler=s)
+        km = MBKMeans(n_clusters=3, random_state=42, is_input=False,
+                      executor='process', scheduler=s)
+        km.input.table = random.output.table
+        e = Every(proc=self.terse, scheduler=s)
+        e.input.df = km.output.labels
+        s.start()
+        s.join()
+        self.assertEqual(len(random.table()), len(km.labels()))
+        self.assertEqual(len(km.table()), 3)
+
 
 if __name__ == '__main__':
     ProgressiveTest.main()